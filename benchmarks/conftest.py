@@ -0,0 +1,53 @@
+"""pytest wiring for the benchmark suite (run with ``python -m pytest benchmarks``)."""
+
+import pytest
+
+from benchmarks.harness import load_baseline, measure, regressions, save_baseline
+
+_RESULTS = {}
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "extreme: 3,000,000-segment case, runs only with --bench-extreme")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmarks")
+    group.addoption("--bench-update", action="store_true", help="Write measured results to benchmarks/baseline.json")
+    group.addoption("--bench-extreme", action="store_true", help="Include the 3,000,000-segment cases (several GB of RAM)")
+
+
+@pytest.fixture(scope="session")
+def baseline():
+    return load_baseline()
+
+
+@pytest.fixture
+def bench(request, baseline):
+    """Measure a callable, record it under the test id and fail on regression."""
+
+    def run(fn, **kw):
+        result = measure(fn, **kw)
+        _RESULTS[request.node.name] = result
+        if not request.config.getoption("--bench-update"):
+            problems = regressions(request.node.name, result, baseline)
+            if problems:
+                pytest.fail("; ".join(problems))
+        return result
+
+    return run
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if _RESULTS and session.config.getoption("--bench-update"):
+        save_baseline(_RESULTS)
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _RESULTS:
+        return
+    terminalreporter.section("benchmarks")
+    terminalreporter.write_line(f"{'case':<44} {'ops/s':>12} {'mean ms':>10} {'peak KiB':>12} {'bytes':>10}")
+    for name, r in sorted(_RESULTS.items()):
+        size = f"{r['bytes']:>10}" if "bytes" in r else ""
+        terminalreporter.write_line(f"{name:<44} {r['ops_per_s']:>12.1f} {r['mean_s'] * 1e3:>10.3f} {r['peak_kib']:>12.0f} {size}".rstrip())
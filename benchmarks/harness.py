@@ -0,0 +1,108 @@
+"""Minimal benchmark harness: wall-clock ops/s and tracemalloc peak memory.
+
+Each case is timed in several repeats after a warm-up round; its ops/s is
+taken from the median repeat.  Results are compared against ``baseline.json``
+(same directory).  A case regresses when its ops/s falls below
+``baseline * (1 - BENCH_TOLERANCE)`` or its peak memory exceeds
+``baseline * (1 + BENCH_MEM_TOLERANCE)``.  Cases without a baseline entry are
+reported but never fail.
+"""
+
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _timed_rounds(fn: Callable[[], Any], min_time_s: float, max_rounds: int) -> List[float]:
+    """Per-call times of *fn* over as many rounds as fit in *min_time_s* (at least one)."""
+    times: List[float] = []
+    total = 0.0
+    while len(times) < max_rounds and (not times or total < min_time_s):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        times.append(dt)
+        total += dt
+    return times
+
+
+def measure(fn: Callable[[], Any], min_time_s: float = 0.2, max_rounds: int = 1000, repeats: int = 0) -> Dict[str, float]:
+    """Time *fn* in ``repeats`` (BENCH_REPEATS, default 5) batches of rounds that
+    share *min_time_s*, after one untimed warm-up batch, then measure its peak
+    traced allocation in one extra, untimed call.  *max_rounds* caps each batch.
+
+    ``ops_per_s`` comes from the median over the batches of each batch's fastest
+    call, so one batch disturbed by the machine does not move the gate.
+    """
+    repeats = repeats or max(1, int(_env_float("BENCH_REPEATS", 5)))
+    per_batch_s = min_time_s / repeats
+    _timed_rounds(fn, per_batch_s, max_rounds)  # warm-up (imports, caches, allocator)
+    batches = [_timed_rounds(fn, per_batch_s, max_rounds) for _ in range(repeats)]
+    times = [dt for batch in batches for dt in batch]
+    median_best = statistics.median(min(batch) for batch in batches)
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "rounds": len(times),
+        "repeats": repeats,
+        "mean_s": sum(times) / len(times),
+        "min_s": min(times),
+        "median_s": median_best,
+        "ops_per_s": 1.0 / median_best if median_best > 0 else float("inf"),
+        "peak_kib": max(0, peak - base) / 1024.0,
+    }
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> Dict[str, Dict[str, float]]:
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("cases") or {}
+
+
+def save_baseline(cases: Dict[str, Dict[str, float]], path: Path = BASELINE_PATH) -> None:
+    merged = {**load_baseline(path), **cases}
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"cases": dict(sorted(merged.items()))}, f, indent=2)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def regressions(name: str, result: Dict[str, float], baseline: Dict[str, Dict[str, float]]) -> List[str]:
+    """Human-readable regression messages for one case (empty when within tolerance)."""
+    ref = baseline.get(name)
+    if not ref:
+        return []
+    tol = _env_float("BENCH_TOLERANCE", 0.5)
+    mem_tol = _env_float("BENCH_MEM_TOLERANCE", 0.25)
+    out = []
+    floor = ref["ops_per_s"] * (1.0 - tol)
+    if result["ops_per_s"] < floor:
+        out.append(f"{name}: {result['ops_per_s']:.1f} ops/s < {floor:.1f} (baseline {ref['ops_per_s']:.1f}, tolerance {tol:.0%})")
+    # Small allocations are noise; only compare peaks above 64 KiB.
+    ceiling = max(ref["peak_kib"] * (1.0 + mem_tol), 64.0)
+    if result["peak_kib"] > ceiling:
+        out.append(f"{name}: peak {result['peak_kib']:.0f} KiB > {ceiling:.0f} KiB (baseline {ref['peak_kib']:.0f} KiB)")
+    return out
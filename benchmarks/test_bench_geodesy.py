@@ -0,0 +1,58 @@
+"""Pure-Python haversine loops vs the vectorized sources.geodesy paths."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from sources import geodesy
+from sources.tomtom import _haversine_km
+
+POINTS = [100, 1_000, 10_000]
+PROBES = 300
+
+
+def _polyline(n):
+    rng = np.random.default_rng(0)
+    lat = 32.0 + np.cumsum(rng.uniform(-0.0002, 0.0004, n))
+    lon = 34.78 + np.cumsum(rng.uniform(-0.0002, 0.0004, n))
+    return [{"latitude": float(a), "longitude": float(b)} for a, b in zip(lat, lon)]
+
+
+def _loop_length(coords):
+    total = 0.0
+    for p, q in zip(coords, coords[1:]):
+        total += _haversine_km(p["latitude"], p["longitude"], q["latitude"], q["longitude"])
+    return total
+
+
+def _loop_nearest(coords, probes):
+    out = []
+    for lat, lon in probes:
+        best, best_d = 0, float("inf")
+        for i, c in enumerate(coords):
+            d = _haversine_km(lat, lon, c["latitude"], c["longitude"])
+            if d < best_d:
+                best, best_d = i, d
+        out.append(best)
+    return out
+
+
+@pytest.mark.parametrize("n", POINTS)
+@pytest.mark.parametrize("impl", ["loop", "numpy"])
+def test_polyline_length(bench, impl, n):
+    coords = _polyline(n)
+    if impl == "loop":
+        bench(lambda: _loop_length(coords))
+    else:
+        bench(lambda: geodesy.polyline_length_km(geodesy.coords_to_array(coords)))
+
+
+@pytest.mark.parametrize("n", POINTS[:2])
+@pytest.mark.parametrize("impl", ["loop", "numpy"])
+def test_nearest_vertex_for_probe_set(bench, impl, n):
+    coords = _polyline(n)
+    probes = [(c["latitude"] + 1e-4, c["longitude"]) for c in coords[:: max(1, n // PROBES)]][:PROBES]
+    if impl == "loop":
+        bench(lambda: _loop_nearest(coords, probes), max_rounds=3)
+    else:
+        bench(lambda: geodesy.nearest_vertex(geodesy.coords_to_array(coords), np.asarray(probes)))
@@ -0,0 +1,62 @@
+"""Throughput and peak-memory benchmarks for methodology.AyalonModel."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from methodology import AyalonModel
+from sources.segment import Segment
+
+EXTREME = 3_000_000
+SIZES = [3, 300, 30_000, pytest.param(EXTREME, marks=pytest.mark.extreme)]
+SEGMENTS_PER_SNAPSHOT = 3
+P_FUEL = 7.5
+
+
+@pytest.fixture(autouse=True)
+def _gate_extreme(request):
+    if request.node.get_closest_marker("extreme") and not request.config.getoption("--bench-extreme"):
+        pytest.skip("extreme scale: pass --bench-extreme")
+
+
+def _columns(n):
+    """Deterministic synthetic inputs: 0.5-5 km segments, 0.8-3x free-flow time."""
+    rng = np.random.default_rng(0)
+    length_km = rng.uniform(0.5, 5.0, n)
+    observed_travel_time_s = length_km * 40.0 * rng.uniform(0.8, 3.0, n)
+    vehicle_count = rng.integers(1, 3000, n).astype(np.float64)
+    return length_km, observed_travel_time_s, vehicle_count
+
+
+def _dicts(n):
+    return [
+        {"segment_id": f"s{i}", "length_km": L, "observed_travel_time_s": T, "vehicle_count": V}
+        for i, (L, T, V) in enumerate(zip(*(c.tolist() for c in _columns(n))))
+    ]
+
+
+@pytest.mark.parametrize("n", SIZES)
+@pytest.mark.parametrize("kind", ["dicts", "segments"])
+def test_run_model(bench, n, kind):
+    segs = _dicts(n)
+    if kind == "segments":
+        segs = [Segment.from_dict(s) for s in segs]
+    model = AyalonModel()
+    bench(lambda: model.run_model(segs, data_timestamp_utc="2026-01-01T00:00:00Z", source_ids={},
+                                  p_fuel_ils_per_l=P_FUEL, pipeline_run_id="bench"))
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_segment_losses(bench, n):
+    segs = [Segment.from_dict(s) for s in _dicts(n)]
+    model = AyalonModel()
+    bench(lambda: model.calculate_segment_losses(segs))
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_run_model_batch(bench, n):
+    length_km, observed_travel_time_s, vehicle_count = _columns(n)
+    snapshot_ids = np.arange(n) // SEGMENTS_PER_SNAPSHOT
+    model = AyalonModel()
+    bench(lambda: model.run_model_batch(snapshot_ids, length_km, observed_travel_time_s, vehicle_count,
+                                        p_fuel_ils_per_l=P_FUEL))
@@ -0,0 +1,48 @@
+"""Vector flow tile decoding and corridor extraction at city scale."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from sources import mvt, tomtom_tiles
+
+# A dense city tile: a few thousand flow lines of ~30 vertices each.
+FEATURES = [500, 5_000]
+Z, X, Y = 14, 9773, 6650
+
+
+def _city_tile(n):
+    rng = np.random.default_rng(0)
+    features = []
+    for i in range(n):
+        start = rng.integers(0, 4096, 2)
+        steps = rng.integers(-40, 41, (30, 2))
+        pts = np.clip(start + np.cumsum(steps, axis=0), -128, 4223)
+        features.append({
+            "id": i, "type": mvt.GEOM_LINESTRING,
+            "properties": {"traffic_level": int(rng.integers(5, 110)), "road_type": ["Motorway", "Major road", "Local road"][i % 3],
+                           "traffic_road_coverage": "full", "road_closure": False},
+            "geometry": [[tuple(p) for p in pts.tolist()]],
+        })
+    return mvt.encode_tile({"Traffic flow": {"extent": 4096, "features": features}})
+
+
+@pytest.mark.parametrize("n", FEATURES)
+def test_decode_tile_with_geometry(bench, n):
+    data = _city_tile(n)
+
+    def run():
+        for f in mvt.decode_tile(data)["Traffic flow"].features:
+            f.geometry()
+
+    bench(run, max_rounds=20)
+
+
+@pytest.mark.parametrize("n", FEATURES)
+def test_extract_corridor_from_tile(bench, n):
+    data = _city_tile(n)
+    nw = mvt.tile_to_latlon(np.array([[0, 0]]), Z, X, Y)[0]
+    se = mvt.tile_to_latlon(np.array([[4096, 4096]]), Z, X, Y)[0]
+    corridor = {"id": "bench", "probes": [], "path": [nw.tolist(), ((nw + se) / 2).tolist(), se.tolist()]}
+    tile = {"tile": (Z, X, Y), "ref": "sha256:bench", "fetched_at": "2026-01-01T00:00:00Z", "data": data}
+    bench(lambda: tomtom_tiles._extract(corridor, [tile]), max_rounds=20)
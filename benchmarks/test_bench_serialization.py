@@ -0,0 +1,40 @@
+"""Cache / archive serializers on the recorded TomTom payloads: bytes and encode/decode time."""
+
+from pathlib import Path
+
+import pytest
+
+from sources.serialization import get_serializer
+
+RAW = Path(__file__).resolve().parent.parent / "raw"
+# tomtom.json is the small sample export; the smoke payload is a real corridor
+# response with full polylines (long float coordinate arrays).
+FIXTURES = {"sample": "tomtom.json", "smoke": "tomtom_smoke_v1_1_1.json"}
+SPECS = ["json", "json+zlib", "marshal", "marshal+zlib", "msgpack", "msgpack+zlib"]
+
+
+def _serializer(spec):
+    try:
+        return get_serializer(spec)
+    except ValueError as exc:  # msgpack is optional
+        pytest.skip(str(exc))
+
+
+def _payload(fixture):
+    return get_serializer("json").loads((RAW / FIXTURES[fixture]).read_bytes())
+
+
+@pytest.mark.parametrize("spec", SPECS)
+@pytest.mark.parametrize("fixture", list(FIXTURES))
+def test_serializer_dumps(bench, fixture, spec):
+    ser, obj = _serializer(spec), _payload(fixture)
+    bench(lambda: ser.dumps(obj))["bytes"] = len(ser.dumps(obj))
+
+
+@pytest.mark.parametrize("spec", SPECS)
+@pytest.mark.parametrize("fixture", list(FIXTURES))
+def test_serializer_loads(bench, fixture, spec):
+    ser, obj = _serializer(spec), _payload(fixture)
+    blob = ser.dumps(obj)
+    assert ser.loads(blob) == obj
+    bench(lambda: ser.loads(blob))["bytes"] = len(blob)
@@ -12,19 +12,23 @@ import json
 import os
 import time
 import traceback
+from concurrent.futures import Executor, ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from methodology import AyalonModel
-from sources import tomtom
+from sources import cache, cache_janitor, tomtom, tomtom_tiles, transport
 from sources.air_quality import get_air_quality_for_ayalon, get_cached_air_quality
+from sources.corridors import DEFAULT_CORRIDOR_ID, load_corridors
 from sources.fuel_govil import (
     fetch_current_fuel_price_ils_per_l as fetch_current_fuel_price,
     get_cached_fuel_price,
 )
 from sources.history_store import HistoryStore
 from sources.rate_limiter import get_quota_status
+from sources.scheduler import ProbeScheduler, congestion_from_raw
 from sources.secure_config import SecureConfig
+from sources.segment import Segment
 
 # ---------------------------------------------------------------------------
 # Helpers
@@ -65,51 +69,143 @@ def _log(level: str, event: str, **kw: Any) -> None:
 # Data fetchers (each handles its own fallback)
 # ---------------------------------------------------------------------------
 
-def _fetch_traffic(api_key: Optional[str], traffic_mode: str) -> Dict[str, Any]:
-    """Fetch traffic from TomTom (or cache fallback).
+def _classify_fetch_error(exc_msg: str) -> str:
+    if "rate-limited" in exc_msg.lower() or "429" in exc_msg:
+        return "rate_limited"
+    if "403" in exc_msg or "401" in exc_msg or "forbidden" in exc_msg.lower():
+        return "auth_error"
+    return "fetch_error"
+
+
+def _cached_traffic(corridor_id: str, traffic_mode: str, status: str, error: str) -> Optional[Dict[str, Any]]:
+    cached = tomtom.get_cached_corridor_segments(corridor_id, mode=traffic_mode, max_age_s=24 * 3600)
+    if not cached:
+        return None
+    out = dict(cached)
+    out["errors"] = [error]
+    out["_fetch_status"] = status
+    return out
+
+
+def _plan_probe_schedule(corridors: List[Dict[str, Any]], traffic_mode: str,
+                         quota: Dict[str, Any]) -> Tuple[ProbeScheduler, Dict[str, float]]:
+    """Per-probe due ages for this tick from the adaptive, quota-bounded schedule."""
+    scheduler = ProbeScheduler.load()
+    keys = [tomtom.probe_cache_key(p, traffic_mode) for c in corridors for p in c["probes"]]
+    plan = scheduler.plan(keys, calls_today=quota.get("calls_today", 0),
+                          quota_per_day=quota.get("quota_per_day", tomtom.TOMTOM_QUOTA_PER_DAY))
+    _log("INFO", "probe_schedule", probes=len(plan),
+         planned_calls_per_day=round(scheduler.planned_calls_per_day(plan), 1),
+         min_interval_s=min(plan.values(), default=None), max_interval_s=max(plan.values(), default=None))
+    return scheduler, {k: scheduler.max_age_s(i) for k, i in plan.items()}
+
+
+def _observe_probes(scheduler: ProbeScheduler, corridors: List[Dict[str, Any]], traffic_mode: str,
+                    fetched: Dict[str, Any]) -> None:
+    """Feed freshly fetched probe segments back into the schedule (best-effort)."""
+    try:
+        for c in corridors:
+            payload = fetched.get(c["id"])
+            if not isinstance(payload, dict):
+                continue
+            probes = {p["id"]: p for p in c["probes"]}
+            for seg in payload.get("segments") or []:
+                p = probes.get(seg.get("segment_id"))
+                congestion = congestion_from_raw(seg.get("raw") or {})
+                ts = _parse_iso_to_ts(seg.get("fetched_at"))
+                if p is not None and congestion is not None and ts:
+                    scheduler.observe(tomtom.probe_cache_key(p, traffic_mode), congestion, ts)
+        scheduler.save()
+    except Exception as exc:
+        _log("WARN", "probe_schedule_update_failed", error=str(exc)[:200])
+
 
-    Returns the payload dict.  On failure falls back to the most recent
-    *validated* cached aggregate; if even that is absent, raises.
+def _fetch_traffic(api_key: Optional[str], traffic_mode: str, corridors: List[Dict[str, Any]],
+                   executor: Optional[Executor] = None) -> Dict[str, Dict[str, Any]]:
+    """Fetch traffic for every corridor from TomTom (or cache fallback).
+
+    Returns ``{corridor_id: payload}``.  A corridor whose fetch failed falls
+    back to its most recent *validated* cached aggregate; if even that is
+    absent the corridor is left out (logged).  Raises if no corridor has data.
     """
     cache_ttl_s = _env_int("CACHE_TTL_SECONDS", 300)
+    out: Dict[str, Dict[str, Any]] = {}
+    scheduler: Optional[ProbeScheduler] = None
+    probe_max_age_s: Optional[Dict[str, float]] = None
 
     # Early check: skip TomTom call if daily quota is exhausted
-    if api_key and traffic_mode == "flow":
+    if api_key and traffic_mode in ("flow", "tiles"):
         quota = get_quota_status("tomtom")
         if quota.get("remaining", 1) <= 0:
             _log("WARN", "quota_exhausted", service="tomtom",
                  calls_today=quota.get("calls_today"),
                  quota_per_day=quota.get("quota_per_day"))
-            cached = tomtom.get_cached_ayalon_segments(mode=traffic_mode, max_age_s=24 * 3600)
-            if cached:
-                out = dict(cached)
-                out["errors"] = ["Daily TomTom quota exhausted — serving cached data"]
-                out["_fetch_status"] = "quota_exhausted"
-                return out
-            raise RuntimeError("TomTom quota exhausted and no cached data available")
+            for c in corridors:
+                cached = _cached_traffic(c["id"], traffic_mode, "quota_exhausted",
+                                         "Daily TomTom quota exhausted — serving cached data")
+                if cached:
+                    out[c["id"]] = cached
+            if not out:
+                raise RuntimeError("TomTom quota exhausted and no cached data available")
+            return out
+        if traffic_mode == "flow" and os.getenv("TT_ADAPTIVE_SCHEDULE", "1") != "0":
+            scheduler, probe_max_age_s = _plan_probe_schedule(corridors, traffic_mode, quota)
 
     try:
-        result = tomtom.get_ayalon_segments(api_key, cache_ttl_s=cache_ttl_s, mode=traffic_mode)
-        result["_fetch_status"] = "ok"
-        return result
+        if traffic_mode == "tiles":
+            # One vector flow tile request covers a whole stretch of corridor.
+            fetched = tomtom_tiles.get_corridors_segments(corridors, api_key, cache_ttl_s=cache_ttl_s,
+                                                          executor=executor)
+        else:
+            fetched = tomtom.get_corridors_segments(corridors, api_key, cache_ttl_s=cache_ttl_s,
+                                                    mode=traffic_mode, executor=executor,
+                                                    probe_max_age_s=probe_max_age_s)
+        if scheduler is not None:
+            _observe_probes(scheduler, corridors, traffic_mode, fetched)
     except Exception as exc:
-        exc_msg = str(exc)
-        _log("WARN", "traffic_fetch_failed", error=exc_msg[:200])
+        # Batch-level failure (e.g. local rate limiter): every corridor failed the same way.
+        fetched = {c["id"]: exc for c in corridors}
+
+    last_exc: Optional[Exception] = None
+    for c in corridors:
+        cid = c["id"]
+        result = fetched.get(cid)
+        if not isinstance(result, Exception):
+            # The payload may be the cache's shared copy: annotate a shallow copy.
+            if result.get("partial"):
+                out[cid] = {**result, "_fetch_status": "partial"}
+                _log("WARN", "traffic_probes_stale", corridor_id=cid, stale_probes=result.get("stale_probes"))
+            else:
+                out[cid] = {**result, "_fetch_status": "ok"}
+            continue
+        exc_msg = str(result)
+        last_exc = result
+        _log("WARN", "traffic_fetch_failed", corridor_id=cid, error=exc_msg[:200])
+        cached = _cached_traffic(cid, traffic_mode, _classify_fetch_error(exc_msg),
+                                 f"Using cached traffic due to: {exc_msg[:120]}")
+        if cached:
+            out[cid] = cached
+        else:
+            _log("ERROR", "corridor_skipped", corridor_id=cid, reason="no live or cached traffic")
 
-        # Classify the failure
-        fetch_status = "fetch_error"
-        if "rate-limited" in exc_msg.lower() or "429" in exc_msg:
-            fetch_status = "rate_limited"
-        elif "403" in exc_msg or "401" in exc_msg or "forbidden" in exc_msg.lower():
-            fetch_status = "auth_error"
+    if not out:
+        raise last_exc or RuntimeError("collector: no corridors configured")
+    return out
 
-        cached = tomtom.get_cached_ayalon_segments(mode=traffic_mode, max_age_s=24 * 3600)
-        if cached:
-            out = dict(cached)
-            out["errors"] = [f"Using cached traffic due to: {exc_msg[:120]}"]
-            out["_fetch_status"] = fetch_status
-            return out
-        raise
+
+def _sweep_cache() -> Optional[Dict[str, Any]]:
+    """Keep the cache within its budgets, bounded by CACHE_JANITOR_BUDGET_MS (best-effort)."""
+    budget_ms = _env_int("CACHE_JANITOR_BUDGET_MS", cache_janitor.INLINE_BUDGET_MS)
+    if budget_ms <= 0:
+        return None
+    try:
+        result = cache_janitor.sweep(time_budget_s=budget_ms / 1000.0)
+    except Exception as exc:
+        _log("WARN", "cache_janitor_failed", error=str(exc)[:200])
+        return None
+    if result.get("over_budget"):
+        _log("WARN", "cache_over_budget", **result)
+    return result
 
 
 def _fetch_air_quality() -> Dict[str, Any]:
@@ -138,83 +234,214 @@ def _fetch_fuel_price() -> Dict[str, Any]:
         raise
 
 
+# ---------------------------------------------------------------------------
+# Parallel fetch stage
+# ---------------------------------------------------------------------------
+
+def _fetch_traffic_pooled(api_key: Optional[str], traffic_mode: str, corridors: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """_fetch_traffic with all corridors' probes on one bounded worker pool."""
+    pool = ThreadPoolExecutor(max_workers=max(1, _env_int("COLLECTOR_FETCH_WORKERS", 4)))
+    try:
+        return _fetch_traffic(api_key, traffic_mode, corridors, executor=pool)
+    finally:
+        # Probes past TomTom's cycle deadline are abandoned, not awaited.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _fetch_stage(api_key: Optional[str], traffic_mode: str, corridors: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Fetch traffic, fuel price and air quality concurrently.
+
+    Traffic and fuel have their own deadlines (COLLECTOR_TRAFFIC_DEADLINE_S,
+    COLLECTOR_FUEL_DEADLINE_S) capped by COLLECTOR_CYCLE_DEADLINE_S; a source
+    that misses its deadline is replaced by its cached value.  The stage
+    returns as soon as traffic and fuel are resolved: air quality does not
+    feed the model, so it is used if already in and otherwise taken from
+    cache without waiting.
+
+    Returns {"traffic", "fuel", "air", "fetch_ms", "fallbacks"}; raises if
+    traffic or fuel has neither a live nor a cached value.
+    """
+    start = time.monotonic()
+    cycle_deadline = start + _env_int("COLLECTOR_CYCLE_DEADLINE_S", 90)
+
+    def deadline(name: str, default: int) -> float:
+        return min(start + _env_int(name, default), cycle_deadline)
+
+    def timed(source: str, fn, *args):
+        def run():
+            t0 = time.monotonic()
+            try:
+                return fn(*args)
+            finally:
+                fetch_ms[source] = round((time.monotonic() - t0) * 1000.0, 1)
+        return run
+
+    fetch_ms: Dict[str, float] = {}
+    fallbacks: List[str] = []
+    pool = ThreadPoolExecutor(max_workers=3)
+    try:
+        traffic_f = pool.submit(timed("traffic", _fetch_traffic_pooled, api_key, traffic_mode, corridors))
+        fuel_f = pool.submit(timed("fuel", _fetch_fuel_price))
+        aq_f = pool.submit(timed("air", _fetch_air_quality))
+
+        try:
+            traffic = traffic_f.result(timeout=max(0.0, deadline("COLLECTOR_TRAFFIC_DEADLINE_S", 60) - time.monotonic()))
+        except FutureTimeout:
+            _log("WARN", "source_deadline_exceeded", source="traffic")
+            fallbacks.append("traffic")
+            traffic = {}
+            for c in corridors:
+                cached = _cached_traffic(c["id"], traffic_mode, "deadline_exceeded",
+                                         "Traffic fetch missed its deadline — serving cached data")
+                if cached:
+                    traffic[c["id"]] = cached
+            if not traffic:
+                raise RuntimeError("collector: traffic fetch missed its deadline and no cached data available")
+
+        try:
+            fuel = fuel_f.result(timeout=max(0.0, deadline("COLLECTOR_FUEL_DEADLINE_S", 30) - time.monotonic()))
+        except FutureTimeout:
+            _log("WARN", "source_deadline_exceeded", source="fuel")
+            fallbacks.append("fuel")
+            fuel = get_cached_fuel_price(max_age_s=14 * 86400)
+            if not fuel:
+                raise RuntimeError("collector: fuel fetch missed its deadline and no cached price available")
+            fuel = dict(fuel)
+            fuel["source_id"] = str(fuel.get("source_id", "fuel")) + ":cached"
+
+        air: Optional[Dict[str, Any]] = None
+        if aq_f.done():
+            try:
+                air = aq_f.result()
+            except Exception as exc:
+                _log("WARN", "air_quality_unavailable", error=str(exc)[:200])
+        else:
+            _log("INFO", "source_not_ready", source="air")
+            fallbacks.append("air")
+            cached = get_cached_air_quality(max_age_s=24 * 3600)
+            if cached:
+                air = dict(cached)
+                air["error"] = air.get("error") or "Air quality not ready — using cached value"
+        if air is None:
+            # Air quality is context only; the cycle proceeds without it.
+            air = {"source_id": None, "error": "Air quality unavailable"}
+    finally:
+        # Late sources finish in the background; their results are discarded.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return {"traffic": traffic, "fuel": fuel, "air": air, "fetch_ms": fetch_ms, "fallbacks": fallbacks}
+
+
 # ---------------------------------------------------------------------------
 # Main collection cycle
 # ---------------------------------------------------------------------------
 
 def collect_once() -> Dict[str, Any]:
-    """Run one full collection cycle.
+    """Run one full collection cycle over every configured corridor.
 
-    Returns a diagnostic summary dict.
+    Traffic, fuel and air quality are fetched concurrently; fuel and air
+    quality are shared by all corridors, whose probes go through one worker
+    pool; all runs are written in a single transaction.  Returns a
+    diagnostic summary dict (top-level fields describe the default corridor,
+    ``corridors`` holds one entry per corridor).
     """
     cycle_start = _utc_now_iso()
     _log("INFO", "cycle_start")
 
     history = HistoryStore()
     model = AyalonModel()
+    corridors = load_corridors()
 
     api_key = SecureConfig.get_tomtom_api_key()
 
     traffic_mode = os.getenv("TRAFFIC_MODE")
     if not traffic_mode:
         traffic_mode = "flow" if api_key else "sample"
-    if traffic_mode == "flow" and not api_key:
+    if traffic_mode in ("flow", "tiles") and not api_key:
         _log("WARN", "no_api_key_fallback_sample")
         traffic_mode = "sample"
 
-    # ── Fetch all three sources ──
-    tomtom_data = _fetch_traffic(api_key, traffic_mode)
-    aq_data = _fetch_air_quality()
-    fuel_data = _fetch_fuel_price()
-
-    fetch_status = tomtom_data.pop("_fetch_status", "ok")
+    # ── Fetch all three sources concurrently (see _fetch_stage for deadlines) ──
+    fetched = _fetch_stage(api_key, traffic_mode, corridors)
+    traffic, fuel_data, aq_data = fetched["traffic"], fetched["fuel"], fetched["air"]
 
-    now_ts = time.time()
-    tomtom_ts = _parse_iso_to_ts(tomtom_data.get("fetched_at"))
-    tomtom_age_s = (now_ts - tomtom_ts) if tomtom_ts else None
-
-    segments = tomtom_data.get("segments") or []
     price = fuel_data.get("price_ils_per_l")
+    if price is None:
+        _log("ERROR", "insufficient_inputs", fuel_price=price)
+        raise RuntimeError("collector: insufficient inputs (fuel price missing)")
 
-    if not segments or price is None:
-        _log("ERROR", "insufficient_inputs",
-             segments_count=len(segments),
-             fuel_price=price)
-        raise RuntimeError("collector: insufficient inputs (traffic segments or fuel price missing)")
-
-    src_ids = {
-        "traffic": tomtom_data.get("source_id"),
-        "air": aq_data.get("source_id"),
-        "fuel": fuel_data.get("source_id"),
-    }
-
-    results = model.run_model(
-        segments,
-        data_timestamp_utc=tomtom_data.get("fetched_at"),
-        source_ids=src_ids,
-        p_fuel_ils_per_l=float(price),
-        vehicle_count_mode=tomtom_data.get("vehicle_count_mode"),
-    )
-
-    history.record_run(
-        results=results,
-        tomtom_data=tomtom_data,
-        aq_data=aq_data,
-        fuel_data=fuel_data,
-        tomtom_age_s=tomtom_age_s,
-    )
-
+    now_ts = time.time()
+    runs = []
+    per_corridor: Dict[str, Dict[str, Any]] = {}
+    for cid, tomtom_data in traffic.items():
+        fetch_status = tomtom_data.pop("_fetch_status", "ok")
+        tomtom_ts = _parse_iso_to_ts(tomtom_data.get("fetched_at"))
+        tomtom_age_s = (now_ts - tomtom_ts) if tomtom_ts else None
+
+        # Compact slotted segments for the model/DB path; raw payloads stay referenced by hash.
+        segments = [Segment.from_dict(s) for s in tomtom_data.get("segments") or []]
+        if not segments:
+            _log("ERROR", "insufficient_inputs", corridor_id=cid, segments_count=0)
+            continue
+
+        src_ids = {
+            "traffic": tomtom_data.get("source_id"),
+            "air": aq_data.get("source_id"),
+            "fuel": fuel_data.get("source_id"),
+        }
+        results = model.run_model(
+            segments,
+            data_timestamp_utc=tomtom_data.get("fetched_at"),
+            source_ids=src_ids,
+            p_fuel_ils_per_l=float(price),
+            vehicle_count_mode=tomtom_data.get("vehicle_count_mode"),
+            uncertainty_samples=_env_int("MODEL_UNCERTAINTY_SAMPLES", 0),
+            uncertainty_budget_s=_env_int("MODEL_UNCERTAINTY_BUDGET_MS", 50) / 1000.0,
+        )
+        runs.append({
+            "results": results,
+            "tomtom_data": tomtom_data,
+            "aq_data": aq_data,
+            "fuel_data": fuel_data,
+            "tomtom_age_s": tomtom_age_s,
+            "segments": segments,
+            "p_fuel_ils_per_l": float(price),
+            "corridor_id": cid,
+        })
+        per_corridor[cid] = {
+            "traffic_fetch_status": fetch_status,
+            "tomtom_age_s": round(tomtom_age_s, 1) if tomtom_age_s is not None else None,
+            "segments_count": len(segments),
+            "stale_probes": [p.get("segment_id") for p in tomtom_data.get("stale_probes") or []] or None,
+            "sources": src_ids,
+            "pipeline_run_id": results.get("pipeline_run_id"),
+            "delta_T_total_h": results.get("delta_T_total_h"),
+            "leakage_ils": results.get("leakage_ils"),
+            "segment_delay_h": {
+                str(b.get("segment_id")): round(b.get("delay_h", 0.0), 4)
+                for b in results.get("segment_breakdown") or []
+            },
+            "uncertainty_ms": (results.get("uncertainty") or {}).get("elapsed_ms"),
+        }
+
+    if not runs:
+        raise RuntimeError("collector: insufficient inputs (no corridor has traffic segments)")
+
+    history.record_runs(runs)
+    janitor = _sweep_cache()
+
+    primary = per_corridor.get(DEFAULT_CORRIDOR_ID) or next(iter(per_corridor.values()))
     summary = {
         "collected_at_utc": _utc_now_iso(),
         "cycle_start": cycle_start,
         "traffic_mode": traffic_mode,
-        "traffic_fetch_status": fetch_status,
-        "tomtom_age_s": round(tomtom_age_s, 1) if tomtom_age_s is not None else None,
-        "segments_count": len(segments),
-        "sources": src_ids,
-        "pipeline_run_id": results.get("pipeline_run_id"),
-        "delta_T_total_h": results.get("delta_T_total_h"),
-        "leakage_ils": results.get("leakage_ils"),
+        **primary,
+        "corridors": per_corridor,
+        "fetch_ms": fetched["fetch_ms"],
+        "source_fallbacks": fetched["fallbacks"] or None,
+        "http": transport.host_stats(),
+        "cache": cache.mem_stats(),
+        "cache_janitor": janitor,
         "db_write": "ok",
     }
 
@@ -239,7 +466,7 @@ def main() -> int:
         # Human-readable one-liner for journalctl quick scan
         print(f"OK  mode={out['traffic_mode']}  fetch={out['traffic_fetch_status']}  "
               f"age={out.get('tomtom_age_s', '?')}s  segs={out['segments_count']}  "
-              f"run={out['pipeline_run_id']}", flush=True)
+              f"run={out['pipeline_run_id']}  corridors={len(out['corridors'])}", flush=True)
         return 0
     except Exception as exc:
         _log("ERROR", "cycle_failed", error=str(exc)[:300],
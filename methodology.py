@@ -10,6 +10,16 @@ class AyalonModel:
 
     Implements unit-safe calculations and returns provenance metadata.
     """
+    # Uncertainty priors for guessed inputs: triangular(low, 1.0, high) multipliers
+    # on the nominal value.  density_rel scales vehicle_count, which is linear in
+    # TT_DEFAULT_DENSITY_VEH_PER_KM (flow cap ignored).
+    UNCERTAINTY_PRIORS = {
+        'density_rel': (0.6, 1.6),
+        'Fuel_idle_rate_rel': (0.75, 1.5),
+        'StopGo_rel': (0.67, 1.33),
+    }
+    UNCERTAINTY_PERCENTILES = (5, 50, 95)
+
     def __init__(self):
         # Protocol Constants (Appendix A)
         self.V_free_kmh = 90.0  # km/h (posted free-flow speed)
@@ -23,28 +33,72 @@ class AyalonModel:
         self.model_version = "1.0-freeze"
         self.constants_version = "AppendixA-v1.2"
 
-    def calculate_time_dissipation(self, segments):
+    @classmethod
+    def from_constants_file(cls, path):
+        """Build a model from a LOCKED_CONSTANTS.json-style file.
+
+        Missing keys keep the frozen Appendix A defaults.
         """
-        segments: list of canonical dicts with keys:
-          - segment_id
-          - length_km
-          - observed_travel_time_s
-          - vehicle_count
+        import json
 
-        Returns delta_T_total in human-hours (float)
+        with open(path, 'r', encoding='utf-8') as f:
+            c = json.load(f)
+        model = cls()
+        phys = c.get('physical_constants') or {}
+        fuel = c.get('fuel_constants') or {}
+        econ = c.get('economic_constants') or {}
+        model.V_free_kmh = float(phys.get('V_free_kmh', model.V_free_kmh))
+        model.Fuel_idle_rate_L_per_h = float(fuel.get('Fuel_idle_rate_L_per_h', model.Fuel_idle_rate_L_per_h))
+        model.StopGo_factor = float(fuel.get('StopGo_factor', model.StopGo_factor))
+        model.CO2_per_liter = float(fuel.get('CO2_per_liter_kg', model.CO2_per_liter))
+        model.Value_of_Time_ILS_per_h = float(econ.get('Value_of_Time_ILS_per_h', model.Value_of_Time_ILS_per_h))
+        model.model_version = c.get('model_version', model.model_version)
+        model.constants_version = c.get('constants_version', model.constants_version)
+        return model
+
+    def calculate_segment_losses(self, segments):
+        """
+        Fused single pass over canonical segments.
+
+        Computes T_free_s and delta_T_segment_s once per segment and returns
+        (delta_T_total_h, fuel_excess_L, breakdown) where breakdown is a list of
+        per-segment dicts: segment_id, delay_h (vehicle-hours), fuel_excess_L.
+        Totals accumulate in the same order and with the same operations as the
+        frozen v1.0 loops, so they are bit-for-bit unchanged.
         """
-        # Convert constants
         V_free_mps = (self.V_free_kmh / 3.6)
         delta_T_total_seconds = 0.0
+        fuel_excess_L = 0.0
+        breakdown = []
         for seg in segments:
             L_m = seg['length_km'] * 1000.0
             T_obs_s = float(seg['observed_travel_time_s'])
             Vehicles = float(seg['vehicle_count'])
             T_free_s = L_m / V_free_mps if V_free_mps > 0 else float('inf')
             delta_T_segment_s = max(0.0, T_obs_s - T_free_s)
-            delta_T_total_seconds += delta_T_segment_s * Vehicles
+            delay_s = delta_T_segment_s * Vehicles
+            fuel_L = Vehicles * (delta_T_segment_s / 3600.0) * self.Fuel_idle_rate_L_per_h * self.StopGo_factor
+            delta_T_total_seconds += delay_s
+            fuel_excess_L += fuel_L
+            breakdown.append({
+                'segment_id': seg.get('segment_id'),
+                'delay_h': delay_s / 3600.0,
+                'fuel_excess_L': fuel_L,
+            })
         # convert seconds to hours
-        return delta_T_total_seconds / 3600.0
+        return delta_T_total_seconds / 3600.0, fuel_excess_L, breakdown
+
+    def calculate_time_dissipation(self, segments):
+        """
+        segments: list of canonical dicts with keys:
+          - segment_id
+          - length_km
+          - observed_travel_time_s
+          - vehicle_count
+
+        Returns delta_T_total in human-hours (float)
+        """
+        return self.calculate_segment_losses(segments)[0]
 
     def calculate_fuel_excess(self, segments):
         """
@@ -52,16 +106,7 @@ class AyalonModel:
 
         Fuel_excess = sum( Vehicles * delta_T_segment_s/3600 * Fuel_idle_rate_L_per_h * StopGo_factor )
         """
-        fuel_excess_L = 0.0
-        for seg in segments:
-            T_obs_s = float(seg['observed_travel_time_s'])
-            L_m = seg['length_km'] * 1000.0
-            V_free_mps = (self.V_free_kmh / 3.6)
-            T_free_s = L_m / V_free_mps if V_free_mps > 0 else float('inf')
-            delta_T_segment_s = max(0.0, T_obs_s - T_free_s)
-            Vehicles = float(seg['vehicle_count'])
-            fuel_excess_L += Vehicles * (delta_T_segment_s / 3600.0) * self.Fuel_idle_rate_L_per_h * self.StopGo_factor
-        return fuel_excess_L
+        return self.calculate_segment_losses(segments)[1]
 
     def calculate_leakage_ils(self, fuel_excess_L, p_fuel_ils_per_l=None):
         p = p_fuel_ils_per_l if p_fuel_ils_per_l is not None else self.P_fuel_ILS_per_L
@@ -72,7 +117,62 @@ class AyalonModel:
     def calculate_co2_emissions(self, fuel_excess_L):
         return fuel_excess_L * self.CO2_per_liter
 
-    def run_model(self, segments, data_timestamp_utc: str, source_ids: dict, p_fuel_ils_per_l: float | None = None, pipeline_run_id: str | None = None, vehicle_count_mode: str | None = None):
+    def run_uncertainty(self, segments, p_fuel_ils_per_l=None, n_samples: int = 2000, seed=None, time_budget_s: float = 0.05, chunk_size: int = 500, losses=None):
+        """
+        Monte Carlo bands (p5/p50/p95) for the four counters.
+
+        Parameters in UNCERTAINTY_PRIORS are drawn as NumPy arrays.  Every counter is
+        linear in each multiplier, so one fused pass gives the nominal totals and each
+        sample costs a few vector multiplies.  Samples are drawn in chunks until
+        n_samples is reached or time_budget_s is spent (at least one chunk is always
+        drawn); the number actually used is reported.
+
+        losses: optional (delta_T_total_h, fuel_excess_L, ...) already returned by
+        calculate_segment_losses(segments); the fused pass is then skipped.
+        """
+        import time
+        import numpy as np
+
+        t0 = time.perf_counter()
+        delta_T_h, fuel_L = (losses if losses is not None else self.calculate_segment_losses(segments))[:2]
+        p = p_fuel_ils_per_l if p_fuel_ils_per_l is not None else self.P_fuel_ILS_per_L
+        if p is None:
+            raise RuntimeError("Fuel price (ILS/L) not set; provide p_fuel_ils_per_l or set model.P_fuel_ILS_per_L")
+
+        rng = np.random.default_rng(seed)
+        chunks_dT, chunks_fuel = [], []
+        drawn = 0
+        while drawn < n_samples:
+            k = min(chunk_size, n_samples - drawn)
+            draws = {name: rng.triangular(lo, 1.0, hi, size=k) for name, (lo, hi) in self.UNCERTAINTY_PRIORS.items()}
+            chunks_dT.append(delta_T_h * draws['density_rel'])
+            chunks_fuel.append(fuel_L * draws['density_rel'] * draws['Fuel_idle_rate_rel'] * draws['StopGo_rel'])
+            drawn += k
+            if time.perf_counter() - t0 > time_budget_s:
+                break
+
+        dT = np.concatenate(chunks_dT)
+        fuel = np.concatenate(chunks_fuel)
+        samples = {
+            'delta_T_total_h': dT,
+            'fuel_excess_L': fuel,
+            'leakage_ils': fuel * float(p),
+            'co2_emissions_kg': fuel * self.CO2_per_liter,
+        }
+        bands = {}
+        for name, arr in samples.items():
+            p5, p50, p95 = np.percentile(arr, self.UNCERTAINTY_PERCENTILES)
+            bands[name] = {'p5': float(p5), 'p50': float(p50), 'p95': float(p95)}
+        elapsed_ms = (time.perf_counter() - t0) * 1000.0
+        return {
+            'n_samples': int(drawn),
+            'n_requested': int(n_samples),
+            'budget_exhausted': drawn < n_samples,
+            'elapsed_ms': round(elapsed_ms, 3),
+            'counters': bands,
+        }
+
+    def run_model(self, segments, data_timestamp_utc: str, source_ids: dict, p_fuel_ils_per_l: float | None = None, pipeline_run_id: str | None = None, vehicle_count_mode: str | None = None, uncertainty_samples: int = 0, uncertainty_budget_s: float = 0.05):
         """
         Run the model over canonical segments and return physical counters with provenance.
 
@@ -82,23 +182,30 @@ class AyalonModel:
           - source_ids: dict with keys like {'traffic': 'tomtom:resp_id', 'air': 'sviva:station_2', 'fuel': 'gov:2026-01'}
           - p_fuel_ils_per_l: optional override for fuel price
           - pipeline_run_id: optional UUID for this pipeline run
+          - uncertainty_samples: if > 0, add Monte Carlo p5/p50/p95 bands under
+            'uncertainty' (seeded from pipeline_run_id, capped by uncertainty_budget_s)
 
-        Returns dict including provenance fields required by PTL.
+        Returns dict including provenance fields required by PTL, plus
+        'segment_breakdown' (per-segment delay_h, fuel_excess_L, leakage_ils,
+        co2_emissions_kg keyed by segment_id) from the same fused pass.
         """
         import uuid
         from datetime import datetime
 
         pipeline_id = pipeline_run_id or str(uuid.uuid4())
-        delta_T_total_h = self.calculate_time_dissipation(segments)
-        fuel_excess_L = self.calculate_fuel_excess(segments)
+        delta_T_total_h, fuel_excess_L, breakdown = self.calculate_segment_losses(segments)
         leakage_ils = self.calculate_leakage_ils(fuel_excess_L, p_fuel_ils_per_l)
         co2_kg = self.calculate_co2_emissions(fuel_excess_L)
+        for item in breakdown:
+            item['leakage_ils'] = float(self.calculate_leakage_ils(item['fuel_excess_L'], p_fuel_ils_per_l))
+            item['co2_emissions_kg'] = float(self.calculate_co2_emissions(item['fuel_excess_L']))
 
         result = {
             'delta_T_total_h': float(delta_T_total_h),
             'fuel_excess_L': float(fuel_excess_L),
             'leakage_ils': float(leakage_ils),
             'co2_emissions_kg': float(co2_kg),
+            'segment_breakdown': breakdown,
             # provenance
             'model_version': self.model_version,
             'constants_version': self.constants_version,
@@ -108,8 +215,76 @@ class AyalonModel:
             'generated_at_utc': datetime.utcnow().isoformat() + 'Z',
             'vehicle_count_mode': vehicle_count_mode or 'unknown',
         }
+        if uncertainty_samples and uncertainty_samples > 0:
+            import zlib
+
+            result['uncertainty'] = self.run_uncertainty(
+                segments,
+                p_fuel_ils_per_l=p_fuel_ils_per_l,
+                n_samples=int(uncertainty_samples),
+                seed=zlib.crc32(pipeline_id.encode('utf-8')),
+                time_budget_s=uncertainty_budget_s,
+                losses=(delta_T_total_h, fuel_excess_L),
+            )
         return result
 
+    def run_model_batch(self, snapshot_ids, length_km, observed_travel_time_s, vehicle_count, p_fuel_ils_per_l=None):
+        """
+        Vectorized run over many snapshots at once (columnar inputs).
+
+        Args:
+          - snapshot_ids: array-like, one snapshot key per segment row
+          - length_km, observed_travel_time_s, vehicle_count: array-like columns aligned with snapshot_ids
+          - p_fuel_ils_per_l: scalar, or array with one price per snapshot (in returned snapshot order)
+
+        Returns dict of NumPy arrays indexed like 'snapshot_ids' (sorted unique keys):
+          delta_T_total_h, fuel_excess_L, leakage_ils, co2_emissions_kg.
+
+        Per-segment terms use the same operation order as calculate_time_dissipation /
+        calculate_fuel_excess, and np.bincount accumulates in row order, so each snapshot
+        total is bit-for-bit equal to run_model() on that snapshot's segments (same row order).
+        """
+        import numpy as np
+
+        sid = np.asarray(snapshot_ids)
+        L_km = np.asarray(length_km, dtype=np.float64)
+        T_obs_s = np.asarray(observed_travel_time_s, dtype=np.float64)
+        Vehicles = np.asarray(vehicle_count, dtype=np.float64)
+        if not (sid.shape == L_km.shape == T_obs_s.shape == Vehicles.shape) or sid.ndim != 1:
+            raise ValueError("run_model_batch: snapshot_ids and segment columns must be 1-D arrays of equal length")
+
+        keys, inverse = np.unique(sid, return_inverse=True)
+        n = len(keys)
+
+        V_free_mps = (self.V_free_kmh / 3.6)
+        L_m = L_km * 1000.0
+        if V_free_mps > 0:
+            T_free_s = L_m / V_free_mps
+        else:
+            T_free_s = np.full_like(L_m, float('inf'))
+        delta_T_segment_s = np.maximum(T_obs_s - T_free_s, 0.0)
+
+        delta_T_total_h = np.bincount(inverse, weights=delta_T_segment_s * Vehicles, minlength=n) / 3600.0
+        fuel_terms = Vehicles * (delta_T_segment_s / 3600.0) * self.Fuel_idle_rate_L_per_h * self.StopGo_factor
+        fuel_excess_L = np.bincount(inverse, weights=fuel_terms, minlength=n)
+
+        p = p_fuel_ils_per_l if p_fuel_ils_per_l is not None else self.P_fuel_ILS_per_L
+        if p is None:
+            raise RuntimeError("Fuel price (ILS/L) not set; provide p_fuel_ils_per_l or set model.P_fuel_ILS_per_L")
+        p = np.asarray(p, dtype=np.float64)
+        if p.ndim and p.shape != (n,):
+            raise ValueError(f"run_model_batch: expected {n} fuel prices (one per snapshot), got shape {p.shape}")
+
+        return {
+            'snapshot_ids': keys,
+            'delta_T_total_h': delta_T_total_h,
+            'fuel_excess_L': fuel_excess_L,
+            'leakage_ils': fuel_excess_L * p,
+            'co2_emissions_kg': fuel_excess_L * self.CO2_per_liter,
+            'model_version': self.model_version,
+            'constants_version': self.constants_version,
+        }
+
 if __name__ == "__main__":
     import json
     model = AyalonModel()
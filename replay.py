@@ -0,0 +1,159 @@
+"""Ayalon history replay — recompute stored runs under a new constants file.
+
+Every collector run persists its canonical segment inputs and fuel price
+(``run_inputs`` / ``run_segments`` in HistoryStore).  When
+LOCKED_CONSTANTS.json is bumped, this tool re-runs the model over the whole
+history without re-collecting anything:
+
+  * history is chunked by calendar month;
+  * each month is evaluated in a worker process with the vectorized
+    ``AyalonModel.run_model_batch`` path;
+  * results are written to ``replay_results`` under the new
+    ``constants_version``, next to the original rows (never overwriting ``runs``).
+
+Usage:
+  python replay.py --constants LOCKED_CONSTANTS.json [--workers 4] [--month 2026-03] [--corridor hwy1]
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from methodology import AyalonModel
+from sources.corridors import DEFAULT_CORRIDOR_ID
+from sources.history_store import HistoryStore
+
+DEFAULT_CONSTANTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "LOCKED_CONSTANTS.json")
+
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _log(level: str, event: str, **kw: Any) -> None:
+    """Emit a structured JSON log line (same shape as collector.py)."""
+    entry = {
+        "ts": _utc_now_iso(),
+        "level": level,
+        "event": event,
+        **{k: v for k, v in kw.items() if v is not None},
+    }
+    print(json.dumps(entry, default=str), flush=True)
+
+
+def _month_bounds(month: str) -> tuple[str, str]:
+    """Return ISO [start, end) bounds for a 'YYYY-MM' month."""
+    year, mon = (int(x) for x in month.split("-"))
+    nxt = f"{year + 1:04d}-01" if mon == 12 else f"{year:04d}-{mon + 1:02d}"
+    return f"{month}-01T00:00:00", f"{nxt}-01T00:00:00"
+
+
+def replay_month(
+    db_path: Optional[str], month: str, constants_path: str, corridor_id: Optional[str] = DEFAULT_CORRIDOR_ID,
+) -> List[Dict[str, Any]]:
+    """Recompute every stored run of *corridor_id* in *month*; returns replay_results rows.
+
+    Runs in a worker process: opens its own read connection and model.
+    """
+    store = HistoryStore(db_path)
+    model = AyalonModel.from_constants_file(constants_path)
+    start, end = _month_bounds(month)
+    cols = store.fetch_inputs_columnar(start, end, corridor_id=corridor_id)
+    run_ids = cols["pipeline_run_id"]
+    if not run_ids:
+        return []
+
+    # Runs without a stored price cannot be priced; replay physics only.
+    prices = [p if p is not None else float("nan") for p in cols["p_fuel_ils_per_l"]]
+    out = model.run_model_batch(
+        cols["run_index"],
+        cols["length_km"],
+        cols["observed_travel_time_s"],
+        cols["vehicle_count"],
+        p_fuel_ils_per_l=prices,
+    )
+
+    rows = []
+    for i, run_index in enumerate(out["snapshot_ids"]):
+        leakage = float(out["leakage_ils"][i])
+        rows.append({
+            "pipeline_run_id": run_ids[int(run_index)],
+            "constants_version": model.constants_version,
+            "model_version": model.model_version,
+            "delta_T_total_h": float(out["delta_T_total_h"][i]),
+            "fuel_excess_L": float(out["fuel_excess_L"][i]),
+            "leakage_ils": leakage if leakage == leakage else None,
+            "co2_emissions_kg": float(out["co2_emissions_kg"][i]),
+        })
+    return rows
+
+
+def replay_history(
+    constants_path: str = DEFAULT_CONSTANTS_PATH,
+    db_path: Optional[str] = None,
+    workers: Optional[int] = None,
+    months: Optional[List[str]] = None,
+    corridor_id: Optional[str] = DEFAULT_CORRIDOR_ID,
+) -> Dict[str, Any]:
+    """Replay all (or selected) months of a corridor (None = every corridor) in a
+    process pool and store the results.
+
+    Returns a summary with run counts and throughput (runs/second).
+    """
+    store = HistoryStore(db_path)
+    db_path = str(store.db_path)
+    constants_version = AyalonModel.from_constants_file(constants_path).constants_version
+    months = months or store.list_input_months(corridor_id)
+
+    t0 = time.perf_counter()
+    runs_total = 0
+    per_month: Dict[str, int] = {}
+    if months:
+        max_workers = max(1, min(workers or os.cpu_count() or 1, len(months)))
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(replay_month, db_path, m, constants_path, corridor_id): m for m in months}
+            for fut in as_completed(futures):
+                rows = fut.result()
+                # Single writer: SQLite writes stay in the parent process.
+                store.record_replay_results(rows)
+                per_month[futures[fut]] = len(rows)
+                runs_total += len(rows)
+    elapsed_s = time.perf_counter() - t0
+
+    return {
+        "constants_version": constants_version,
+        "corridor_id": corridor_id,
+        "months": len(months),
+        "runs": runs_total,
+        "runs_per_month": dict(sorted(per_month.items())),
+        "elapsed_s": round(elapsed_s, 3),
+        "runs_per_s": round(runs_total / elapsed_s, 1) if elapsed_s > 0 else None,
+    }
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Ayalon monitor: replay history under new constants")
+    p.add_argument("--constants", default=DEFAULT_CONSTANTS_PATH, help="Path to a LOCKED_CONSTANTS.json-style file")
+    p.add_argument("--db", default=None, help="SQLite history DB (default: HISTORY_DB_PATH or data/monitor.sqlite3)")
+    p.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    p.add_argument("--month", action="append", default=None, help="Replay only this YYYY-MM month (repeatable)")
+    p.add_argument("--corridor", default=DEFAULT_CORRIDOR_ID, help=f"Corridor to replay (default: {DEFAULT_CORRIDOR_ID})")
+    p.add_argument("--all-corridors", action="store_true", help="Replay every corridor")
+    args = p.parse_args()
+
+    corridor_id = None if args.all_corridors else args.corridor
+    _log("INFO", "replay_start", constants=args.constants, corridor_id=corridor_id)
+    summary = replay_history(args.constants, db_path=args.db, workers=args.workers, months=args.month,
+                             corridor_id=corridor_id)
+    _log("INFO", "replay_complete", **summary)
+    print(f"OK  constants={summary['constants_version']}  runs={summary['runs']}  "
+          f"months={summary['months']}  {summary['runs_per_s']} runs/s", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -6,14 +6,21 @@ import os
 import json
 from sources import tomtom, sviva
 from sources.fuel_govil import fetch_current_fuel_price_ils_per_l as fetch_current_fuel_price
+from sources.serialization import get_serializer
 
 OUTDIR = 'raw'
 import pathlib
 pathlib.Path(OUTDIR).mkdir(exist_ok=True)
 
-def dump(name, obj):
-    with open(f"{OUTDIR}/{name}.json", 'w', encoding='utf-8') as f:
-        json.dump(obj, f, ensure_ascii=False, indent=2)
+def dump(name, obj, serializer=None):
+    """Write raw/<name>.json, or raw/<name>.bin with a binary REPRODUCE_SERIALIZER (e.g. marshal+zlib)."""
+    ser = get_serializer(serializer or os.getenv('REPRODUCE_SERIALIZER', 'json'))
+    if not ser.binary:
+        with open(f"{OUTDIR}/{name}.json", 'w', encoding='utf-8') as f:
+            json.dump(obj, f, ensure_ascii=False, indent=2)
+        return
+    with open(f"{OUTDIR}/{name}{ser.suffix}", 'wb') as f:
+        f.write(ser.dumps(obj))
 
 if __name__ == '__main__':
     api_key = os.getenv('TOMTOM_API_KEY')
@@ -2,8 +2,7 @@ import os
 from datetime import datetime, timezone
 from typing import Any, Dict, Optional, Tuple
 
-import requests
-
+from . import transport
 from .cache import cache_read, cache_write
 from . import sviva
 
@@ -29,7 +28,7 @@ def _open_meteo_air_quality(lat: float, lon: float, timeout_s: int = 20) -> Dict
         "hourly": hourly,
         "timezone": "UTC",
     }
-    r = requests.get(url, params=params, timeout=timeout_s)
+    r = transport.get(url, params=params, timeout=timeout_s)
     r.raise_for_status()
     js = r.json()
 
@@ -1,25 +1,343 @@
+"""File-based JSON cache shared by the source adapters.
+
+Each entry is ``<CACHE_DIR>/<name>.json`` holding ``{ts, data}`` (``.bin``
+with a binary ``CACHE_SERIALIZER``, see :mod:`sources.serialization`).  Parsed
+entries are also kept in a bounded in-process LRU, revalidated against the
+file's mtime, size and inode on every read, so a process that re-reads the
+same keys (the UI, a long-running collector) pays one ``stat()`` per hit.
+Objects returned by :func:`cache_read` are shared with that tier: treat them
+as read-only and copy before modifying.
+
+Writes go to a temp file that is fsynced and renamed over the entry, so
+readers in any process never see a torn file and need no lock; concurrent
+writers of one entry serialize on one of ``CACHE_WRITE_LOCK_STRIPES`` lock
+files ``<LOCK_DIR>/write-<n>.wlock`` picked by a stable hash of the name, so the
+lock directory stays bounded however many keys are written.
+
+With ``CACHE_BACKEND=sqlite`` the same API stores every entry in one indexed
+database instead (see :mod:`sources.cache_sqlite`).  :func:`cache_scan`,
+:func:`cache_evict`, :func:`cache_delete`, :func:`cache_size` and
+:func:`cache_compact` work on either backend; for files, an entry's age is
+its file's mtime.
+
+Configured via env vars:
+  CACHE_BACKEND     — ``files`` (default) or ``sqlite``
+  CACHE_SERIALIZER  — ``json`` (default), ``marshal``, ``msgpack``, each optionally ``+zlib``
+  CACHE_DB_PATH     — database of the sqlite backend (default: <CACHE_DIR>/cache.sqlite3)
+  CACHE_MEM_ENTRIES — entries kept in memory (default: 256, 0 disables)
+  CACHE_WRITE_LOCK_STRIPES — write lock files shared by all keys (default: 32)
+"""
+
 import os
 import json
+import socket
+import tempfile
+import threading
 import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import cache_sqlite, serialization
+from .filelock import FileLock
 
 CACHE_DIR = Path(__file__).parent / "_cache"
 CACHE_DIR.mkdir(exist_ok=True)
+LOCK_DIR = CACHE_DIR / "_locks"
+BACKEND = os.getenv("CACHE_BACKEND", "files").strip().lower()
+SERIALIZER = os.getenv("CACHE_SERIALIZER", serialization.DEFAULT)
+ENTRY_SUFFIXES = (".json", ".bin")
+
+MEM_MAX_ENTRIES = int(os.getenv("CACHE_MEM_ENTRIES", "256"))
+WRITE_LOCK_STRIPES = max(1, int(os.getenv("CACHE_WRITE_LOCK_STRIPES", "32")))
+# 'ts' is taken just before the file is written, so an mtime older than the max
+# age (give or take filesystem timestamp granularity) means the entry expired.
+_MTIME_SLACK_S = 2.0
+
+# key -> (stamp, {ts, data}); the stamp is (mtime_ns, size, inode) for files, (ts, size) for sqlite
+_mem: "OrderedDict[str, Tuple[tuple, Dict[str, Any]]]" = OrderedDict()
+_mem_lock = threading.Lock()
+_mem_counters = {"hits": 0, "misses": 0, "evictions": 0}
+# Last successful read of each entry by this process; with file atimes, the recency used for LRU eviction.
+_read_at: Dict[str, float] = {}
+
+
+def _mem_get(key: str, stamp: tuple) -> Optional[Dict[str, Any]]:
+    with _mem_lock:
+        hit = _mem.get(key)
+        if hit is not None and hit[0] == stamp:
+            _mem.move_to_end(key)
+            _mem_counters["hits"] += 1
+            return hit[1]
+        _mem_counters["misses"] += 1
+        return None
+
+
+def _mem_put(key: str, stamp: tuple, payload: Dict[str, Any]) -> None:
+    if MEM_MAX_ENTRIES <= 0:
+        return
+    with _mem_lock:
+        _mem[key] = (stamp, payload)
+        _mem.move_to_end(key)
+        while len(_mem) > MEM_MAX_ENTRIES:
+            _mem.popitem(last=False)
+            _mem_counters["evictions"] += 1
+
+
+def _mem_forget(key: str) -> None:
+    with _mem_lock:
+        _mem.pop(key, None)
+
+
+def mem_stats() -> Dict[str, int]:
+    """Snapshot of the memory tier's counters and size."""
+    with _mem_lock:
+        return {**_mem_counters, "entries": len(_mem), "max_entries": MEM_MAX_ENTRIES}
+
+
+def mem_reset() -> None:
+    """Drop the memory tier and zero its counters (tests, config reload)."""
+    with _mem_lock:
+        _mem.clear()
+        _read_at.clear()
+        for k in _mem_counters:
+            _mem_counters[k] = 0
+
+
+def _write_atomic(path: Path, blob: bytes) -> None:
+    """Write *blob* to a temp file beside *path*, fsync it and rename it over *path*."""
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _write_lock(name: str) -> FileLock:
+    # crc32, not hash(): every process must map a name to the same stripe.
+    stripe = zlib.crc32(name.encode("utf-8")) % WRITE_LOCK_STRIPES
+    return FileLock(LOCK_DIR / f"write-{stripe:02d}.wlock")
+
+
+def _db_path() -> Path:
+    return Path(os.getenv("CACHE_DB_PATH") or CACHE_DIR / "cache.sqlite3")
+
+
+def _use_sqlite() -> bool:
+    if BACKEND not in ("files", "sqlite"):
+        raise ValueError(f"cache: unknown CACHE_BACKEND {BACKEND!r} (expected files or sqlite)")
+    return BACKEND == "sqlite"
 
 
 def cache_write(name: str, data: dict):
-    path = CACHE_DIR / f"{name}.json"
-    payload = {'ts': time.time(), 'data': data}
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(payload, f)
+    if _use_sqlite():
+        db = _db_path()
+        cache_sqlite.put(db, name, time.time(), serialization.get_serializer(SERIALIZER).dumps(data))
+        _mem_forget(f"{db}::{name}")
+        return
+    # Serialized per entry so that racing writers leave the newest 'ts' on disk.
+    ser = serialization.get_serializer(SERIALIZER)
+    path = CACHE_DIR / f"{name}{ser.suffix}"
+    with _write_lock(name):
+        _write_atomic(path, ser.dumps({'ts': time.time(), 'data': data}))
+        # Drop the entry's copy in the other format, if the serializer was switched.
+        for suffix in ENTRY_SUFFIXES:
+            if suffix != ser.suffix:
+                try:
+                    (CACHE_DIR / f"{name}{suffix}").unlink()
+                except FileNotFoundError:
+                    pass
+    # The caller keeps *data*; the next read re-parses the file instead of sharing it.
+    _mem_forget(str(path))
+
+
+def _sqlite_read(name: str, max_age_s: int):
+    db = _db_path()
+    key = f"{db}::{name}"
+    row_stamp = cache_sqlite.stamp(db, name)
+    if row_stamp is None:
+        _mem_forget(key)
+        return None
+    stamp, atime = row_stamp[:2], row_stamp[2]
+    now = time.time()
+    if now - stamp[0] > max_age_s:
+        return None
+    payload = _mem_get(key, stamp)
+    if payload is None:
+        row = cache_sqlite.get(db, name)
+        if row is None:
+            return None
+        try:
+            payload = {'ts': row[0], 'data': serialization.loads_any(row[2])}
+        except ValueError:
+            return None  # corrupt entry: a miss, the next write replaces it
+        _mem_put(key, row[:2], payload)
+    _read_at[name] = now
+    if now - (atime or 0.0) >= cache_sqlite.ATIME_RESOLUTION_S:
+        cache_sqlite.touch(db, name, now)
+    return payload['data']
 
 
 def cache_read(name: str, max_age_s: int = 300):
-    path = CACHE_DIR / f"{name}.json"
-    if not path.exists():
+    if _use_sqlite():
+        return _sqlite_read(name, max_age_s)
+    own = serialization.get_serializer(SERIALIZER).suffix
+    # Entries written before a serializer switch stay readable until rewritten.
+    for suffix in (own, *(x for x in ENTRY_SUFFIXES if x != own)):
+        path = CACHE_DIR / f"{name}{suffix}"
+        try:
+            st = path.stat()
+            break
+        except FileNotFoundError:
+            _mem_forget(str(path))
+    else:
+        return None
+    now = time.time()
+    if now - st.st_mtime > max_age_s + _MTIME_SLACK_S:
         return None
-    with open(path, 'r', encoding='utf-8') as f:
-        payload = json.load(f)
-    if time.time() - payload.get('ts', 0) > max_age_s:
+    key, stamp = str(path), (st.st_mtime_ns, st.st_size, st.st_ino)
+    payload = _mem_get(key, stamp)
+    if payload is None:
+        try:
+            with open(path, 'rb') as f:
+                payload = serialization.loads_any(f.read())
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            # Torn file from a writer that predates atomic writes, or a corrupt
+            # binary entry (loads_any raises ValueError for both): treat as a miss.
+            return None
+        _mem_put(key, stamp, payload)
+    if now - payload.get('ts', 0) > max_age_s:
         return None
+    _read_at[name] = time.time()
     return payload['data']
+
+
+def _file_entries(prefix: str = "") -> List[Tuple[str, Path, os.stat_result]]:
+    out = []
+    with os.scandir(CACHE_DIR) as it:
+        for e in it:
+            stem, suffix = os.path.splitext(e.name)
+            if suffix in ENTRY_SUFFIXES and stem.startswith(prefix) and not stem.startswith(".") and e.is_file():
+                try:
+                    out.append((stem, Path(e.path), e.stat()))
+                except FileNotFoundError:
+                    pass
+    return sorted(out, key=lambda t: t[0])
+
+
+def cache_scan(prefix: str = "") -> List[Dict[str, Any]]:
+    """[{name, ts, accessed, size_bytes}] of the entries whose name starts with *prefix*, by name.
+
+    ``accessed`` is the latest of the write time, the last read recorded by
+    any process (the file's atime, as far as the mount updates it, or the
+    sqlite ``atime`` column) and this process's last read.
+    """
+    if _use_sqlite():
+        return [{"name": n, "ts": ts, "accessed": max(ts, atime or 0.0, _read_at.get(n, 0.0)), "size_bytes": size}
+                for n, ts, size, atime in cache_sqlite.scan(_db_path(), prefix)]
+    return [{"name": n, "ts": st.st_mtime, "accessed": max(st.st_mtime, st.st_atime, _read_at.get(n, 0.0)),
+             "size_bytes": st.st_size} for n, _p, st in _file_entries(prefix)]
+
+
+def cache_delete(*names: str) -> int:
+    """Remove entries by name; returns how many existed."""
+    for n in names:
+        _read_at.pop(n, None)
+    if _use_sqlite():
+        db = _db_path()
+        for n in names:
+            _mem_forget(f"{db}::{n}")
+        return cache_sqlite.delete(db, list(names))
+    removed = 0
+    for n in names:
+        found = False
+        for suffix in ENTRY_SUFFIXES:
+            path = CACHE_DIR / f"{n}{suffix}"
+            _mem_forget(str(path))
+            try:
+                path.unlink()
+                found = True
+            except FileNotFoundError:
+                pass
+        removed += found
+    return removed
+
+
+def cache_evict(older_than_s: float, prefix: str = "") -> int:
+    """Remove every entry (whose name starts with *prefix*) written more than *older_than_s* ago."""
+    cutoff = time.time() - older_than_s
+    if _use_sqlite():
+        # Stale memory entries fail their stamp check on the next read.
+        return cache_sqlite.evict_older_than(_db_path(), cutoff, prefix)
+    return cache_delete(*(n for n, _p, st in _file_entries(prefix) if st.st_mtime < cutoff))
+
+
+def cache_size() -> Dict[str, Any]:
+    """Entry count, payload bytes and bytes on disk of the active backend.
+
+    For files both byte counts are the entries' file sizes; the sqlite
+    database file also holds free pages and the write-ahead log.
+    """
+    if _use_sqlite():
+        n, total = cache_sqlite.size(_db_path())
+        on_disk = cache_sqlite.file_size(_db_path())
+    else:
+        entries = _file_entries()
+        n, total = len(entries), sum(st.st_size for _n, _p, st in entries)
+        on_disk = total
+    return {"backend": BACKEND, "entries": n, "bytes": total, "file_bytes": on_disk}
+
+
+def cache_compact() -> None:
+    """Give the space freed by deletes back to the filesystem (sqlite backend; no-op for files)."""
+    if _use_sqlite():
+        cache_sqlite.compact(_db_path())
+
+
+def inflight_info(name: str):
+    """Return the in-flight marker of a refresh of *name* ({pid, host, started_at}), or None."""
+    try:
+        with open(LOCK_DIR / f"{name}.inflight", 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+@contextmanager
+def single_flight(name: str, wait_s: float):
+    """Hold the refresh of cache entry *name* exclusively, across processes.
+
+    Yields True if another caller was refreshing it and we waited for it to
+    finish (re-read the cache before fetching: it is likely fresh now), False
+    if we got it straight away.  Raises TimeoutError after *wait_s* seconds.
+    While held, an in-flight marker records who is refreshing.
+    """
+    lock = FileLock(LOCK_DIR / f"{name}.lock")
+    waited = False
+    if not lock.acquire(timeout_s=0):
+        waited = True
+        if not lock.acquire(timeout_s=wait_s):
+            raise TimeoutError(f"cache: refresh of {name} still in flight after {wait_s:.0f}s: {inflight_info(name)}")
+    marker = LOCK_DIR / f"{name}.inflight"
+    try:
+        with open(marker, 'w', encoding='utf-8') as f:
+            json.dump({'pid': os.getpid(), 'host': socket.gethostname(), 'started_at': time.time()}, f)
+        yield waited
+    finally:
+        try:
+            marker.unlink()
+        except FileNotFoundError:
+            pass
+        lock.release()
@@ -0,0 +1,218 @@
+"""Size-budgeted eviction for :mod:`sources.cache`.
+
+Keeps the cache under a byte and an entry budget by evicting entries in LRU
+(``lru``) or oldest-written-first (``oldest``) order.  Recency comes from
+reads by any process: file atimes, or the sqlite backend's ``atime`` column
+(kept to within a minute).  The byte budget counts payload bytes; with
+``CACHE_BACKEND=sqlite`` a sweep that evicts also compacts the database so the
+file shrinks with it, and :func:`budget_status` reports the file size as
+``file_bytes``.  Entries the pipeline
+depends on across outages are never evicted (see :data:`PROTECTED`): the
+corridor aggregates, fuel price and air quality behind the collector's stale
+fallbacks, the TomTom daily call counter and the probe scheduler state.
+
+A sweep also clears the in-flight markers in ``_locks/`` left by refreshes
+that crashed: markers older than the single-flight timeout whose lock nobody
+holds any more.
+
+The collector runs a sweep at the end of every cycle, bounded by
+``CACHE_JANITOR_BUDGET_MS``; a sweep that runs out of time stops and the
+next one carries on.  Standalone::
+
+    python -m sources.cache_janitor                    # enforce the budgets
+    python -m sources.cache_janitor --dry-run --policy oldest --max-bytes 50000000
+
+Configured via env vars:
+  CACHE_MAX_BYTES          — byte budget (default: 100000000)
+  CACHE_MAX_ENTRIES        — entry budget (default: 10000)
+  CACHE_EVICTION_POLICY    — ``lru`` (default) or ``oldest``
+  CACHE_JANITOR_BUDGET_MS  — time budget of the collector's inline sweep (default: 200, 0 disables)
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from . import cache
+from .filelock import FileLock
+from .tomtom import SINGLE_FLIGHT_WAIT_S
+
+MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(100_000_000)))
+MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+POLICY = os.getenv("CACHE_EVICTION_POLICY", "lru").strip().lower()
+INLINE_BUDGET_MS = int(os.getenv("CACHE_JANITOR_BUDGET_MS", "200"))
+POLICIES = ("lru", "oldest")
+
+PROTECTED = (
+    re.compile(r"tomtom_.+_v4_abs10_[a-z]+"),   # corridor aggregates (tomtom._aggregate_cache_key)
+    re.compile(r"fuel_govil"),                  # fuel_govil.CACHE_KEY
+    re.compile(r"air_quality_ayalon"),          # air_quality cache / get_cached_air_quality
+    re.compile(r"tt_scheduler_state"),          # scheduler.STATE_CACHE_KEY
+    re.compile(r"_rate_limiter_daily"),         # rate_limiter daily counter file
+)
+
+DELETE_BATCH = 64
+STRAY_TEMP_AGE_S = 3600.0  # temp files of writes that crashed before their rename
+INFLIGHT_STALE_S = SINGLE_FLIGHT_WAIT_S  # no live refresh keeps its marker longer than a waiter waits
+
+
+def is_protected(name: str) -> bool:
+    return any(p.fullmatch(name) for p in PROTECTED)
+
+
+def _remove_stray_temp_files(deadline: float) -> int:
+    removed = 0
+    cutoff = time.time() - STRAY_TEMP_AGE_S
+    try:
+        it = os.scandir(cache.CACHE_DIR)
+    except FileNotFoundError:
+        return 0
+    with it:
+        for e in it:
+            if time.monotonic() >= deadline:
+                break
+            if e.name.startswith(".") and e.name.endswith(".tmp"):
+                try:
+                    if e.stat().st_mtime < cutoff:
+                        os.unlink(e.path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+    return removed
+
+
+def _remove_stale_inflight_markers(deadline: float) -> int:
+    removed = 0
+    cutoff = time.time() - INFLIGHT_STALE_S
+    for marker in list(cache.LOCK_DIR.glob("*.inflight")):
+        if time.monotonic() >= deadline:
+            break
+        try:
+            if marker.stat().st_mtime >= cutoff:
+                continue
+        except FileNotFoundError:
+            continue
+        lock = FileLock(marker.with_suffix(".lock"))
+        if not lock.acquire(timeout_s=0):
+            continue  # a refresh is still running
+        try:
+            marker.unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+        finally:
+            lock.release()
+    return removed
+
+
+def sweep(
+    max_bytes: Optional[int] = None,
+    max_entries: Optional[int] = None,
+    policy: Optional[str] = None,
+    time_budget_s: Optional[float] = None,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """Evict unprotected entries until the cache fits both budgets.
+
+    Returns a summary; ``status`` is ``ok``, ``budget_exhausted`` (stopped on
+    *time_budget_s*, the rest is left to the next sweep) or ``busy`` (another
+    sweep holds the janitor lock).  ``over_budget`` is still True afterwards
+    when the protected entries alone exceed a budget.
+    """
+    t0 = time.monotonic()
+    deadline = t0 + time_budget_s if time_budget_s is not None else float("inf")
+    max_bytes = MAX_BYTES if max_bytes is None else int(max_bytes)
+    max_entries = MAX_ENTRIES if max_entries is None else int(max_entries)
+    policy = (policy or POLICY).lower()
+    if policy not in POLICIES:
+        raise ValueError(f"cache_janitor: unknown eviction policy {policy!r} (expected lru or oldest)")
+
+    lock = FileLock(cache.LOCK_DIR / "janitor.lock")
+    if not lock.acquire(timeout_s=0):
+        return {"status": "busy"}
+    try:
+        entries = cache.cache_scan()
+        total_bytes = sum(e["size_bytes"] for e in entries)
+        total = len(entries)
+        candidates = [e for e in entries if not is_protected(e["name"])]
+        candidates.sort(key=lambda e: e["accessed" if policy == "lru" else "ts"])
+
+        victims: List[Dict[str, Any]] = []
+        for e in candidates:
+            if total_bytes <= max_bytes and total <= max_entries:
+                break
+            victims.append(e)
+            total_bytes -= e["size_bytes"]
+            total -= 1
+
+        status, evicted, freed = "ok", 0, 0
+        for i in range(0, len(victims), DELETE_BATCH):
+            if time.monotonic() >= deadline:
+                status = "budget_exhausted"
+                break
+            batch = victims[i:i + DELETE_BATCH]
+            if not dry_run:
+                cache.cache_delete(*(e["name"] for e in batch))
+            evicted += len(batch)
+            freed += sum(e["size_bytes"] for e in batch)
+        if evicted and not dry_run:
+            cache.cache_compact()
+        temp_removed = 0 if dry_run or cache.BACKEND == "sqlite" else _remove_stray_temp_files(deadline)
+        inflight_removed = 0 if dry_run else _remove_stale_inflight_markers(deadline)
+
+        entries_left = len(entries) - evicted
+        bytes_left = sum(e["size_bytes"] for e in entries) - freed
+        return {
+            "status": status,
+            "policy": policy,
+            "dry_run": dry_run,
+            "evicted": evicted,
+            "bytes_freed": freed,
+            "temp_files_removed": temp_removed,
+            "inflight_removed": inflight_removed,
+            "entries": entries_left,
+            "bytes": bytes_left,
+            "protected": len(entries) - len(candidates),
+            "over_budget": bytes_left > max_bytes or entries_left > max_entries,
+            "elapsed_ms": round((time.monotonic() - t0) * 1000.0, 1),
+        }
+    finally:
+        lock.release()
+
+
+def budget_status() -> Dict[str, Any]:
+    """Current cache size against the budgets (no eviction)."""
+    size = cache.cache_size()
+    return {
+        **size,
+        "max_bytes": MAX_BYTES,
+        "max_entries": MAX_ENTRIES,
+        "over_budget": size["bytes"] > MAX_BYTES or size["entries"] > MAX_ENTRIES,
+    }
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Evict cache entries until sources/_cache fits its byte and entry budgets")
+    p.add_argument("--max-bytes", type=int, help=f"Byte budget (default: CACHE_MAX_BYTES={MAX_BYTES})")
+    p.add_argument("--max-entries", type=int, help=f"Entry budget (default: CACHE_MAX_ENTRIES={MAX_ENTRIES})")
+    p.add_argument("--policy", choices=POLICIES, help=f"Eviction order (default: CACHE_EVICTION_POLICY={POLICY})")
+    p.add_argument("--budget-ms", type=float, help="Stop after this many milliseconds (default: no limit)")
+    p.add_argument("--dry-run", action="store_true", help="Report what would be evicted without deleting")
+    args = p.parse_args()
+
+    result = sweep(
+        max_bytes=args.max_bytes,
+        max_entries=args.max_entries,
+        policy=args.policy,
+        time_budget_s=args.budget_ms / 1000.0 if args.budget_ms is not None else None,
+        dry_run=args.dry_run,
+    )
+    print(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
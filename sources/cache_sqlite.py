@@ -0,0 +1,151 @@
+"""Single-file SQLite backend for :mod:`sources.cache` (``CACHE_BACKEND=sqlite``).
+
+All entries live in one database instead of one JSON file per key::
+
+    entries(name TEXT PRIMARY KEY, ts REAL, size INTEGER, data,  -- serialized payload
+            atime REAL)                 -- last read, at most ATIME_RESOLUTION_S stale
+    idx_entries_ts ON entries(ts)       -- age / TTL scans
+
+``name`` is the primary key, so prefix scans are range scans on its index, and
+eviction by age is a range delete on ``ts``.  The database runs in WAL mode:
+readers never block the writer, and concurrent writers wait on the busy
+timeout.  Each thread of each process keeps its own connection.
+
+``atime`` persists reads across processes (LRU eviction of ``--once`` runs);
+a read only writes it back when the stored value is older than
+ATIME_RESOLUTION_S.  New databases use ``auto_vacuum=INCREMENTAL``, so
+:func:`compact` returns the pages freed by deletes to the filesystem;
+databases created before that keep their size until a one-off ``VACUUM``.
+"""
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+BUSY_TIMEOUT_S = 30.0
+ATIME_RESOLUTION_S = 60.0
+
+_local = threading.local()
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    cons: Dict[Tuple[int, str], sqlite3.Connection] = getattr(_local, "cons", None)
+    if cons is None:
+        cons = _local.cons = {}
+    key = (os.getpid(), str(path))  # never reuse a connection across fork()
+    con = cons.get(key)
+    if con is None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT_S, isolation_level=None)
+        con.execute("PRAGMA auto_vacuum=INCREMENTAL")  # only takes effect on a new database
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                name TEXT PRIMARY KEY,
+                ts REAL NOT NULL,
+                size INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                atime REAL
+            )
+            """
+        )
+        if "atime" not in {r[1] for r in con.execute("PRAGMA table_info(entries)")}:
+            con.execute("ALTER TABLE entries ADD COLUMN atime REAL")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_entries_ts ON entries(ts)")
+        cons[key] = con
+    return con
+
+
+def _prefix_range(prefix: str) -> Tuple[str, Optional[str]]:
+    """[lo, hi) bounds of the names starting with *prefix* (hi None = unbounded)."""
+    if not prefix:
+        return "", None
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _where_prefix(prefix: str) -> Tuple[str, Tuple[str, ...]]:
+    lo, hi = _prefix_range(prefix)
+    if hi is None:
+        return "name >= ?", (lo,)
+    return "name >= ? AND name < ?", (lo, hi)
+
+
+def stamp(path: Path, name: str) -> Optional[Tuple[float, int, Optional[float]]]:
+    """(ts, size, atime) of entry *name* without loading its data, or None."""
+    row = _connect(path).execute("SELECT ts, size, atime FROM entries WHERE name = ?", (name,)).fetchone()
+    return (row[0], row[1], row[2]) if row else None
+
+
+def touch(path: Path, name: str, now: float) -> None:
+    """Record a read of *name* unless its stored atime is within ATIME_RESOLUTION_S of *now*."""
+    _connect(path).execute(
+        "UPDATE entries SET atime = ? WHERE name = ? AND COALESCE(atime, 0) < ?",
+        (now, name, now - ATIME_RESOLUTION_S),
+    )
+
+
+def get(path: Path, name: str) -> Optional[Tuple[float, int, Union[bytes, str]]]:
+    row = _connect(path).execute("SELECT ts, size, data FROM entries WHERE name = ?", (name,)).fetchone()
+    return (row[0], row[1], row[2]) if row else None
+
+
+def put(path: Path, name: str, ts: float, blob: Union[bytes, str]) -> None:
+    # Racing writers keep the newest ts, as with the file backend's write lock.
+    _connect(path).execute(
+        """
+        INSERT INTO entries (name, ts, size, data) VALUES (?, ?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET ts = excluded.ts, size = excluded.size, data = excluded.data
+        WHERE excluded.ts >= entries.ts
+        """,
+        (name, ts, len(blob.encode("utf-8") if isinstance(blob, str) else blob), blob),
+    )
+
+
+def delete(path: Path, names: List[str]) -> int:
+    con = _connect(path)
+    with con:
+        con.execute("BEGIN IMMEDIATE")
+        return sum(con.execute("DELETE FROM entries WHERE name = ?", (n,)).rowcount for n in names)
+
+
+def scan(path: Path, prefix: str = "") -> List[Tuple[str, float, int, Optional[float]]]:
+    """(name, ts, size, atime) of every entry whose name starts with *prefix*, by name."""
+    where, args = _where_prefix(prefix)
+    return [tuple(r) for r in _connect(path).execute(
+        f"SELECT name, ts, size, atime FROM entries WHERE {where} ORDER BY name", args)]
+
+
+def evict_older_than(path: Path, cutoff_ts: float, prefix: str = "") -> int:
+    where, args = _where_prefix(prefix)
+    con = _connect(path)
+    with con:
+        con.execute("BEGIN IMMEDIATE")
+        return con.execute(f"DELETE FROM entries WHERE ts < ? AND {where}", (cutoff_ts, *args)).rowcount
+
+
+def size(path: Path) -> Tuple[int, int]:
+    """(entries, payload bytes)."""
+    n, total = _connect(path).execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+    return int(n), int(total)
+
+
+def file_size(path: Path) -> int:
+    """Bytes the database takes on disk (main file and write-ahead log)."""
+    total = 0
+    for p in (path, path.with_name(path.name + "-wal")):
+        try:
+            total += p.stat().st_size
+        except FileNotFoundError:
+            pass
+    return total
+
+
+def compact(path: Path) -> None:
+    """Return free pages to the filesystem and truncate the write-ahead log."""
+    con = _connect(path)
+    con.execute("PRAGMA incremental_vacuum").fetchall()  # frees pages as the statement steps
+    con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
@@ -0,0 +1,77 @@
+"""Corridor registry: which road corridors the collector monitors.
+
+The registry is a JSON file (default: ``corridors.json`` at the repo root,
+override with ``CORRIDORS_CONFIG``)::
+
+    {"corridors": [
+        {"id": "ayalon", "name": "Highway 20 (Ayalon)", "enabled": true,
+         "probes": [{"id": "la_guardia", "lat": 32.038, "lon": 34.782}, ...],
+         "path": [[32.030, 34.779], ...],      # optional: centreline for TRAFFIC_MODE=tiles
+         "road_types": ["Motorway"]}           # optional: tile road_type filter
+    ]}
+
+If the file is absent, the registry holds only Ayalon with
+``sources.tomtom.PROBE_POINTS`` so existing deployments keep working.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_CORRIDOR_ID = "ayalon"
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parent.parent / "corridors.json"
+
+
+def _config_path() -> Path:
+    env = os.getenv("CORRIDORS_CONFIG")
+    return Path(env) if env else DEFAULT_CONFIG_PATH
+
+
+def _validate(c: Dict[str, Any]) -> Dict[str, Any]:
+    cid = str(c.get("id") or "").strip()
+    if not cid or not cid.replace("_", "").isalnum():
+        raise ValueError(f"corridors: invalid corridor id {c.get('id')!r} (use [A-Za-z0-9_])")
+    probes = c.get("probes")
+    if not isinstance(probes, list) or not probes:
+        raise ValueError(f"corridors: corridor {cid!r} has no probes")
+    seen = set()
+    for p in probes:
+        if not isinstance(p, dict) or "id" not in p or "lat" not in p or "lon" not in p:
+            raise ValueError(f"corridors: corridor {cid!r} has a probe without id/lat/lon: {p!r}")
+        if p["id"] in seen:
+            raise ValueError(f"corridors: duplicate probe id {p['id']!r} in corridor {cid!r}")
+        seen.add(p["id"])
+    out = {
+        "id": cid,
+        "name": c.get("name") or cid,
+        "probes": [{"id": str(p["id"]), "lat": float(p["lat"]), "lon": float(p["lon"])} for p in probes],
+    }
+    # Optional, for TRAFFIC_MODE=tiles (see sources.tomtom_tiles)
+    path = c.get("path")
+    if path is not None:
+        if not isinstance(path, list) or len(path) < 2 or any(not isinstance(pt, (list, tuple)) or len(pt) != 2 for pt in path):
+            raise ValueError(f"corridors: corridor {cid!r} path must be a list of at least two [lat, lon] points")
+        out["path"] = [[float(lat), float(lon)] for lat, lon in path]
+    if c.get("road_types"):
+        out["road_types"] = [str(t) for t in c["road_types"]]
+    return out
+
+
+def load_corridors(path: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """Return the enabled corridors from the registry (validated)."""
+    path = Path(path) if path else _config_path()
+    if not path.exists():
+        from .tomtom import PROBE_POINTS
+
+        return [{"id": DEFAULT_CORRIDOR_ID, "name": "Highway 20 (Ayalon)", "probes": list(PROBE_POINTS)}]
+
+    with open(path, "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+    corridors = [_validate(c) for c in cfg.get("corridors") or [] if c.get("enabled", True)]
+    ids = [c["id"] for c in corridors]
+    if len(ids) != len(set(ids)):
+        raise ValueError(f"corridors: duplicate corridor ids in {path}")
+    if not corridors:
+        raise ValueError(f"corridors: no enabled corridors in {path}")
+    return corridors
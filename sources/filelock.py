@@ -0,0 +1,92 @@
+"""Advisory inter-process file locks.
+
+    with FileLock(path):                 # blocks
+        ...
+    lock = FileLock(path)
+    if lock.acquire(timeout_s=5):        # bounded wait; False on timeout
+        try: ...
+        finally: lock.release()
+
+Uses ``fcntl.flock`` on POSIX.  flock locks belong to the open file, so two
+threads of one process holding separate FileLock objects on the same path
+exclude each other as well.  Without fcntl (non-POSIX) an exclusive-create
+lock file is used instead; one left behind by a crashed holder is broken
+after ``stale_after_s``.
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None
+
+POLL_S = 0.05
+
+
+class FileLock:
+    def __init__(self, path: Union[str, Path], stale_after_s: float = 300.0):
+        self.path = Path(path)
+        self.stale_after_s = float(stale_after_s)
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def _try_acquire(self) -> bool:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if fcntl is not None:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            self._fd = fd
+            return True
+        try:  # pragma: no cover - non-POSIX
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+            return True
+        except FileExistsError:  # pragma: no cover - non-POSIX
+            try:
+                if time.time() - self.path.stat().st_mtime > self.stale_after_s:
+                    self.path.unlink()
+            except FileNotFoundError:
+                pass
+            return False
+
+    def acquire(self, timeout_s: Optional[float] = None) -> bool:
+        """Take the lock, waiting up to *timeout_s* (None = forever, 0 = try once)."""
+        if self.held:
+            raise RuntimeError(f"filelock: {self.path} already held by this object")
+        deadline = None if timeout_s is None else time.monotonic() + timeout_s
+        while not self._try_acquire():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(POLL_S if deadline is None else max(0.0, min(POLL_S, deadline - time.monotonic())))
+        return True
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        fd, self._fd = self._fd, None
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        else:  # pragma: no cover - non-POSIX
+            os.close(fd)
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
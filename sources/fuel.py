@@ -1,9 +1,9 @@
 import os
 import re
-import requests
 import pandas as pd
 from io import BytesIO
 from datetime import datetime
+from . import transport
 from .cache import cache_read, cache_write
 
 FUEL_PAGE = "https://www.gov.il/en/pages/fuel_prices_xls"
@@ -30,14 +30,14 @@ def fetch_current_fuel_price_ils_per_l():
         except:
             pass
     try:
-        r = requests.get(FUEL_PAGE, timeout=20)
+        r = transport.get(FUEL_PAGE, timeout=20)
         r.raise_for_status()
         links = extract_xls_links(r.text)
         if not links:
             # can't find XLS; return None
             raise RuntimeError('No xls links found')
         xls_url = links[0]
-        fx = requests.get(xls_url, timeout=30)
+        fx = transport.get(xls_url, timeout=30)
         fx.raise_for_status()
         df = pd.read_excel(BytesIO(fx.content))
         # Heuristic: search numeric values and take max as price (best-effort)
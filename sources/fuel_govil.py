@@ -17,8 +17,7 @@ import re
 from datetime import datetime, timezone
 from typing import Optional, Tuple
 
-import requests
-
+from . import transport
 from .cache import cache_read, cache_write
 
 logger = logging.getLogger(__name__)
@@ -171,7 +170,7 @@ def _fetch_from_pdf() -> dict:
             continue
         url = NOTICE_PDF_TEMPLATE.format(month_slug=slug, year=year)
         try:
-            r = requests.get(url, timeout=30)
+            r = transport.get(url, timeout=30)
             if r.status_code == 200:
                 text = _pdf_text_from_bytes(r.content)
                 price = _extract_price_from_text(text)
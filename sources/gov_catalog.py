@@ -18,7 +18,7 @@ import logging
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
-import requests
+from . import transport
 
 logger = logging.getLogger(__name__)
 
@@ -75,7 +75,7 @@ class CkanUnitError(RuntimeError):
 def _ckan_get(action: str, params: Dict[str, Any]) -> Dict[str, Any]:
     """Call a CKAN API action and return the ``result`` payload."""
     url = f"{CKAN_API}/{action}"
-    r = requests.get(url, params=params, timeout=TIMEOUT_S)
+    r = transport.get(url, params=params, timeout=TIMEOUT_S)
     r.raise_for_status()
     body = r.json()
     if not body.get("success"):
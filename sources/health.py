@@ -136,7 +136,7 @@ def compute_traffic_health(db_path: str = None) -> Dict[str, Any]:
 # ── Cache layer status (informational, no external calls) ──────────────
 
 def check_cache_status() -> Dict[str, Any]:
-    """Check cache directory presence and size — purely filesystem."""
+    """Check cache directory presence, size and budget — purely local, no API calls."""
     cache_dir = os.path.join(os.path.dirname(__file__), "_cache")
     cache_ok = os.path.isdir(cache_dir)
     file_count = 0
@@ -145,12 +145,29 @@ def check_cache_status() -> Dict[str, Any]:
             file_count = len(os.listdir(cache_dir))
         except Exception:
             pass
-    return {
+    out = {
         "status": "ok" if cache_ok else "missing",
         "cache_dir": cache_dir,
         "file_count": file_count,
         "writable": cache_ok and os.access(cache_dir, os.W_OK),
     }
+    if cache_ok:
+        try:
+            from .cache_janitor import budget_status
+
+            budget = budget_status()
+            out.update(
+                backend=budget["backend"],
+                entries=budget["entries"],
+                bytes=budget["bytes"],
+                file_bytes=budget["file_bytes"],
+                max_bytes=budget["max_bytes"],
+                max_entries=budget["max_entries"],
+                over_budget=budget["over_budget"],
+            )
+        except Exception as exc:
+            out["size_error"] = str(exc)[:200]
+    return out
 
 
 # ── Aggregated health (replaces old full_health_check) ──────────────────
@@ -5,11 +5,77 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+from .corridors import DEFAULT_CORRIDOR_ID
+
 
 def _utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
+# Counters with running (prefix-sum) totals maintained per row: cum_<counter>
+CUMULATIVE_COUNTERS = ("delta_T_total_h", "fuel_excess_L", "co2_emissions_kg", "leakage_ils")
+
+# Streaming time integration between consecutive runs of a corridor (trapezoidal rule):
+#   span_h            hours integrated for the interval ending at this row (0 across gaps)
+#   int_<counter>     area of that interval, in <counter> x hours
+#   cum_span_h, cum_int_<counter>  running totals of the above
+#   cum_runs          number of runs up to and including this row
+# Intervals longer than the max gap (missed cycles, collector down) are not bridged.
+# All running columns follow each corridor's rows in (recorded_at_utc, id) order.
+DEFAULT_MAX_GAP_S = 30 * 60
+DERIVED_COLUMNS = (
+    *(f"cum_{c}" for c in CUMULATIVE_COUNTERS),
+    "span_h",
+    *(f"int_{c}" for c in CUMULATIVE_COUNTERS),
+    "cum_span_h",
+    *(f"cum_int_{c}" for c in CUMULATIVE_COUNTERS),
+    "cum_runs",
+)
+_CHAIN_COLUMNS = f"id, recorded_at_utc, {', '.join(CUMULATIVE_COUNTERS)}, {', '.join(DERIVED_COLUMNS)}"
+_MISSING_DERIVED = " OR ".join(f"{c} IS NULL" for c in DERIVED_COLUMNS)
+
+
+def _max_gap_s() -> float:
+    try:
+        return float(os.getenv("HISTORY_MAX_GAP_S", str(DEFAULT_MAX_GAP_S)))
+    except Exception:
+        return float(DEFAULT_MAX_GAP_S)
+
+
+def _parse_iso_to_ts(s: Optional[str]) -> Optional[float]:
+    if not s:
+        return None
+    try:
+        return datetime.fromisoformat(str(s).replace("Z", "+00:00")).timestamp()
+    except Exception:
+        return None
+
+
+def _derive(prev: Optional[Dict[str, Any]], recorded_at_utc: str, values: List[Optional[float]], max_gap_s: float) -> List[float]:
+    """Derived columns (see DERIVED_COLUMNS) for a row following *prev* (None for a corridor's first row)."""
+    n = len(CUMULATIVE_COUNTERS)
+    if prev is None:
+        return [(v if v is not None else 0.0) for v in values] + [0.0] * (2 * n + 2) + [1]
+
+    cum = [prev[f"cum_{c}"] + (v if v is not None else 0.0) for c, v in zip(CUMULATIVE_COUNTERS, values)]
+    t0, t1 = _parse_iso_to_ts(prev["recorded_at_utc"]), _parse_iso_to_ts(recorded_at_utc)
+    span_h = 0.0
+    if t0 is not None and t1 is not None and 0.0 <= t1 - t0 <= max_gap_s:
+        span_h = (t1 - t0) / 3600.0
+    area = [
+        0.5 * (prev[c] + v) * span_h if prev[c] is not None and v is not None else 0.0
+        for c, v in zip(CUMULATIVE_COUNTERS, values)
+    ]
+    return [
+        *cum,
+        span_h,
+        *area,
+        prev["cum_span_h"] + span_h,
+        *(prev[f"cum_int_{c}"] + a for c, a in zip(CUMULATIVE_COUNTERS, area)),
+        prev["cum_runs"] + 1,
+    ]
+
+
 def _default_db_path() -> Path:
     # Local persistent store; safe to ignore in git.
     env = os.getenv("HISTORY_DB_PATH")
@@ -35,11 +101,15 @@ class HistoryRow:
     tomtom_age_s: Optional[float]
     air_fetched_at: Optional[str]
     fuel_fetched_at: Optional[str]
+    model_version: Optional[str] = None
+    constants_version: Optional[str] = None
+    corridor_id: str = DEFAULT_CORRIDOR_ID
 
 
 class HistoryStore:
-    def __init__(self, db_path: Optional[Path] = None):
+    def __init__(self, db_path: Optional[Path] = None, max_gap_s: Optional[float] = None):
         self.db_path = Path(db_path) if db_path else _default_db_path()
+        self.max_gap_s = float(max_gap_s) if max_gap_s is not None else _max_gap_s()
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self._init_db()
 
@@ -73,8 +143,118 @@ class HistoryStore:
                 )
                 """
             )
+            self._ensure_columns(con, "runs", {
+                "model_version": "TEXT",
+                "constants_version": "TEXT",
+            })
+            # Rows from before multi-corridor support (and external writers) belong to Ayalon.
+            self._ensure_columns(con, "runs", {"corridor_id": f"TEXT NOT NULL DEFAULT '{DEFAULT_CORRIDOR_ID}'"})
+            added = self._ensure_columns(con, "runs", {c: "INTEGER" if c == "cum_runs" else "REAL" for c in DERIVED_COLUMNS})
+            con.execute("CREATE INDEX IF NOT EXISTS idx_runs_recorded_at ON runs(recorded_at_utc)")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_runs_corridor_recorded ON runs(corridor_id, recorded_at_utc)")
+            if added:
+                self._backfill_cumulative(con)
+            # Canonical model inputs per run (enables replay under new constants)
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS run_inputs (
+                    pipeline_run_id TEXT PRIMARY KEY,
+                    recorded_at_utc TEXT NOT NULL,
+                    p_fuel_ils_per_l REAL
+                )
+                """
+            )
+            con.execute("CREATE INDEX IF NOT EXISTS idx_run_inputs_recorded ON run_inputs(recorded_at_utc)")
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS run_segments (
+                    pipeline_run_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    segment_id TEXT,
+                    length_km REAL NOT NULL,
+                    observed_travel_time_s REAL NOT NULL,
+                    vehicle_count REAL NOT NULL,
+                    PRIMARY KEY(pipeline_run_id, seq)
+                )
+                """
+            )
+            # Content addresses of the raw provider payload / polyline (see sources.provenance)
+            self._ensure_columns(con, "run_segments", {"raw_ref": "TEXT", "polyline_ref": "TEXT"})
+            # Monte Carlo uncertainty bands per run and counter (optional)
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS run_uncertainty (
+                    pipeline_run_id TEXT NOT NULL,
+                    counter TEXT NOT NULL,
+                    p5 REAL,
+                    p50 REAL,
+                    p95 REAL,
+                    n_samples INTEGER,
+                    PRIMARY KEY(pipeline_run_id, counter)
+                )
+                """
+            )
+            # Model outputs recomputed under other constant sets (see replay.py)
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS replay_results (
+                    pipeline_run_id TEXT NOT NULL,
+                    constants_version TEXT NOT NULL,
+                    model_version TEXT,
+                    replayed_at_utc TEXT NOT NULL,
+                    delta_T_total_h REAL,
+                    co2_emissions_kg REAL,
+                    fuel_excess_L REAL,
+                    leakage_ils REAL,
+                    UNIQUE(pipeline_run_id, constants_version)
+                )
+                """
+            )
 
-    def record_run(self, *, results: Dict[str, Any], tomtom_data: Dict[str, Any], aq_data: Dict[str, Any], fuel_data: Dict[str, Any], tomtom_age_s: Optional[float]) -> None:
+    @staticmethod
+    def _ensure_columns(con: sqlite3.Connection, table: str, columns: Dict[str, str]) -> List[str]:
+        """Add missing columns to an existing table (in-place schema migration).
+
+        Returns the names of the columns that were added.
+        """
+        existing = {r[1] for r in con.execute(f"PRAGMA table_info({table})").fetchall()}
+        added = []
+        for name, decl in columns.items():
+            if name not in existing:
+                con.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+                added.append(name)
+        return added
+
+    def record_run(self, *, results: Dict[str, Any], tomtom_data: Dict[str, Any], aq_data: Dict[str, Any], fuel_data: Dict[str, Any], tomtom_age_s: Optional[float], segments: Optional[List[Dict[str, Any]]] = None, p_fuel_ils_per_l: Optional[float] = None, corridor_id: str = DEFAULT_CORRIDOR_ID) -> None:
+        """Persist one model run.
+
+        When *segments* (canonical model inputs) are given they are stored in
+        ``run_segments`` together with the fuel price, so the run can later be
+        recomputed under different constants (see ``replay.py``).
+        """
+        self.record_runs([{
+            "results": results,
+            "tomtom_data": tomtom_data,
+            "aq_data": aq_data,
+            "fuel_data": fuel_data,
+            "tomtom_age_s": tomtom_age_s,
+            "segments": segments,
+            "p_fuel_ils_per_l": p_fuel_ils_per_l,
+            "corridor_id": corridor_id,
+        }])
+
+    def record_runs(self, runs: List[Dict[str, Any]]) -> None:
+        """Persist several runs (e.g. one per corridor) in a single transaction.
+
+        Each item holds the keyword arguments of :meth:`record_run`.
+        """
+        with self._connect() as con:
+            # Serialize writers so the running totals are read and extended atomically.
+            con.execute("BEGIN IMMEDIATE")
+            for run in runs:
+                self._write_run(con, **run)
+
+    def _write_run(self, con: sqlite3.Connection, *, results: Dict[str, Any], tomtom_data: Dict[str, Any], aq_data: Dict[str, Any], fuel_data: Dict[str, Any], tomtom_age_s: Optional[float], segments: Optional[List[Dict[str, Any]]] = None, p_fuel_ils_per_l: Optional[float] = None, corridor_id: str = DEFAULT_CORRIDOR_ID) -> None:
         row = HistoryRow(
             recorded_at_utc=_utc_now_iso(),
             data_timestamp_utc=results.get("data_timestamp_utc"),
@@ -91,59 +271,199 @@ class HistoryStore:
             tomtom_age_s=float(tomtom_age_s) if tomtom_age_s is not None else None,
             air_fetched_at=aq_data.get("fetched_at"),
             fuel_fetched_at=fuel_data.get("fetched_at_utc") or fuel_data.get("fetched_at"),
+            model_version=results.get("model_version"),
+            constants_version=results.get("constants_version"),
+            corridor_id=corridor_id,
         )
 
-        with self._connect() as con:
-            con.execute(
-                """
-                INSERT OR IGNORE INTO runs (
-                    recorded_at_utc,
-                    data_timestamp_utc,
-                    pipeline_run_id,
-                    traffic_source_id,
-                    air_source_id,
-                    fuel_source_id,
-                    vehicle_count_mode,
-                    delta_T_total_h,
-                    co2_emissions_kg,
-                    fuel_excess_L,
-                    leakage_ils,
-                    tomtom_fetched_at,
-                    tomtom_age_s,
-                    air_fetched_at,
-                    fuel_fetched_at
-                ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-                """,
-                (
-                    row.recorded_at_utc,
-                    row.data_timestamp_utc,
-                    row.pipeline_run_id,
-                    row.traffic_source_id,
-                    row.air_source_id,
-                    row.fuel_source_id,
-                    row.vehicle_count_mode,
-                    row.delta_T_total_h,
-                    row.co2_emissions_kg,
-                    row.fuel_excess_L,
-                    row.leakage_ils,
-                    row.tomtom_fetched_at,
-                    row.tomtom_age_s,
-                    row.air_fetched_at,
-                    row.fuel_fetched_at,
-                ),
+        # Normally the newest row; clock steps and external writers can insert earlier ones.
+        prev = self._chain_row(con, row.corridor_id, before=row.recorded_at_utc)
+        derived = _derive(
+            prev,
+            row.recorded_at_utc,
+            [row.delta_T_total_h, row.fuel_excess_L, row.co2_emissions_kg, row.leakage_ils],
+            self.max_gap_s,
+        )
+        cur = con.execute(
+            f"""
+            INSERT OR IGNORE INTO runs (
+                recorded_at_utc,
+                data_timestamp_utc,
+                pipeline_run_id,
+                traffic_source_id,
+                air_source_id,
+                fuel_source_id,
+                vehicle_count_mode,
+                delta_T_total_h,
+                co2_emissions_kg,
+                fuel_excess_L,
+                leakage_ils,
+                tomtom_fetched_at,
+                tomtom_age_s,
+                air_fetched_at,
+                fuel_fetched_at,
+                model_version,
+                constants_version,
+                corridor_id,
+                {', '.join(DERIVED_COLUMNS)}
+            ) VALUES ({', '.join('?' * (18 + len(DERIVED_COLUMNS)))})
+            """,
+            (
+                row.recorded_at_utc,
+                row.data_timestamp_utc,
+                row.pipeline_run_id,
+                row.traffic_source_id,
+                row.air_source_id,
+                row.fuel_source_id,
+                row.vehicle_count_mode,
+                row.delta_T_total_h,
+                row.co2_emissions_kg,
+                row.fuel_excess_L,
+                row.leakage_ils,
+                row.tomtom_fetched_at,
+                row.tomtom_age_s,
+                row.air_fetched_at,
+                row.fuel_fetched_at,
+                row.model_version,
+                row.constants_version,
+                row.corridor_id,
+                *derived,
+            ),
+        )
+        if cur.rowcount == 1 and con.execute(
+            "SELECT 1 FROM runs WHERE corridor_id = ? AND recorded_at_utc > ? LIMIT 1",
+            (row.corridor_id, row.recorded_at_utc),
+        ).fetchone():
+            anchor = con.execute(f"SELECT {_CHAIN_COLUMNS} FROM runs WHERE id = ?", (cur.lastrowid,)).fetchone()
+            self._rechain(con, row.corridor_id, dict(anchor))
+        if cur.rowcount == 1 and segments and row.pipeline_run_id:
+            self._insert_inputs(con, row.pipeline_run_id, row.recorded_at_utc, segments, p_fuel_ils_per_l)
+        unc = results.get("uncertainty")
+        if cur.rowcount == 1 and unc and row.pipeline_run_id:
+            con.executemany(
+                "INSERT OR REPLACE INTO run_uncertainty (pipeline_run_id, counter, p5, p50, p95, n_samples) VALUES (?,?,?,?,?,?)",
+                [
+                    (row.pipeline_run_id, counter, b.get("p5"), b.get("p50"), b.get("p95"), unc.get("n_samples"))
+                    for counter, b in (unc.get("counters") or {}).items()
+                ],
             )
 
-    def fetch_runs(self, limit: int = 2000) -> List[Dict[str, Any]]:
+    def _latest_row(self, con: sqlite3.Connection, corridor_id: str = DEFAULT_CORRIDOR_ID) -> Optional[Dict[str, Any]]:
+        """The corridor's newest row with its derived columns (None if it has no rows)."""
+        return self._chain_row(con, corridor_id)
+
+    def _chain_row(self, con: sqlite3.Connection, corridor_id: str, before: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The corridor's last row in (recorded_at_utc, id) order, or the last one
+        recorded at or before *before*; None if there is none.
+
+        Rows written without derived columns (e.g. by external tools) are
+        backfilled first, so prefix sums and integrals never skip a row.
+        """
+        where, params = "corridor_id = ?", [corridor_id]
+        if before is not None:
+            where += " AND recorded_at_utc <= ?"
+            params.append(before)
+        query = f"SELECT {_CHAIN_COLUMNS} FROM runs WHERE {where} ORDER BY recorded_at_utc DESC, id DESC LIMIT 1"
+        row = con.execute(query, params).fetchone()
+        if row is None:
+            return None
+        if any(row[c] is None for c in DERIVED_COLUMNS):
+            self._backfill_cumulative(con)
+            row = con.execute(query, params).fetchone()
+        return dict(row)
+
+    def _rechain(self, con: sqlite3.Connection, corridor_id: str, anchor: Optional[Dict[str, Any]]) -> None:
+        """Recompute the derived columns of every row after *anchor* (from the corridor's first row if None)."""
+        if anchor is None:
+            rows = con.execute(
+                f"SELECT {_CHAIN_COLUMNS} FROM runs WHERE corridor_id = ? ORDER BY recorded_at_utc, id",
+                (corridor_id,),
+            ).fetchall()
+        else:
+            rows = con.execute(
+                f"SELECT {_CHAIN_COLUMNS} FROM runs WHERE corridor_id = ? "
+                "AND (recorded_at_utc > ? OR (recorded_at_utc = ? AND id > ?)) ORDER BY recorded_at_utc, id",
+                (corridor_id, anchor["recorded_at_utc"], anchor["recorded_at_utc"], anchor["id"]),
+            ).fetchall()
+        prev = anchor
+        updates = []
+        for r in rows:
+            cur = dict(r)
+            derived = _derive(prev, cur["recorded_at_utc"], [cur[c] for c in CUMULATIVE_COUNTERS], self.max_gap_s)
+            cur.update(zip(DERIVED_COLUMNS, derived))
+            updates.append((*derived, cur["id"]))
+            prev = cur
+        con.executemany(
+            f"UPDATE runs SET {', '.join(c + ' = ?' for c in DERIVED_COLUMNS)} WHERE id = ?",
+            updates,
+        )
+
+    def _backfill_cumulative(self, con: sqlite3.Connection) -> None:
+        """Recompute derived columns per corridor from its first row that lacks them onward."""
+        corridors = [r[0] for r in con.execute("SELECT DISTINCT corridor_id FROM runs").fetchall()]
+        for corridor_id in corridors:
+            missing = con.execute(
+                f"SELECT recorded_at_utc, id FROM runs WHERE corridor_id = ? AND ({_MISSING_DERIVED}) "
+                "ORDER BY recorded_at_utc, id LIMIT 1",
+                (corridor_id,),
+            ).fetchone()
+            if missing is None:
+                continue
+            anchor = con.execute(
+                f"SELECT {_CHAIN_COLUMNS} FROM runs WHERE corridor_id = ? "
+                "AND (recorded_at_utc < ? OR (recorded_at_utc = ? AND id < ?)) "
+                "ORDER BY recorded_at_utc DESC, id DESC LIMIT 1",
+                (corridor_id, missing[0], missing[0], missing[1]),
+            ).fetchone()
+            self._rechain(con, corridor_id, dict(anchor) if anchor else None)
+
+    @staticmethod
+    def _insert_inputs(con: sqlite3.Connection, pipeline_run_id: str, recorded_at_utc: str, segments: List[Dict[str, Any]], p_fuel_ils_per_l: Optional[float]) -> None:
+        con.execute(
+            "INSERT OR IGNORE INTO run_inputs (pipeline_run_id, recorded_at_utc, p_fuel_ils_per_l) VALUES (?,?,?)",
+            (pipeline_run_id, recorded_at_utc, float(p_fuel_ils_per_l) if p_fuel_ils_per_l is not None else None),
+        )
+        con.executemany(
+            """
+            INSERT OR IGNORE INTO run_segments (
+                pipeline_run_id, seq, segment_id, length_km, observed_travel_time_s, vehicle_count,
+                raw_ref, polyline_ref
+            ) VALUES (?,?,?,?,?,?,?,?)
+            """,
+            [
+                (
+                    pipeline_run_id,
+                    seq,
+                    seg.get("segment_id"),
+                    float(seg["length_km"]),
+                    float(seg["observed_travel_time_s"]),
+                    float(seg["vehicle_count"]),
+                    seg.get("raw_ref", (seg.get("raw") or {}).get("ref")),
+                    seg.get("polyline_ref", (seg.get("raw") or {}).get("polyline_ref")),
+                )
+                for seq, seg in enumerate(segments)
+            ],
+        )
+
+    @staticmethod
+    def _corridor_clause(corridor_id: Optional[str], prefix: str = "WHERE") -> tuple:
+        """SQL filter for one corridor (None = all corridors)."""
+        if corridor_id is None:
+            return "", ()
+        return f"{prefix} corridor_id = ?", (corridor_id,)
+
+    def fetch_runs(self, limit: int = 2000, corridor_id: Optional[str] = DEFAULT_CORRIDOR_ID) -> List[Dict[str, Any]]:
+        where, params = self._corridor_clause(corridor_id)
         with self._connect() as con:
             rows = con.execute(
-                "SELECT * FROM runs ORDER BY recorded_at_utc DESC LIMIT ?",
-                (int(limit),),
+                f"SELECT * FROM runs {where} ORDER BY recorded_at_utc DESC LIMIT ?",
+                (*params, int(limit)),
             ).fetchall()
         return [dict(r) for r in rows]
 
-    def fetch_runs_df(self, limit: int = 2000):
+    def fetch_runs_df(self, limit: int = 2000, corridor_id: Optional[str] = DEFAULT_CORRIDOR_ID):
         # pandas is a transitive dependency of streamlit; keep optional.
-        rows = self.fetch_runs(limit=limit)
+        rows = self.fetch_runs(limit=limit, corridor_id=corridor_id)
         try:
             import pandas as pd  # type: ignore
 
@@ -152,45 +472,242 @@ class HistoryStore:
         except Exception:
             return rows
 
-    def latest_pipeline_run_id(self) -> Optional[str]:
+    def latest_pipeline_run_id(self, corridor_id: Optional[str] = DEFAULT_CORRIDOR_ID) -> Optional[str]:
+        where, params = self._corridor_clause(corridor_id)
         with self._connect() as con:
-            row = con.execute("SELECT pipeline_run_id FROM runs ORDER BY recorded_at_utc DESC LIMIT 1").fetchone()
+            row = con.execute(f"SELECT pipeline_run_id FROM runs {where} ORDER BY recorded_at_utc DESC LIMIT 1", params).fetchone()
         return row[0] if row and row[0] else None
 
     # ── read-only helpers for UI (no TomTom / no model calls) ──
 
-    def fetch_latest_run(self) -> Optional[Dict[str, Any]]:
+    def fetch_latest_run(self, corridor_id: Optional[str] = DEFAULT_CORRIDOR_ID) -> Optional[Dict[str, Any]]:
         """Return the most recent run as a dict, or None if no runs exist."""
+        where, params = self._corridor_clause(corridor_id)
         with self._connect() as con:
             row = con.execute(
-                "SELECT * FROM runs ORDER BY recorded_at_utc DESC LIMIT 1"
+                f"SELECT * FROM runs {where} ORDER BY recorded_at_utc DESC LIMIT 1", params
             ).fetchone()
         return dict(row) if row else None
 
-    def fetch_latest_traffic_run(self) -> Optional[Dict[str, Any]]:
+    def fetch_latest_traffic_run(self, corridor_id: Optional[str] = DEFAULT_CORRIDOR_ID) -> Optional[Dict[str, Any]]:
         """Return the most recent run with a valid traffic source.
 
         Filters out error/fuel-only rows to ensure the UI always gets a
         genuine traffic snapshot — never confused by fuel updates.
         """
+        where, params = self._corridor_clause(corridor_id, prefix="AND")
         with self._connect() as con:
             row = con.execute(
-                """
+                f"""
                 SELECT * FROM runs
                 WHERE traffic_source_id IS NOT NULL
                   AND traffic_source_id NOT LIKE '%:error%'
                   AND tomtom_fetched_at IS NOT NULL
+                  {where}
                 ORDER BY recorded_at_utc DESC
                 LIMIT 1
-                """
+                """,
+                params,
             ).fetchone()
         return dict(row) if row else None
 
-    def fetch_latest_n_runs(self, n: int = 300) -> List[Dict[str, Any]]:
+    def fetch_latest_n_runs(self, n: int = 300, corridor_id: Optional[str] = DEFAULT_CORRIDOR_ID) -> List[Dict[str, Any]]:
         """Return the *n* most recent runs (newest first)."""
+        return self.fetch_runs(limit=n, corridor_id=corridor_id)
+
+    def window_totals(self, since_utc: Optional[str] = None, corridor_id: str = DEFAULT_CORRIDOR_ID) -> Dict[str, Any]:
+        """Counter totals over a corridor's runs recorded at or after *since_utc* (all runs if None).
+
+        Uses the running columns: a window figure is the newest row's prefix
+        value minus that of the last row before the window, i.e. a few seeks on
+        the (corridor_id, recorded_at_utc) index instead of a scan.  Returns
+        {'totals': {counter: float}, 'first_recorded_at_utc', 'last_recorded_at_utc'}
+        and 'runs' (totals empty when the window holds no runs).  'totals' are
+        per-run sums: each run's snapshot figure counted once.
+
+        'integrated' holds the time integral of each counter's per-run value
+        between the first and last run of the window (trapezoidal, in counter
+        x hours) and 'covered_h' the hours it spans, excluding gaps longer than
+        the max gap.  'time_avg' is integrated / covered_h: the time-averaged
+        value of one run's figure, in the counter's own unit (a level, not an
+        hourly rate; empty when covered_h is 0).
+        """
+        sums = ", ".join(f"cum_{c}" for c in CUMULATIVE_COUNTERS)
+        ints = ", ".join(f"cum_int_{c}" for c in CUMULATIVE_COUNTERS)
+        since = since_utc or ""
+        with self._connect() as con:
+            last = self._latest_row(con, corridor_id)
+            first = con.execute(
+                f"SELECT recorded_at_utc, cum_span_h, {ints} FROM runs "
+                "WHERE corridor_id = ? AND recorded_at_utc >= ? ORDER BY recorded_at_utc, id LIMIT 1",
+                (corridor_id, since),
+            ).fetchone()
+            base = con.execute(
+                f"SELECT cum_runs, {sums} FROM runs WHERE corridor_id = ? AND recorded_at_utc < ? "
+                "ORDER BY recorded_at_utc DESC, id DESC LIMIT 1",
+                (corridor_id, since),
+            ).fetchone()
+        if first is None or last is None:
+            return {
+                "totals": {}, "integrated": {}, "time_avg": {}, "covered_h": 0.0,
+                "first_recorded_at_utc": None, "last_recorded_at_utc": None, "runs": 0,
+            }
+        base = dict(base) if base else {"cum_runs": 0, **{f"cum_{c}": 0.0 for c in CUMULATIVE_COUNTERS}}
+        integrated = {c: last[f"cum_int_{c}"] - first[f"cum_int_{c}"] for c in CUMULATIVE_COUNTERS}
+        covered_h = last["cum_span_h"] - first["cum_span_h"]
+        return {
+            "totals": {c: last[f"cum_{c}"] - base[f"cum_{c}"] for c in CUMULATIVE_COUNTERS},
+            "integrated": integrated,
+            "time_avg": {c: v / covered_h for c, v in integrated.items()} if covered_h > 0 else {},
+            "covered_h": covered_h,
+            "first_recorded_at_utc": first["recorded_at_utc"],
+            "last_recorded_at_utc": last["recorded_at_utc"],
+            "runs": int(last["cum_runs"] - base["cum_runs"]),
+        }
+
+    def fetch_uncertainty(self, pipeline_run_id: str) -> Dict[str, Dict[str, Any]]:
+        """Return {counter: {p5, p50, p95, n_samples}} stored for a run (empty if none)."""
         with self._connect() as con:
             rows = con.execute(
-                "SELECT * FROM runs ORDER BY recorded_at_utc DESC LIMIT ?",
-                (int(n),),
+                "SELECT counter, p5, p50, p95, n_samples FROM run_uncertainty WHERE pipeline_run_id = ?",
+                (pipeline_run_id,),
+            ).fetchall()
+        return {r["counter"]: {k: r[k] for k in ("p5", "p50", "p95", "n_samples")} for r in rows}
+
+    # ── replay support (canonical inputs + recomputed results) ──
+
+    @staticmethod
+    def _inputs_clause(start_utc: Optional[str], end_utc: Optional[str], corridor_id: Optional[str]) -> tuple:
+        """WHERE clause over ``run_inputs i`` joined to ``runs r`` (None = no bound / all corridors)."""
+        where, params = [], []
+        if corridor_id is not None:
+            where.append("r.corridor_id = ?")
+            params.append(corridor_id)
+        if start_utc:
+            where.append("i.recorded_at_utc >= ?")
+            params.append(start_utc)
+        if end_utc:
+            where.append("i.recorded_at_utc < ?")
+            params.append(end_utc)
+        return ("WHERE " + " AND ".join(where)) if where else "", params
+
+    def list_input_months(self, corridor_id: Optional[str] = DEFAULT_CORRIDOR_ID) -> List[str]:
+        """Return the distinct 'YYYY-MM' months that have stored model inputs for a corridor (None = all)."""
+        where, params = self._inputs_clause(None, None, corridor_id)
+        with self._connect() as con:
+            rows = con.execute(
+                "SELECT DISTINCT substr(i.recorded_at_utc, 1, 7) FROM run_inputs i "
+                f"JOIN runs r ON r.pipeline_run_id = i.pipeline_run_id {where} ORDER BY 1",
+                params,
+            ).fetchall()
+        return [r[0] for r in rows if r[0]]
+
+    def fetch_inputs_columnar(
+        self,
+        start_utc: Optional[str] = None,
+        end_utc: Optional[str] = None,
+        corridor_id: Optional[str] = DEFAULT_CORRIDOR_ID,
+    ) -> Dict[str, List[Any]]:
+        """Return stored model inputs for a corridor's runs recorded in [start_utc, end_utc).
+
+        Columnar layout for ``AyalonModel.run_model_batch``:
+          runs:     pipeline_run_id, recorded_at_utc, p_fuel_ils_per_l (one entry per run)
+          segments: run_index (position in the runs lists), length_km,
+                    observed_travel_time_s, vehicle_count (one entry per segment,
+                    in the original segment order)
+        """
+        clause, params = self._inputs_clause(start_utc, end_utc, corridor_id)
+        with self._connect() as con:
+            rows = con.execute(
+                f"""
+                SELECT i.pipeline_run_id, i.recorded_at_utc, i.p_fuel_ils_per_l,
+                       s.length_km, s.observed_travel_time_s, s.vehicle_count
+                FROM run_inputs i
+                JOIN runs r ON r.pipeline_run_id = i.pipeline_run_id
+                JOIN run_segments s ON s.pipeline_run_id = i.pipeline_run_id
+                {clause}
+                ORDER BY i.recorded_at_utc, i.pipeline_run_id, s.seq
+                """,
+                params,
+            ).fetchall()
+
+        out: Dict[str, List[Any]] = {
+            "pipeline_run_id": [], "recorded_at_utc": [], "p_fuel_ils_per_l": [],
+            "run_index": [], "length_km": [], "observed_travel_time_s": [], "vehicle_count": [],
+        }
+        last_run = None
+        for r in rows:
+            if r[0] != last_run:
+                last_run = r[0]
+                out["pipeline_run_id"].append(r[0])
+                out["recorded_at_utc"].append(r[1])
+                out["p_fuel_ils_per_l"].append(r[2])
+            out["run_index"].append(len(out["pipeline_run_id"]) - 1)
+            out["length_km"].append(r[3])
+            out["observed_travel_time_s"].append(r[4])
+            out["vehicle_count"].append(r[5])
+        return out
+
+    def fetch_raw_refs(
+        self,
+        start_utc: Optional[str] = None,
+        end_utc: Optional[str] = None,
+        corridor_id: Optional[str] = DEFAULT_CORRIDOR_ID,
+    ) -> List[Dict[str, Any]]:
+        """Return the raw blob refs of a corridor's runs recorded in [start_utc, end_utc).
+
+        One entry per stored segment: pipeline_run_id, recorded_at_utc, seq,
+        segment_id, raw_ref, polyline_ref.  Resolve the refs with
+        ``sources.provenance.load_many`` for audits or replay.
+        """
+        clause, params = self._inputs_clause(start_utc, end_utc, corridor_id)
+        with self._connect() as con:
+            rows = con.execute(
+                f"""
+                SELECT i.pipeline_run_id, i.recorded_at_utc, s.seq, s.segment_id, s.raw_ref, s.polyline_ref
+                FROM run_inputs i
+                JOIN runs r ON r.pipeline_run_id = i.pipeline_run_id
+                JOIN run_segments s ON s.pipeline_run_id = i.pipeline_run_id
+                {clause}
+                ORDER BY i.recorded_at_utc, i.pipeline_run_id, s.seq
+                """,
+                params,
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def record_replay_results(self, rows: List[Dict[str, Any]]) -> int:
+        """Upsert recomputed results; each row carries pipeline_run_id,
+        constants_version, model_version and the four counters."""
+        replayed_at = _utc_now_iso()
+        with self._connect() as con:
+            con.executemany(
+                """
+                INSERT OR REPLACE INTO replay_results (
+                    pipeline_run_id, constants_version, model_version, replayed_at_utc,
+                    delta_T_total_h, co2_emissions_kg, fuel_excess_L, leakage_ils
+                ) VALUES (?,?,?,?,?,?,?,?)
+                """,
+                [
+                    (
+                        r["pipeline_run_id"], r["constants_version"], r.get("model_version"), replayed_at,
+                        r.get("delta_T_total_h"), r.get("co2_emissions_kg"), r.get("fuel_excess_L"), r.get("leakage_ils"),
+                    )
+                    for r in rows
+                ],
+            )
+        return len(rows)
+
+    def fetch_replay_results(self, constants_version: str) -> List[Dict[str, Any]]:
+        """Return replayed results for one constants version joined with run timestamps."""
+        with self._connect() as con:
+            rows = con.execute(
+                """
+                SELECT r.recorded_at_utc, p.*
+                FROM replay_results p
+                JOIN runs r ON r.pipeline_run_id = p.pipeline_run_id
+                WHERE p.constants_version = ?
+                ORDER BY r.recorded_at_utc
+                """,
+                (constants_version,),
             ).fetchall()
         return [dict(r) for r in rows]
@@ -19,8 +19,7 @@ import os
 from datetime import datetime, timezone
 from typing import Any, Dict, Optional
 
-import requests
-
+from . import transport
 from .cache import cache_read, cache_write
 
 logger = logging.getLogger(__name__)
@@ -46,7 +45,7 @@ def _utc_now_iso() -> str:
 
 def _fetch_from_url(source_url: str) -> Dict[str, Any]:
     """Fetch benchmark from a JSON URL."""
-    r = requests.get(source_url, timeout=20)
+    r = transport.get(source_url, timeout=20)
     r.raise_for_status()
     js = r.json()
 
@@ -0,0 +1,268 @@
+"""Append-only, compressed, content-addressed archive for raw provider payloads.
+
+Raw responses (TomTom JSON + headers, polylines) are written once and
+referenced from segments, cache entries and history rows by hash:
+
+    ref = store_raw({"response": js, "headers": headers})   # "sha256:<hex>"
+    load_raw(ref)                                          # original object
+
+Identical payloads map to the same ref and are stored only once.
+
+Layout (``RAW_ARCHIVE_DIR``; default ``raw_archive/`` next to the history DB,
+i.e. in the directory of ``HISTORY_DB_PATH``, else ``data/raw_archive``)::
+
+    packs/YYYY-MM.pack   append-only; each record is a 40-byte header
+                         (b"RAW1", sha256 digest, payload length) followed by
+                         the zlib-compressed canonical JSON, or by a frame of
+                         ``RAW_ARCHIVE_SERIALIZER`` (see sources.serialization)
+    index.sqlite3        blobs(ref, pack, offset, length, raw_length, kind, stored_at_utc, codec)
+
+Refs always hash the canonical JSON, whatever the record codec, so a codec
+switch never changes refs and records of both codecs coexist in one pack.
+
+Records are never rewritten, so the archive keeps full provenance history.
+``iter_raw`` / ``load_many`` read ranges in pack order for audits and replay;
+``python -m sources.provenance --since ... --until ...`` exports a range as JSON lines.
+
+Blobs written by the earlier one-file-per-hash store (``sources/_cache/_raw``)
+remain readable through ``load_raw``.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import struct
+import threading
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .cache import CACHE_DIR
+from .filelock import FileLock
+from .serialization import get_serializer, loads_any
+
+
+def _default_archive_dir() -> Path:
+    # Next to the history DB, so whatever persists the DB (e.g. the Actions
+    # workflow committing history/) keeps the blobs its run_segments refs point to.
+    db = os.getenv("HISTORY_DB_PATH")
+    if db:
+        return Path(db).parent / "raw_archive"
+    return Path(__file__).resolve().parent.parent / "data" / "raw_archive"
+
+
+REF_PREFIX = "sha256:"
+ARCHIVE_DIR = Path(os.getenv("RAW_ARCHIVE_DIR") or _default_archive_dir())
+LEGACY_RAW_DIR = CACHE_DIR / "_raw"
+COMPRESS_LEVEL = 6
+# Default: zlib-compressed canonical JSON (codec NULL in the index).
+SERIALIZER = os.getenv("RAW_ARCHIVE_SERIALIZER", "")
+
+_HEADER = struct.Struct(">4s32sI")
+_MAGIC = b"RAW1"
+_lock = threading.Lock()
+
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _canonical(obj: Any) -> bytes:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def raw_ref(obj: Any) -> str:
+    """Return the content address of a JSON-serializable object."""
+    return REF_PREFIX + hashlib.sha256(_canonical(obj)).hexdigest()
+
+
+def _hex(ref: str) -> str:
+    if not ref.startswith(REF_PREFIX):
+        raise ValueError(f"provenance: unsupported ref {ref!r}")
+    return ref[len(REF_PREFIX):]
+
+
+def _connect() -> sqlite3.Connection:
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(str(ARCHIVE_DIR / "index.sqlite3"), timeout=30)
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS blobs (
+            ref TEXT PRIMARY KEY,
+            pack TEXT NOT NULL,
+            offset INTEGER NOT NULL,
+            length INTEGER NOT NULL,
+            raw_length INTEGER NOT NULL,
+            kind TEXT,
+            stored_at_utc TEXT NOT NULL
+        )
+        """
+    )
+    con.execute("CREATE INDEX IF NOT EXISTS idx_blobs_stored_at ON blobs(stored_at_utc)")
+    if "codec" not in {r[1] for r in con.execute("PRAGMA table_info(blobs)")}:
+        con.execute("ALTER TABLE blobs ADD COLUMN codec TEXT")
+    return con
+
+
+def store_raw(obj: Any, kind: Optional[str] = None) -> str:
+    """Append *obj* to the archive once under its content address and return the ref."""
+    blob = _canonical(obj)
+    digest = hashlib.sha256(blob).digest()
+    ref = REF_PREFIX + digest.hex()
+    with _lock, _connect() as con:
+        if con.execute("SELECT 1 FROM blobs WHERE ref = ?", (ref,)).fetchone():
+            return ref
+        codec = get_serializer(SERIALIZER).name if SERIALIZER else None
+        payload = get_serializer(codec).dumps(obj) if codec else zlib.compress(blob, COMPRESS_LEVEL)
+        stored_at = _utc_now_iso()
+        pack = f"{stored_at[:7]}.pack"
+        (ARCHIVE_DIR / "packs").mkdir(parents=True, exist_ok=True)
+        with FileLock(ARCHIVE_DIR / "archive.lock"):
+            # Re-check under the file lock: another process may have appended it meanwhile.
+            if con.execute("SELECT 1 FROM blobs WHERE ref = ?", (ref,)).fetchone():
+                return ref
+            with open(ARCHIVE_DIR / "packs" / pack, "ab") as f:
+                offset = f.seek(0, os.SEEK_END) + _HEADER.size
+                f.write(_HEADER.pack(_MAGIC, digest, len(payload)))
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            con.execute(
+                "INSERT OR IGNORE INTO blobs (ref, pack, offset, length, raw_length, kind, stored_at_utc, codec) VALUES (?,?,?,?,?,?,?,?)",
+                (ref, pack, offset, len(payload), len(blob), kind, stored_at, codec),
+            )
+            con.commit()
+    return ref
+
+
+def _read(f, ref: str, offset: int, length: int, codec: Optional[str]) -> Any:
+    f.seek(offset)
+    if codec:
+        obj = loads_any(f.read(length))
+        blob = _canonical(obj)
+    else:
+        blob = zlib.decompress(f.read(length))
+        obj = None
+    if hashlib.sha256(blob).hexdigest() != _hex(ref):
+        raise ValueError(f"provenance: archive record for {ref} is corrupt")
+    return json.loads(blob) if obj is None else obj
+
+
+def _load_legacy(ref: str) -> Optional[Any]:
+    path = LEGACY_RAW_DIR / f"{_hex(ref)}.json"
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_raw(ref: str) -> Optional[Any]:
+    """Return the object stored under *ref*, or None if it is not present."""
+    return load_many([ref]).get(ref)
+
+
+def load_many(refs: Iterable[str]) -> Dict[str, Any]:
+    """Return {ref: object} for the refs present, reading each pack sequentially."""
+    refs = list(dict.fromkeys(refs))
+    for ref in refs:
+        _hex(ref)
+    found: List[Tuple[str, str, int, int, Optional[str]]] = []
+    if (ARCHIVE_DIR / "index.sqlite3").exists() and refs:
+        with _connect() as con:
+            for i in range(0, len(refs), 500):
+                chunk = refs[i:i + 500]
+                found += con.execute(
+                    f"SELECT ref, pack, offset, length, codec FROM blobs WHERE ref IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+    out = dict(_read_records(found))
+    for ref in refs:
+        if ref not in out:
+            legacy = _load_legacy(ref)
+            if legacy is not None:
+                out[ref] = legacy
+    return out
+
+
+def _read_records(rows: List[Tuple[str, str, int, int, Optional[str]]]) -> Iterator[Tuple[str, Any]]:
+    rows = sorted(rows, key=lambda r: (r[1], r[2]))
+    f = None
+    current = None
+    try:
+        for ref, pack, offset, length, codec in rows:
+            if pack != current:
+                if f is not None:
+                    f.close()
+                f = open(ARCHIVE_DIR / "packs" / pack, "rb")
+                current = pack
+            yield ref, _read(f, ref, offset, length, codec)
+    finally:
+        if f is not None:
+            f.close()
+
+
+def iter_raw(since_utc: Optional[str] = None, until_utc: Optional[str] = None, kind: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Yield {ref, kind, stored_at_utc, obj} for blobs stored in [since_utc, until_utc), oldest first."""
+    if not (ARCHIVE_DIR / "index.sqlite3").exists():
+        return
+    where, params = ["stored_at_utc >= ?"], [since_utc or ""]
+    if until_utc:
+        where.append("stored_at_utc < ?")
+        params.append(until_utc)
+    if kind:
+        where.append("kind = ?")
+        params.append(kind)
+    with _connect() as con:
+        rows = con.execute(
+            f"SELECT ref, pack, offset, length, codec, kind, stored_at_utc FROM blobs WHERE {' AND '.join(where)} ORDER BY stored_at_utc, pack, offset",
+            params,
+        ).fetchall()
+    meta = {r[0]: (r[5], r[6]) for r in rows}
+    for ref, obj in _read_records([r[:5] for r in rows]):
+        yield {"ref": ref, "kind": meta[ref][0], "stored_at_utc": meta[ref][1], "obj": obj}
+
+
+def archive_stats() -> Dict[str, Any]:
+    """Blob count, raw vs compressed bytes, per kind."""
+    if not (ARCHIVE_DIR / "index.sqlite3").exists():
+        return {"blobs": 0, "raw_bytes": 0, "stored_bytes": 0, "kinds": {}}
+    with _connect() as con:
+        rows = con.execute(
+            "SELECT COALESCE(kind, ''), COUNT(*), SUM(raw_length), SUM(length) FROM blobs GROUP BY 1"
+        ).fetchall()
+    kinds = {k or None: {"blobs": n, "raw_bytes": int(r or 0), "stored_bytes": int(s or 0)} for k, n, r, s in rows}
+    return {
+        "blobs": sum(v["blobs"] for v in kinds.values()),
+        "raw_bytes": sum(v["raw_bytes"] for v in kinds.values()),
+        "stored_bytes": sum(v["stored_bytes"] for v in kinds.values()),
+        "kinds": kinds,
+    }
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Export raw provenance blobs stored in a time range as JSON lines")
+    p.add_argument("--since", help="ISO UTC start (inclusive)")
+    p.add_argument("--until", help="ISO UTC end (exclusive)")
+    p.add_argument("--kind", help="Only blobs of this kind (e.g. tomtom_response, polyline)")
+    p.add_argument("--out", help="Output file (default: stdout)")
+    args = p.parse_args()
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else None
+    try:
+        n = 0
+        for rec in iter_raw(args.since, args.until, kind=args.kind):
+            print(json.dumps(rec, ensure_ascii=False), file=out)
+            n += 1
+    finally:
+        if out is not None:
+            out.close()
+    if args.out:
+        print(json.dumps({"exported": n, "out": args.out}))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,174 @@
+"""Quota-aware adaptive sampling schedule for TomTom probes.
+
+Every collector tick (``TT_SCHEDULE_TICK_S``, default 300 s, the timer
+period) the scheduler assigns each probe a sampling interval: a multiple of
+the tick between one tick and ``TT_SCHEDULE_MAX_INTERVAL_S``.  Probes whose
+cached segment is younger than their interval are served from the per-probe
+cache instead of calling TomTom.
+
+Each probe gets a weight from what it has shown recently::
+
+    w = 1 + W_CONGESTION * congestion          (1 - currentSpeed/freeFlowSpeed)
+          + W_VOLATILITY * volatility          (EWMA of |change in congestion|)
+          + W_PROFILE * expected congestion    (hour-of-week profile, next hour)
+
+and sampling rates proportional to the weights are water-filled into the
+call budget, clamped to [1/max_interval, 1/tick].
+
+Quota bound: the budget is ``TT_SCHEDULE_QUOTA_RESERVE`` (default 0.9) of
+the calls remaining today, spread over the seconds left in the UTC day.
+Rates are fitted to that budget and intervals are then rounded *up* to whole
+ticks, which only lowers the rates, so the planned calls for the rest of the
+day never exceed the reserve share of the remaining quota.  The plan is
+recomputed every tick from the persistent daily counter, and the rate
+limiter's hard daily cap still applies underneath.
+"""
+
+import copy
+import math
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from .cache import cache_read, cache_write
+
+STATE_CACHE_KEY = "tt_scheduler_state"
+
+TICK_S = int(os.getenv("TT_SCHEDULE_TICK_S", "300"))
+MAX_INTERVAL_S = int(os.getenv("TT_SCHEDULE_MAX_INTERVAL_S", "3600"))
+QUOTA_RESERVE = float(os.getenv("TT_SCHEDULE_QUOTA_RESERVE", "0.9"))
+
+W_CONGESTION = 4.0
+W_VOLATILITY = 8.0
+W_PROFILE = 2.0
+EWMA_ALPHA = 0.2
+HOURS_PER_WEEK = 168
+
+
+def _hour_of_week(ts: float) -> int:
+    d = datetime.fromtimestamp(ts, tz=timezone.utc)
+    return d.weekday() * 24 + d.hour
+
+
+def _seconds_left_today(now: float) -> float:
+    d = datetime.fromtimestamp(now, tz=timezone.utc)
+    midnight = d.replace(hour=0, minute=0, second=0, microsecond=0).timestamp() + 86400
+    return max(1.0, midnight - now)
+
+
+def congestion_from_raw(raw: Dict[str, Any]) -> Optional[float]:
+    """1 - current/free-flow speed from a segment's raw provenance (None if absent)."""
+    cur, free = raw.get("current_speed_kmh"), raw.get("free_flow_speed_kmh")
+    if cur is None or not free:
+        return None
+    return min(1.0, max(0.0, 1.0 - float(cur) / float(free)))
+
+
+class ProbeScheduler:
+    """Per-probe sampling intervals fitted to the remaining daily quota.
+
+    Probes are identified by an opaque key (the per-probe cache key in
+    ``sources.tomtom``).  State (last congestion, volatility, hour-of-week
+    profile) is persisted in the cache directory.
+    """
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None, tick_s: int = TICK_S,
+                 max_interval_s: int = MAX_INTERVAL_S, reserve: float = QUOTA_RESERVE):
+        self.state: Dict[str, Any] = state or {"probes": {}}
+        self.tick_s = max(1, int(tick_s))
+        self.max_interval_s = max(self.tick_s, int(max_interval_s))
+        self.reserve = float(reserve)
+
+    @classmethod
+    def load(cls, **kw: Any) -> "ProbeScheduler":
+        # observe() updates the state in place; never modify the cache's shared copy.
+        return cls(state=copy.deepcopy(cache_read(STATE_CACHE_KEY, max_age_s=30 * 86400)), **kw)
+
+    def save(self) -> None:
+        cache_write(STATE_CACHE_KEY, self.state)
+
+    # ── learning ──
+
+    def observe(self, key: str, congestion: float, ts: float) -> None:
+        """Record one observation for a probe (ignored if not newer than the last)."""
+        st = self.state["probes"].setdefault(key, {
+            "last_ts": None, "congestion": None, "volatility": 0.0, "profile": [None] * HOURS_PER_WEEK,
+        })
+        if st["last_ts"] is not None and ts <= st["last_ts"]:
+            return
+        if st["congestion"] is not None:
+            change = abs(congestion - st["congestion"])
+            st["volatility"] = (1 - EWMA_ALPHA) * st["volatility"] + EWMA_ALPHA * change
+        how = _hour_of_week(ts)
+        prev = st["profile"][how]
+        st["profile"][how] = congestion if prev is None else (1 - EWMA_ALPHA) * prev + EWMA_ALPHA * congestion
+        st["congestion"] = congestion
+        st["last_ts"] = ts
+
+    def weight(self, key: str, now: float) -> float:
+        st = self.state["probes"].get(key)
+        if not st:
+            return 1.0
+        expected = st["profile"][_hour_of_week(now + 3600)]
+        return (
+            1.0
+            + W_CONGESTION * (st["congestion"] or 0.0)
+            + W_VOLATILITY * st["volatility"]
+            + W_PROFILE * (expected or 0.0)
+        )
+
+    # ── planning ──
+
+    def budget_calls_per_s(self, calls_today: int, quota_per_day: int, now: float) -> float:
+        remaining = max(0, int(quota_per_day) - int(calls_today))
+        return self.reserve * remaining / _seconds_left_today(now)
+
+    def plan(self, keys: Iterable[str], calls_today: int, quota_per_day: int, now: Optional[float] = None) -> Dict[str, int]:
+        """Return {key: interval_s} for this tick (intervals are whole ticks)."""
+        now = time.time() if now is None else now
+        keys = list(keys)
+        if not keys:
+            return {}
+        budget = self.budget_calls_per_s(calls_today, quota_per_day, now)
+        r_min, r_max = 1.0 / self.max_interval_s, 1.0 / self.tick_s
+
+        if budget <= 0:
+            # Quota spent: nothing is due until the daily counter resets.
+            return {k: self._ticks(_seconds_left_today(now)) for k in keys}
+        if budget < len(keys) * r_min:
+            # Too many probes even at the slowest rate: share the budget evenly.
+            return {k: self._ticks(len(keys) / budget) for k in keys}
+
+        weights = [self.weight(k, now) for k in keys]
+        rates = self._water_fill(weights, budget, r_min, r_max)
+        return {k: self._ticks(1.0 / r) for k, r in zip(keys, rates)}
+
+    def _ticks(self, interval_s: float) -> int:
+        """Round an interval up to whole ticks (never below one tick)."""
+        return max(1, math.ceil(interval_s / self.tick_s - 1e-9)) * self.tick_s
+
+    @staticmethod
+    def _water_fill(weights: List[float], budget: float, r_min: float, r_max: float) -> List[float]:
+        """Rates clamp(lam * w, r_min, r_max) with the largest lam whose sum fits *budget*."""
+        def rates(lam: float) -> List[float]:
+            return [min(r_max, max(r_min, lam * w)) for w in weights]
+
+        if sum(rates(r_max / min(weights))) <= budget:
+            return rates(r_max / min(weights))  # every probe at one tick fits
+        lo, hi = 0.0, r_max / min(weights)
+        for _ in range(60):
+            mid = (lo + hi) / 2
+            if sum(rates(mid)) <= budget:
+                lo = mid
+            else:
+                hi = mid
+        return rates(lo)
+
+    def max_age_s(self, interval_s: int) -> int:
+        """Cache age at which a probe is due: half a tick early absorbs timer jitter,
+        while fetches stay at least *interval_s* apart on a regular tick."""
+        return interval_s - self.tick_s // 2
+
+    def planned_calls_per_day(self, plan: Dict[str, int]) -> float:
+        return sum(86400.0 / i for i in plan.values())
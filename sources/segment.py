@@ -0,0 +1,114 @@
+"""Compact canonical segment for the model hot path.
+
+``Segment`` uses ``__slots__`` and carries only what the model and the
+collector need; the raw provider payload lives in the provenance store and
+is referenced by ``raw_ref`` / ``polyline_ref`` (see ``sources.provenance``).
+
+Segments support ``seg['length_km']`` / ``seg.get(...)`` so they can be passed
+anywhere a canonical segment dict is accepted (``AyalonModel.run_model``,
+``HistoryStore.record_run``).  ``to_structured_array`` packs many segments
+into one NumPy record array for columnar paths such as ``run_model_batch``.
+"""
+
+from typing import Any, Dict, Iterable, Optional
+
+SEGMENT_FIELDS = (
+    "segment_id",
+    "length_km",
+    "observed_travel_time_s",
+    "vehicle_count",
+    "confidence",
+    "road_closure",
+    "fetched_at",
+    "raw_ref",
+    "polyline_ref",
+)
+
+
+class Segment:
+    __slots__ = SEGMENT_FIELDS
+
+    def __init__(
+        self,
+        segment_id: str,
+        length_km: float,
+        observed_travel_time_s: float,
+        vehicle_count: float,
+        confidence: Optional[float] = None,
+        road_closure: bool = False,
+        fetched_at: Optional[str] = None,
+        raw_ref: Optional[str] = None,
+        polyline_ref: Optional[str] = None,
+    ):
+        self.segment_id = segment_id
+        self.length_km = float(length_km)
+        self.observed_travel_time_s = float(observed_travel_time_s)
+        self.vehicle_count = vehicle_count
+        self.confidence = confidence
+        self.road_closure = bool(road_closure)
+        self.fetched_at = fetched_at
+        self.raw_ref = raw_ref
+        self.polyline_ref = polyline_ref
+
+    # dict-style access for code written against canonical segment dicts
+    def __getitem__(self, key: str) -> Any:
+        if key not in SEGMENT_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default) if key in SEGMENT_FIELDS else default
+
+    def __repr__(self) -> str:
+        return (f"Segment({self.segment_id!r}, length_km={self.length_km:.3f}, "
+                f"observed_travel_time_s={self.observed_travel_time_s:.1f}, vehicle_count={self.vehicle_count})")
+
+    @classmethod
+    def from_dict(cls, seg: Dict[str, Any]) -> "Segment":
+        """Build from a canonical segment dict (as produced by sources.tomtom)."""
+        raw = seg.get("raw") or {}
+        return cls(
+            segment_id=seg["segment_id"],
+            length_km=seg["length_km"],
+            observed_travel_time_s=seg["observed_travel_time_s"],
+            vehicle_count=seg["vehicle_count"],
+            confidence=seg.get("confidence", raw.get("confidence")),
+            road_closure=seg.get("road_closure", raw.get("roadClosure", False)),
+            fetched_at=seg.get("fetched_at"),
+            raw_ref=seg.get("raw_ref", raw.get("ref")),
+            polyline_ref=seg.get("polyline_ref", raw.get("polyline_ref")),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in SEGMENT_FIELDS}
+
+
+def to_structured_array(segments: Iterable[Any]):
+    """Pack segments (Segment or canonical dicts) into a NumPy structured array."""
+    import numpy as np
+
+    segs = [s if isinstance(s, Segment) else Segment.from_dict(s) for s in segments]
+    dtype = [
+        ("segment_id", "U32"),
+        ("length_km", "f8"),
+        ("observed_travel_time_s", "f8"),
+        ("vehicle_count", "f8"),
+        ("confidence", "f8"),
+        ("road_closure", "?"),
+        ("fetched_at", "U32"),
+    ]
+    return np.array(
+        [
+            (
+                s.segment_id,
+                s.length_km,
+                s.observed_travel_time_s,
+                float(s.vehicle_count),
+                float("nan") if s.confidence is None else float(s.confidence),
+                s.road_closure,
+                s.fetched_at or "",
+            )
+            for s in segs
+        ],
+        dtype=dtype,
+    )
@@ -0,0 +1,125 @@
+"""Pluggable serializers for cache entries, raw archive records and exports.
+
+    s = get_serializer("marshal+zlib")
+    blob = s.dumps(obj)          # bytes
+    s.loads(blob)                # == obj
+    loads_any(blob)              # decodes whatever any serializer wrote
+
+Formats (append ``+zlib`` to any of them for compression):
+
+    json     UTF-8 JSON, the default: portable and human-readable
+    marshal  stdlib binary; fastest and compact for the float-heavy TomTom
+             payloads, but tied to the CPython marshal version — fine for
+             caches, avoid for long-lived archives
+    msgpack  portable binary; needs the optional ``msgpack`` package
+
+Everything except plain JSON is framed with a 4-byte header (``0xFF 'S'``,
+format code, flags) that cannot start a JSON document, so readers accept
+entries written under any setting and a serializer switch needs no
+migration.  Only JSON-compatible values (dict, list, str, int, float, bool,
+None) are supported, whatever the format.
+"""
+
+import json
+import marshal
+import zlib
+from dataclasses import dataclass
+from typing import Any, Union
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+# What a corrupt or truncated body raises from json / marshal / zlib / msgpack
+_DECODE_ERRORS = (ValueError, TypeError, EOFError, zlib.error) + (
+    (msgpack.exceptions.UnpackException,) if msgpack is not None else ()
+)
+
+DEFAULT = "json"
+COMPRESS_LEVEL = 6
+
+_MAGIC = b"\xffS"
+_CODES = {"json": 1, "marshal": 2, "msgpack": 3}
+_FORMATS = {v: k for k, v in _CODES.items()}
+_FLAG_ZLIB = 1
+
+
+def _encode(fmt: str, obj: Any) -> bytes:
+    if fmt == "json":
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if fmt == "marshal":
+        return marshal.dumps(obj)
+    return msgpack.packb(obj, use_bin_type=True)
+
+
+def _decode(fmt: str, blob: bytes) -> Any:
+    if fmt == "json":
+        return json.loads(blob)
+    if fmt == "marshal":
+        return marshal.loads(blob)
+    if msgpack is None:
+        raise RuntimeError("serialization: entry is msgpack-encoded but msgpack is not installed")
+    return msgpack.unpackb(blob, raw=False)
+
+
+@dataclass(frozen=True)
+class Serializer:
+    fmt: str
+    compress: bool = False
+
+    @property
+    def name(self) -> str:
+        return self.fmt + ("+zlib" if self.compress else "")
+
+    @property
+    def binary(self) -> bool:
+        return self.name != "json"
+
+    @property
+    def suffix(self) -> str:
+        """File suffix for entries written by this serializer."""
+        return ".bin" if self.binary else ".json"
+
+    def dumps(self, obj: Any) -> bytes:
+        body = _encode(self.fmt, obj)
+        if not self.binary:
+            return body
+        if self.compress:
+            body = zlib.compress(body, COMPRESS_LEVEL)
+        return _MAGIC + bytes((_CODES[self.fmt], _FLAG_ZLIB if self.compress else 0)) + body
+
+    def loads(self, blob: Union[bytes, str]) -> Any:
+        return loads_any(blob)
+
+
+def get_serializer(spec: str = DEFAULT) -> Serializer:
+    """Serializer for ``<format>[+zlib]``; raises ValueError for unknown or unavailable formats."""
+    fmt, _, extra = (spec or DEFAULT).strip().lower().partition("+")
+    if fmt not in _CODES or extra not in ("", "zlib"):
+        raise ValueError(f"serialization: unknown serializer {spec!r} (expected json|marshal|msgpack[+zlib])")
+    if fmt == "msgpack" and msgpack is None:
+        raise ValueError("serialization: msgpack serializer requested but the msgpack package is not installed")
+    return Serializer(fmt, extra == "zlib")
+
+
+def loads_any(blob: Union[bytes, str]) -> Any:
+    """Decode *blob* written by any serializer (or plain JSON text).
+
+    Raises ValueError for anything that does not decode (torn or corrupt
+    entries), whichever format it claims to be.
+    """
+    if isinstance(blob, str):
+        return json.loads(blob)
+    if blob[:2] != _MAGIC:
+        return json.loads(blob)
+    fmt = _FORMATS.get(blob[2]) if len(blob) >= 4 else None
+    if fmt is None:
+        raise ValueError(f"serialization: unknown frame header {blob[:4]!r}")
+    try:
+        body = blob[4:]
+        if blob[3] & _FLAG_ZLIB:
+            body = zlib.decompress(body)
+        return _decode(fmt, body)
+    except _DECODE_ERRORS as exc:
+        raise ValueError(f"serialization: corrupt {fmt} entry ({type(exc).__name__}: {exc})") from exc
@@ -2,8 +2,7 @@ import os
 from datetime import datetime
 from urllib.parse import urlparse
 
-import requests
-
+from . import transport
 from .cache import cache_read, cache_write
 
 # Prefer HTTPS. Some environments may redirect HTTP to unrelated domains; we block that.
@@ -12,7 +11,7 @@ _ALLOWED_HOSTS = {"www.svivaaqm.net", "svivaaqm.net"}
 
 
 def _safe_get(url: str, *, params: dict, timeout: int = 20):
-    r = requests.get(url, params=params, timeout=timeout, allow_redirects=False)
+    r = transport.get(url, params=params, timeout=timeout, allow_redirects=False)
     if r.is_redirect or r.status_code in (301, 302, 303, 307, 308):
         loc = r.headers.get("Location", "")
         host = urlparse(loc).hostname
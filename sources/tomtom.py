@@ -1,9 +1,13 @@
 import os
 import math
-import requests
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack
 from typing import Dict, Any, List, Tuple
 from datetime import datetime
-from .cache import cache_read, cache_write
+from . import geodesy, transport
+from .cache import cache_read, cache_write, single_flight
+from .provenance import raw_ref, store_raw
 from .rate_limiter import can_call_api, record_api_call, get_quota_status
 from .logger import log_api_call, log_error, log_quota_alert
 
@@ -19,6 +23,21 @@ FLOW_VPH_CAP = int(os.getenv("TT_FLOW_VPH_CAP", "6000"))
 CONFIDENCE_MIN = float(os.getenv("TT_CONFIDENCE_MIN", "0.5"))
 POLYLINE_HALF_WINDOW = int(os.getenv("TT_POLYLINE_HALF_WINDOW", "8"))
 
+# Concurrent probe fetching: worker threads (1 = sequential), per-request
+# timeout and a deadline for the whole batch of probes in one refresh.
+FETCH_WORKERS = int(os.getenv("TT_FETCH_WORKERS", "8"))
+PROBE_TIMEOUT_S = float(os.getenv("TT_PROBE_TIMEOUT_S", "20"))
+CYCLE_DEADLINE_S = float(os.getenv("TT_CYCLE_DEADLINE_S", "45"))
+# Single-flight across processes: how long a caller waits for another one's
+# in-flight refresh of the same corridor before failing it (0 = no coalescing).
+SINGLE_FLIGHT_WAIT_S = float(os.getenv("TT_SINGLE_FLIGHT_WAIT_S", str(CYCLE_DEADLINE_S + 5)))
+# Partial refresh: a probe that fails is served from its last good value (if
+# younger than TT_PROBE_STALE_MAX_S) instead of failing its whole corridor,
+# as long as at most TT_PARTIAL_MAX_STALE_FRACTION of the corridor is stale.
+PARTIAL_REFRESH = os.getenv("TT_PARTIAL_REFRESH", "1") != "0"
+PROBE_STALE_MAX_S = float(os.getenv("TT_PROBE_STALE_MAX_S", "1800"))
+PARTIAL_MAX_STALE_FRACTION = float(os.getenv("TT_PARTIAL_MAX_STALE_FRACTION", "0.5"))
+
 # Probe points along Ayalon (lat, lon) - sample list; user can refine
 PROBE_POINTS = [
     {"id": "la_guardia", "lat": 32.038, "lon": 34.782},
@@ -43,19 +62,7 @@ def _polyline_length_km(coords: List[Dict[str, float]]) -> float:
     """Compute polyline length in km for a list of coordinate dicts."""
     if not isinstance(coords, list) or len(coords) < 2:
         raise ValueError("TomTom v4: coordinates missing or insufficient (<2 points)")
-    total = 0.0
-    def get_lat_lon(c):
-        lat = c.get("latitude") if "latitude" in c else c.get("lat")
-        lon = c.get("longitude") if "longitude" in c else c.get("lon") or c.get("lng")
-        if lat is None or lon is None:
-            raise ValueError("TomTom v4: coordinate missing lat/lon")
-        return float(lat), float(lon)
-    prev = coords[0]
-    for cur in coords[1:]:
-        lat1, lon1 = get_lat_lon(prev)
-        lat2, lon2 = get_lat_lon(cur)
-        total += _haversine_km(lat1, lon1, lat2, lon2)
-        prev = cur
+    total = geodesy.polyline_length_km(geodesy.coords_to_array(coords))
     if total <= 0:
         raise ValueError("TomTom v4: computed polyline length is non-positive")
     return total
@@ -65,23 +72,7 @@ def _nearest_coord_index(coords: List[Dict[str, float]], lat: float, lon: float)
     """Return index of coordinate closest to given probe point (Haversine)."""
     if not coords:
         raise ValueError("TomTom v4: coordinates missing for nearest index computation")
-
-    def get_lat_lon(c):
-        lat_v = c.get("latitude") if "latitude" in c else c.get("lat")
-        lon_v = c.get("longitude") if "longitude" in c else c.get("lon") or c.get("lng")
-        if lat_v is None or lon_v is None:
-            raise ValueError("TomTom v4: coordinate missing lat/lon")
-        return float(lat_v), float(lon_v)
-
-    min_idx = 0
-    min_dist = float("inf")
-    for idx, c in enumerate(coords):
-        c_lat, c_lon = get_lat_lon(c)
-        dist = _haversine_km(lat, lon, c_lat, c_lon)
-        if dist < min_dist:
-            min_dist = dist
-            min_idx = idx
-    return min_idx
+    return int(geodesy.nearest_vertex(geodesy.coords_to_array(coords), (lat, lon))[0])
 
 
 def _windowed_coords(coords: List[Dict[str, float]], center_idx: int, half_window: int = POLYLINE_HALF_WINDOW) -> List[Dict[str, float]]:
@@ -102,12 +93,61 @@ def _windowed_coords(coords: List[Dict[str, float]], center_idx: int, half_windo
     return window
 
 
+# Geometry cache: the snapped polyline window and its length per probe, keyed by
+# the polyline's content hash.  A process-local tier sits in front of the
+# on-disk cache; a changed polyline (new hash) is recomputed and replaces it.
+GEOMETRY_CACHE_MAX_AGE_S = 30 * 86400
+_GEOMETRY: Dict[str, Dict[str, Any]] = {}
+
+
+def _geometry_cache_key(p: Dict[str, Any], half_window: int) -> str:
+    return f"tt_geom_{p['id']}_{p['lat']:.5f}_{p['lon']:.5f}_w{half_window}"
+
+
+def _probe_geometry(p: Dict[str, Any], coords: List[Dict[str, float]], half_window: int = POLYLINE_HALF_WINDOW) -> Dict[str, Any]:
+    """Return {polyline_ref, nearest_idx, points_total, points_used, length_km} for a probe.
+
+    On a hit (same probe, same polyline hash) only the hash is computed;
+    otherwise the window is snapped, measured and the polyline stored once
+    in the raw provenance store.
+    """
+    key = _geometry_cache_key(p, half_window)
+    polyline_ref = raw_ref(coords)
+    geom = _GEOMETRY.get(key)
+    if geom is None or geom.get("polyline_ref") != polyline_ref:
+        geom = cache_read(key, max_age_s=GEOMETRY_CACHE_MAX_AGE_S)
+    if geom and geom.get("polyline_ref") == polyline_ref:
+        _GEOMETRY[key] = geom
+        return geom
+
+    nearest_idx = _nearest_coord_index(coords, p["lat"], p["lon"])
+    window = _windowed_coords(coords, nearest_idx, half_window=half_window)
+    geom = {
+        "polyline_ref": store_raw(coords, kind="polyline"),
+        "nearest_idx": nearest_idx,
+        "points_total": len(coords),
+        "points_used": len(window),
+        "length_km": _polyline_length_km(window),
+    }
+    cache_write(key, geom)
+    _GEOMETRY[key] = geom
+    return geom
+
+
+def _without_coordinates(js: Dict[str, Any]) -> Dict[str, Any]:
+    """Response copy without the polyline (kept once via polyline_ref)."""
+    data = js.get("flowSegmentData")
+    if not isinstance(data, dict) or "coordinates" not in data:
+        return js
+    return {**js, "flowSegmentData": {k: v for k, v in data.items() if k != "coordinates"}}
+
+
 def _call_tomtom(api_key: str, lat: float, lon: float, unit: str = "KMPH") -> Tuple[Dict[str, Any], Dict[str, Any], str, int]:
     """Perform TomTom Flow API call, return (json, headers, url_without_key, status_code)."""
     params = {"point": f"{lat},{lon}", "unit": unit, "openLr": "false", "key": api_key}
 
     start = datetime.utcnow()
-    r = requests.get(BASE, params=params, timeout=20)
+    r = transport.get(BASE, params=params, timeout=PROBE_TIMEOUT_S)
     status = r.status_code
     # Build URL without key for provenance
     params_no_key = {k: v for k, v in params.items() if k != "key"}
@@ -198,9 +238,8 @@ def _segment_from_probe(p: Dict[str, Any], api_key: str | None, mode: str = "flo
         raise RuntimeError(f"TomTom v4: coordinates structure invalid segment={p['id']} endpoint={url_wo_key}")
 
     half_window = POLYLINE_HALF_WINDOW
-    nearest_idx = _nearest_coord_index(coords_list, p["lat"], p["lon"])
-    coords_window = _windowed_coords(coords_list, nearest_idx, half_window=half_window)
-    length_km = _polyline_length_km(coords_window)
+    geom = _probe_geometry(p, coords_list, half_window)
+    length_km = geom["length_km"]
 
     # Speed/time consistency check disabled in v1.1 to avoid false positives from zoom-shifted coordinates.
 
@@ -215,14 +254,18 @@ def _segment_from_probe(p: Dict[str, Any], api_key: str | None, mode: str = "flo
         "observed_travel_time_s": travel_time_s,
         "vehicle_count": vehicle_count,
         "raw": {
-            "response": js,
-            "headers": headers,
+            # Response + headers are kept once, out of band, by content hash; the
+            # polyline is stored separately (polyline_ref) since it rarely changes.
+            "ref": store_raw({"response": _without_coordinates(js), "headers": headers}, kind="tomtom_response"),
+            "polyline_ref": geom["polyline_ref"],
             "tracking_id": tracking_id,
             "request": {"endpoint": BASE, "point": f"{p['lat']},{p['lon']}", "unit": "KMPH", "openLr": "false"},
             "confidence": confidence,
             "roadClosure": road_closure,
-            "polyline_points_total": len(coords_list),
-            "polyline_points_used": len(coords_window),
+            "current_speed_kmh": speed_kmph,
+            "free_flow_speed_kmh": float(data["freeFlowSpeed"]),
+            "polyline_points_total": geom["points_total"],
+            "polyline_points_used": geom["points_used"],
             "polyline_window_half": half_window,
         },
         "source_id": "tomtom_flow_v4",
@@ -232,62 +275,295 @@ def _segment_from_probe(p: Dict[str, Any], api_key: str | None, mode: str = "flo
     return seg
 
 
+def _aggregate_cache_key(corridor_id: str, mode: str) -> str:
+    # Ayalon keeps its historical key so existing stale-fallback caches stay valid.
+    if corridor_id == "ayalon":
+        return f"tomtom_ayalon_v4_abs10_{mode}"
+    return f"tomtom_{corridor_id}_v4_abs10_{mode}"
+
+
+def probe_cache_key(p: Dict[str, Any], mode: str) -> str:
+    return f"tt_v4_abs10_{mode}_{p['id']}_{p['lat']:.3f}_{p['lon']:.3f}"
+
+
+def _fetch_probes(
+    pending: Dict[str, Tuple[List[Any], List[Tuple[int, Dict[str, Any]]]]],
+    api_key: str | None,
+    mode: str,
+    executor: Executor | None = None,
+    fail_fast: bool = True,
+) -> Dict[str, Dict[int, Exception]]:
+    """Fill *pending* probe slots in place; return {corridor_id: {slot: error}} for failed probes.
+
+    Probes run concurrently on *executor* (or a private pool of FETCH_WORKERS
+    threads); FETCH_WORKERS=1 without an executor keeps the sequential path.
+    Each request is bounded by PROBE_TIMEOUT_S and the whole batch by
+    CYCLE_DEADLINE_S: probes still outstanding at the deadline fail with a
+    TimeoutError.  With *fail_fast*, once a corridor has failed its
+    not-yet-started probes are cancelled (only the first error is reported)
+    so no quota is spent on a corridor that will be discarded; without it
+    every probe is attempted (partial refresh).  Quota accounting is
+    unchanged: every completed call is recorded by _call_tomtom, whichever
+    thread made it.
+    """
+    errors: Dict[str, Dict[int, Exception]] = {}
+    jobs = [(cid, i, p) for cid, (_slots, todo) in pending.items() for i, p in todo]
+    if not jobs:
+        return errors
+
+    if executor is None and FETCH_WORKERS <= 1:
+        for cid, (slots, todo) in pending.items():
+            for i, p in todo:
+                try:
+                    slots[i] = _segment_from_probe(p, api_key, mode=mode)
+                except Exception as exc:
+                    errors.setdefault(cid, {})[i] = exc
+                    if fail_fast:
+                        break  # fail-closed: do not spend quota on the rest of this corridor
+        return errors
+
+    own = executor is None
+    pool = ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(jobs))) if own else executor
+    try:
+        futures: Dict[Future, Tuple[str, int]] = {
+            pool.submit(_segment_from_probe, p, api_key, mode): (cid, i) for cid, i, p in jobs
+        }
+        deadline = time.monotonic() + CYCLE_DEADLINE_S
+        remaining = set(futures)
+        while remaining:
+            done, remaining = wait(remaining, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for fut in done:
+                cid, i = futures[fut]
+                if fut.cancelled():
+                    continue
+                try:
+                    # Keep successes even for a failed corridor: the call was paid for and gets cached.
+                    pending[cid][0][i] = fut.result()
+                except Exception as exc:
+                    if fail_fast and cid in errors:
+                        continue
+                    errors.setdefault(cid, {})[i] = exc
+                    if fail_fast:
+                        for other in remaining:
+                            if futures[other][0] == cid:
+                                other.cancel()
+        for fut in remaining:
+            cid, i = futures[fut]
+            fut.cancel()
+            if fail_fast and cid in errors:
+                continue
+            errors.setdefault(cid, {})[i] = TimeoutError(
+                f"TomTom v4: probe fetch exceeded cycle deadline of {CYCLE_DEADLINE_S:.0f}s for corridor={cid}"
+            )
+    finally:
+        if own:
+            # Do not wait for stragglers past the deadline; their results are discarded.
+            pool.shutdown(wait=False, cancel_futures=True)
+    return errors
+
+
+def get_corridors_segments(
+    corridors: List[Dict[str, Any]],
+    api_key: str | None,
+    cache_ttl_s: int = 300,
+    mode: str = "flow",
+    executor: Executor | None = None,
+    probe_max_age_s: Dict[str, float] | None = None,
+) -> Dict[str, Any]:
+    """Return canonical segments for several corridors in one batch.
+
+    *corridors* are registry entries ``{"id": ..., "probes": [{"id", "lat", "lon"}, ...]}``
+    (see ``sources.corridors``).  Rate limiting is applied once for the whole
+    batch; probes of every corridor are fetched concurrently through *executor*
+    when given (shared worker pool), else through a private bounded pool (see
+    _fetch_probes for timeouts and the cycle deadline).
+
+    *probe_max_age_s* maps per-probe cache keys (``probe_cache_key``) to the
+    cache age at which that probe is due (see ``sources.scheduler``); with it,
+    each aggregate is rebuilt from fresh and still-valid cached probes.
+
+    Concurrent cache misses are coalesced across processes (collector,
+    run_reproduce.py, ad-hoc scripts): the refresh of each corridor runs under
+    a file lock keyed by its aggregate cache key.  A caller that finds the
+    lock held waits up to SINGLE_FLIGHT_WAIT_S, then re-reads the cache the
+    other caller just filled instead of calling TomTom again; if the wait
+    runs out, that corridor maps to a TimeoutError.
+
+    A probe that fails while others succeed is served from its last good
+    value (see _fill_stale); the payload is then marked ``partial`` with its
+    ``stale_probes``, and is not reused from the aggregate cache, so the next
+    refresh fetches only the stale probes.
+
+    Returns ``{corridor_id: payload}``; a corridor whose probes failed (and
+    could not be filled from recent values) maps to the exception instead
+    (fail-closed per corridor, other corridors unaffected).
+    """
+    out, pending = _plan_corridors(corridors, cache_ttl_s, mode, probe_max_age_s)
+    due = sorted(cid for cid, (_slots, todo) in pending.items() if todo)
+    if not (api_key and due and SINGLE_FLIGHT_WAIT_S > 0):
+        return _refresh_corridors(out, pending, api_key, mode, executor)
+
+    by_id = {c["id"]: c for c in corridors}
+    deadline = time.monotonic() + SINGLE_FLIGHT_WAIT_S
+    with ExitStack() as held:
+        # Fixed (sorted) lock order, so callers with overlapping corridor sets cannot deadlock.
+        for cid in due:
+            try:
+                waited = held.enter_context(single_flight(
+                    _aggregate_cache_key(cid, mode), max(0.0, deadline - time.monotonic())
+                ))
+            except TimeoutError as exc:
+                del pending[cid]
+                out[cid] = exc
+                continue
+            if waited:
+                # Another caller refreshed this corridor meanwhile: take what it cached.
+                del pending[cid]
+                fresh_out, fresh_pending = _plan_corridors([by_id[cid]], cache_ttl_s, mode, probe_max_age_s)
+                out.update(fresh_out)
+                pending.update(fresh_pending)
+        return _refresh_corridors(out, pending, api_key, mode, executor)
+
+
+def _plan_corridors(
+    corridors: List[Dict[str, Any]],
+    cache_ttl_s: int,
+    mode: str,
+    probe_max_age_s: Dict[str, float] | None,
+) -> Tuple[Dict[str, Any], Dict[str, Tuple[List[Any], List[Tuple[int, Dict[str, Any]]]]]]:
+    """Split corridors into cached aggregates and (slots, probes to fetch) from the caches."""
+    out: Dict[str, Any] = {}
+    pending: Dict[str, Tuple[List[Any], List[Tuple[int, Dict[str, Any]]]]] = {}
+
+    for c in corridors:
+        cid = c["id"]
+        cached = None if probe_max_age_s is not None else cache_read(_aggregate_cache_key(cid, mode), max_age_s=cache_ttl_s)
+        # A partial aggregate is not reused: its fresh probes come from their own
+        # cache entries and only the stale ones are fetched again.
+        if cached and not cached.get("partial"):
+            out[cid] = cached
+            continue
+        # Reuse any per-probe cache entries; keep probe order in the output.
+        slots: List[Any] = []
+        todo: List[Tuple[int, Dict[str, Any]]] = []
+        for i, p in enumerate(c["probes"]):
+            key = probe_cache_key(p, mode)
+            max_age = (probe_max_age_s or {}).get(key, cache_ttl_s)
+            seg_cached = cache_read(key, max_age_s=max_age)
+            slots.append(seg_cached or None)
+            if not seg_cached:
+                todo.append((i, p))
+        pending[cid] = (slots, todo)
+    return out, pending
+
+
+def _refresh_corridors(
+    out: Dict[str, Any],
+    pending: Dict[str, Tuple[List[Any], List[Tuple[int, Dict[str, Any]]]]],
+    api_key: str | None,
+    mode: str,
+    executor: Executor | None,
+) -> Dict[str, Any]:
+    """Fetch the pending probes, cache them and build the corridor aggregates into *out*."""
+    # Apply rate limiting once per batch refresh (not per probe or per corridor).
+    # This prevents a single refresh from being blocked after the first probe call.
+    if api_key and any(todo for _slots, todo in pending.values()):
+        allowed, wait_s = can_call_api("tomtom")
+        if not allowed:
+            raise RuntimeError(f"TomTom v4 rate-limited: retry_after_seconds={wait_s:.1f}")
+
+    errors = _fetch_probes(pending, api_key, mode, executor, fail_fast=not PARTIAL_REFRESH)
+    refreshed_at = datetime.utcnow().isoformat() + "Z"
+
+    for cid, (slots, todo) in pending.items():
+        by_index = dict(todo)
+        for i, seg in enumerate(slots):
+            if seg is not None and i in by_index:
+                cache_write(probe_cache_key(by_index[i], mode), seg)
+        stale = None
+        if cid in errors:
+            stale = _fill_stale(slots, by_index, errors[cid], mode) if PARTIAL_REFRESH else None
+            if stale is None:
+                out[cid] = next(iter(errors[cid].values()))
+                continue
+
+        results = {
+            "source_id": "tomtom_flow_v4" if api_key else "tomtom_flow_v4:sample",
+            "fetched_at": refreshed_at,
+            # Cached probes may be up to the scheduler's max interval old; kept apart
+            # from fetched_at, which health reads as the collection's freshness.
+            "oldest_probe_fetched_at": min(
+                (seg["fetched_at"] for seg in slots if seg.get("fetched_at")),
+                default=refreshed_at,
+            ),
+            "vehicle_count_mode": None,
+            "segments": slots,
+        }
+        if stale:
+            results["partial"] = True
+            results["stale_probes"] = stale
+        modes = {seg.get("vehicle_count_mode") for seg in slots}
+        if "flow_estimated" in modes:
+            results["vehicle_count_mode"] = "flow_estimated"
+        else:
+            results["vehicle_count_mode"] = "normalized_per_probe"
+
+        cache_write(_aggregate_cache_key(cid, mode), results)
+        out[cid] = results
+    return out
+
+
+def _fill_stale(
+    slots: List[Any],
+    by_index: Dict[int, Dict[str, Any]],
+    failed: Dict[int, Exception],
+    mode: str,
+) -> List[Dict[str, Any]] | None:
+    """Put each failed probe's last good segment into its slot, marked stale.
+
+    Returns [{segment_id, age_s, error}] for the stale probes, or None (slots
+    untouched) when the corridor must fail instead: too many probes failed, or
+    a failed probe has no good value younger than PROBE_STALE_MAX_S.
+    """
+    if len(failed) > PARTIAL_MAX_STALE_FRACTION * len(slots):
+        return None
+    now = datetime.utcnow()
+    filled: Dict[int, Dict[str, Any]] = {}
+    stale: List[Dict[str, Any]] = []
+    for i, exc in sorted(failed.items()):
+        last = cache_read(probe_cache_key(by_index[i], mode), max_age_s=PROBE_STALE_MAX_S)
+        if not last or not last.get("fetched_at"):
+            return None
+        age_s = (now - datetime.fromisoformat(last["fetched_at"].rstrip("Z"))).total_seconds()
+        if age_s > PROBE_STALE_MAX_S:
+            return None
+        filled[i] = {**last, "stale": True, "stale_age_s": round(age_s, 1), "stale_error": str(exc)[:200]}
+        stale.append({"segment_id": last.get("segment_id"), "age_s": round(age_s, 1), "error": str(exc)[:200]})
+    for i, seg in filled.items():
+        slots[i] = seg
+    return stale
+
+
 def get_ayalon_segments(api_key: str | None, cache_ttl_s: int = 300, mode: str = "flow") -> Dict[str, Any]:
     """Return canonical segments for Ayalon using TomTom v4.
 
     Default mode is 'flow' and requires TOMTOM_API_KEY. If no key, raises RuntimeError.
     Explicit sample mode is allowed via mode='sample' or env TT_ALLOW_SAMPLE=1 (returns normalized segments).
     """
-    # Aggregate-level cache key includes endpoint style/version
-    aggregate_cache_key = f"tomtom_ayalon_v4_abs10_{mode}"
-    cached = cache_read(aggregate_cache_key, max_age_s=cache_ttl_s)
-    if cached:
-        return cached
-
-    results = {
-        "source_id": "tomtom_flow_v4" if api_key else "tomtom_flow_v4:sample",
-        "fetched_at": datetime.utcnow().isoformat() + "Z",
-        "vehicle_count_mode": None,
-        "segments": [],
-    }
-
-    segments: List[Dict[str, Any]] = []
-    probes_to_fetch: List[Dict[str, Any]] = []
-
-    # First, reuse any per-probe cache entries.
-    for p in PROBE_POINTS:
-        probe_cache_key = f"tt_v4_abs10_{mode}_{p['id']}_{p['lat']:.3f}_{p['lon']:.3f}"
-        seg_cached = cache_read(probe_cache_key, max_age_s=cache_ttl_s)
-        if seg_cached:
-            segments.append(seg_cached)
-        else:
-            probes_to_fetch.append(p)
-
-    # Apply rate limiting once per batch refresh (not per probe).
-    # This prevents a single UI refresh from being blocked after the first probe call.
-    if probes_to_fetch and api_key:
-        allowed, wait_s = can_call_api("tomtom")
-        if not allowed:
-            raise RuntimeError(f"TomTom v4 rate-limited: retry_after_seconds={wait_s:.1f}")
+    corridor = {"id": "ayalon", "probes": PROBE_POINTS}
+    result = get_corridors_segments([corridor], api_key, cache_ttl_s=cache_ttl_s, mode=mode)["ayalon"]
+    if isinstance(result, Exception):
+        raise result
+    return result
 
-    for p in probes_to_fetch:
-        probe_cache_key = f"tt_v4_abs10_{mode}_{p['id']}_{p['lat']:.3f}_{p['lon']:.3f}"
-        seg = _segment_from_probe(p, api_key, mode=mode)
-        segments.append(seg)
-        cache_write(probe_cache_key, seg)
-
-    results["segments"] = segments
-    modes = {seg.get("vehicle_count_mode") for seg in segments}
-    if "flow_estimated" in modes:
-        results["vehicle_count_mode"] = "flow_estimated"
-    else:
-        results["vehicle_count_mode"] = "normalized_per_probe"
 
-    cache_write(aggregate_cache_key, results)
-    return results
+def get_cached_corridor_segments(corridor_id: str, mode: str = "flow", max_age_s: int = 24 * 3600) -> Dict[str, Any] | None:
+    """Return last cached aggregate payload for a corridor even if stale (for resilience/UI fallback)."""
+    return cache_read(_aggregate_cache_key(corridor_id, mode), max_age_s=max_age_s)
 
 
 def get_cached_ayalon_segments(mode: str = "flow", max_age_s: int = 24 * 3600) -> Dict[str, Any] | None:
     """Return last cached aggregate payload even if stale (for resilience/UI fallback)."""
-    aggregate_cache_key = f"tomtom_ayalon_v4_abs10_{mode}"
-    return cache_read(aggregate_cache_key, max_age_s=max_age_s)
+    return get_cached_corridor_segments("ayalon", mode=mode, max_age_s=max_age_s)
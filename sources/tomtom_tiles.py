@@ -0,0 +1,294 @@
+"""Corridor-wide TomTom traffic ingestion from vector flow tiles.
+
+``sources.tomtom`` calls flowSegmentData once per probe point, so quota grows
+with corridor coverage.  This mode fetches the TomTom Vector Flow Tiles
+(protobuf MVT) that cover each corridor instead, one request per tile, and
+extracts every road segment that runs along the corridor path:
+
+1. tiles: all zoom-``TT_TILE_ZOOM`` tiles intersecting the corridor path
+   (``path`` in the corridor registry, else its probes) padded by
+   ``TT_TILE_SNAP_M``; tiles shared by several corridors are fetched once;
+2. decode: only the flow layer (``sources.mvt``), properties first;
+3. snap: each line is cut into legs; a leg is kept if its midpoint lies
+   inside the tile (drops the overlapping tile buffer) and within
+   ``TT_TILE_SNAP_M`` of the corridor path;
+4. a feature becomes one canonical segment if its kept legs are at least
+   ``TT_TILE_MIN_SEGMENT_M`` long and run along the path (not across it).
+
+Speed comes from ``traffic_level`` of the ``absolute`` style (km/h); vehicle
+counts use the same speed x density surrogate as the point API.  Segment ids
+are ``<corridor>:<fwd|rev>:<chainage m>`` (direction and start along the path).
+
+Raw tiles are kept in the provenance archive (``kind="tomtom_flow_tile"``)
+and referenced from each segment.  Payloads have the same shape as
+``tomtom.get_corridors_segments`` (aggregate cache key mode ``"tiles"``).
+"""
+
+import base64
+import os
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from . import geodesy, mvt, transport
+from .cache import cache_read, cache_write, single_flight
+from .logger import log_api_call, log_error, log_quota_alert
+from .provenance import load_raw, store_raw
+from .rate_limiter import can_call_api, get_quota_status, record_api_call
+from .tomtom import (
+    DEFAULT_DENSITY_VEH_PER_KM,
+    FETCH_WORKERS,
+    FLOW_VPH_CAP,
+    PROBE_TIMEOUT_S,
+    SINGLE_FLIGHT_WAIT_S,
+    TOMTOM_QUOTA_PER_DAY,
+    _aggregate_cache_key,
+)
+
+TILE_BASE = "https://api.tomtom.com/traffic/map/4/tile/flow/{style}/{z}/{x}/{y}.pbf"
+TILE_STYLE = "absolute"
+TILE_ZOOM = int(os.getenv("TT_TILE_ZOOM", "12"))
+TILE_LAYER = os.getenv("TT_TILE_LAYER", "Traffic flow")
+SNAP_TOLERANCE_M = float(os.getenv("TT_TILE_SNAP_M", "40"))
+MIN_SEGMENT_M = float(os.getenv("TT_TILE_MIN_SEGMENT_M", "50"))
+# Share of a segment's length that must advance along the corridor path.
+MIN_ALIGNMENT = 0.7
+
+SOURCE_ID = "tomtom_flow_tiles_v4"
+MODE = "tiles"
+
+
+def _tile_key(z: int, x: int, y: int) -> str:
+    return f"tt_tile_{TILE_STYLE}_{z}_{x}_{y}"
+
+
+def corridor_path(c: Dict[str, Any]) -> np.ndarray:
+    """(N, 2) lat/lon path of a corridor: its ``path`` if given, else its probes in order."""
+    pts = c.get("path") or [(p["lat"], p["lon"]) for p in c["probes"]]
+    path = np.asarray(pts, dtype=np.float64).reshape(-1, 2)
+    if len(path) < 2:
+        raise ValueError(f"TomTom tiles: corridor {c['id']!r} needs a path of at least two points")
+    return path
+
+
+def _padded_bbox(path: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(min, max) lat/lon corners of the path, padded by the snap tolerance."""
+    pad_lat = SNAP_TOLERANCE_M / 1000.0 / 111.32
+    pad = np.array([pad_lat, pad_lat / max(0.01, np.cos(np.radians(path[:, 0].mean())))])
+    return path.min(axis=0) - pad, path.max(axis=0) + pad
+
+
+def corridor_tiles(c: Dict[str, Any], z: int | None = None) -> List[Tuple[int, int, int]]:
+    """Tiles (zoom *z*, default TILE_ZOOM) intersecting the corridor path, padded by the snap tolerance."""
+    lo, hi = _padded_bbox(corridor_path(c))
+    return mvt.tiles_for_bbox(lo[0], lo[1], hi[0], hi[1], TILE_ZOOM if z is None else z)
+
+
+def _call_tile(api_key: str, z: int, x: int, y: int) -> Tuple[bytes, Dict[str, Any], str]:
+    """Fetch one vector flow tile; return (pbf bytes, headers, url_without_key)."""
+    url = TILE_BASE.format(style=TILE_STYLE, z=z, x=x, y=y)
+    start = datetime.utcnow()
+    r = transport.get(url, params={"key": api_key}, timeout=PROBE_TIMEOUT_S)
+    elapsed_ms = (datetime.utcnow() - start).total_seconds() * 1000
+    log_api_call("tomtom", url, r.status_code, elapsed_ms)
+    if r.status_code != 200:
+        log_error("tomtom", f"http_{r.status_code}", f"endpoint={url}")
+        raise RuntimeError(f"TomTom tiles fetch failed: status={r.status_code} endpoint={url}")
+
+    record_api_call("tomtom", quota_per_day=TOMTOM_QUOTA_PER_DAY)
+    quota = get_quota_status("tomtom", quota_per_day=TOMTOM_QUOTA_PER_DAY)
+    if quota.get("percent_used", 0) >= 90:
+        log_quota_alert("tomtom", quota.get("calls_today", 0), quota.get("quota_per_day", TOMTOM_QUOTA_PER_DAY))
+    return r.content, dict(r.headers), url
+
+
+def _get_tile(api_key: str, tile: Tuple[int, int, int], cache_ttl_s: int) -> Dict[str, Any]:
+    """Return {tile, ref, fetched_at, data} for a tile, from cache or TomTom (single-flight)."""
+    key = _tile_key(*tile)
+    with single_flight(key, SINGLE_FLIGHT_WAIT_S):
+        entry = cache_read(key, max_age_s=cache_ttl_s)
+        stored = load_raw(entry["ref"]) if entry else None
+        if stored is None:
+            data, headers, url = _call_tile(api_key, *tile)
+            entry = {
+                "ref": store_raw({"tile_b64": base64.b64encode(data).decode("ascii"), "headers": headers, "url": url},
+                                 kind="tomtom_flow_tile"),
+                "fetched_at": datetime.utcnow().isoformat() + "Z",
+            }
+            cache_write(key, entry)
+        else:
+            data = base64.b64decode(stored["tile_b64"])
+    return {"tile": tile, "ref": entry["ref"], "fetched_at": entry["fetched_at"], "data": data}
+
+
+def _extract(c: Dict[str, Any], tiles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Canonical segments for the flow-layer lines of *tiles* that run along corridor *c*."""
+    path = corridor_path(c)
+    road_types = set(c.get("road_types") or [])
+    tol_km = SNAP_TOLERANCE_M / 1000.0
+    segments: List[Dict[str, Any]] = []
+    for t in tiles:
+        z, x, y = t["tile"]
+        layer = mvt.decode_tile(t["data"], layers=[TILE_LAYER]).get(TILE_LAYER)
+        if layer is None:
+            continue
+        ext = layer.extent
+        # Corridor bounding box in this tile's pixels: cheap reject before projecting.
+        box = mvt.latlon_to_tile_pixels(np.vstack(_padded_bbox(path)), z, x, y, ext)
+        box_lo, box_hi = box.min(axis=0), box.max(axis=0)
+
+        # Collect candidate lines of the whole tile, then snap all their legs at once.
+        feats, parts, owner = [], [], []
+        for f in layer.features:
+            props = f.properties
+            if f.type != mvt.GEOM_LINESTRING or props.get("traffic_level") is None:
+                continue
+            if road_types and props.get("road_type") not in road_types:
+                continue
+            for part in f.geometry():
+                if len(part) < 2 or (part.max(axis=0) < box_lo).any() or (part.min(axis=0) > box_hi).any():
+                    continue
+                if not feats or feats[-1] is not f:
+                    feats.append(f)
+                parts.append(part)
+                owner.append(len(feats) - 1)
+        if not parts:
+            continue
+
+        verts = np.vstack(parts)
+        sizes = np.array([len(p) for p in parts])
+        # leg k joins vertex k and k + 1, except across part boundaries
+        is_leg = np.ones(len(verts) - 1, dtype=bool)
+        is_leg[np.cumsum(sizes)[:-1] - 1] = False
+        leg_a = np.flatnonzero(is_leg)
+        leg_b = leg_a + 1
+        leg_owner = np.repeat(owner, sizes - 1)
+        mid_px = (verts[leg_a] + verts[leg_b]) / 2.0
+        inside = (mid_px >= 0).all(axis=1) & (mid_px < ext).all(axis=1)
+
+        latlon = mvt.tile_to_latlon(np.vstack([verts, mid_px]), z, x, y, ext)
+        dist, along = geodesy.polyline_projection(path, latlon)
+        keep = inside & (dist[len(verts):] <= tol_km)
+        latlon, along = latlon[:len(verts)], along[:len(verts)]
+
+        legs = geodesy.haversine_km(latlon[leg_a, 0], latlon[leg_a, 1], latlon[leg_b, 0], latlon[leg_b, 1])
+        length_km = np.bincount(leg_owner, weights=legs * keep, minlength=len(feats))
+        advance_km = np.bincount(leg_owner, weights=(along[leg_b] - along[leg_a]) * keep, minlength=len(feats))
+        start_km = np.full(len(feats), np.inf)
+        np.minimum.at(start_km, leg_owner[keep], np.minimum(along[leg_a], along[leg_b])[keep])
+
+        for k, f in enumerate(feats):
+            if length_km[k] * 1000.0 < MIN_SEGMENT_M or abs(advance_km[k]) < MIN_ALIGNMENT * length_km[k]:
+                continue
+            props = f.properties
+            speed = max(0.0, float(props["traffic_level"]))
+            closed = bool(props.get("road_closure", False))
+            if speed <= 0 and not closed:
+                continue
+            direction = "fwd" if advance_km[k] > 0 else "rev"
+            flow_vph = max(0, min(int(round(speed * DEFAULT_DENSITY_VEH_PER_KM)), FLOW_VPH_CAP))
+            segments.append({
+                "segment_id": f"{c['id']}:{direction}:{int(round(start_km[k] * 1000)):06d}",
+                "length_km": float(length_km[k]),
+                "observed_travel_time_s": float(length_km[k]) / max(speed, 1.0) * 3600.0,
+                "vehicle_count": 0 if closed else flow_vph,
+                "raw": {
+                    "ref": t["ref"],
+                    "tile": f"{z}/{x}/{y}",
+                    "feature_id": f.id,
+                    "roadClosure": closed,
+                    "current_speed_kmh": speed,
+                    "road_type": props.get("road_type"),
+                    "traffic_road_coverage": props.get("traffic_road_coverage"),
+                    "direction": direction,
+                    "chainage_km": round(float(start_km[k]), 4),
+                },
+                "source_id": SOURCE_ID,
+                "fetched_at": t["fetched_at"],
+                "vehicle_count_mode": "flow_estimated",
+            })
+
+    segments.sort(key=lambda s: (s["raw"]["direction"], s["raw"]["chainage_km"], s["raw"]["tile"]))
+    seen: Dict[str, int] = {}
+    for s in segments:
+        n = seen.get(s["segment_id"], 0)
+        seen[s["segment_id"]] = n + 1
+        if n:
+            s["segment_id"] = f"{s['segment_id']}_{n}"
+    return segments
+
+
+def get_corridors_segments(
+    corridors: List[Dict[str, Any]],
+    api_key: str | None,
+    cache_ttl_s: int = 300,
+    executor: Executor | None = None,
+) -> Dict[str, Any]:
+    """Return ``{corridor_id: payload}`` built from vector flow tiles.
+
+    Same contract as ``sources.tomtom.get_corridors_segments``: rate limiting
+    once per batch, tiles fetched concurrently (*executor* or a private pool
+    of FETCH_WORKERS threads) and fail-closed per corridor: a corridor whose
+    tiles failed, or on which no segment matched, maps to the exception.
+    """
+    if not api_key:
+        raise RuntimeError("TomTom tiles: API key missing; set TOMTOM_API_KEY")
+    out: Dict[str, Any] = {}
+    need: Dict[str, List[Tuple[int, int, int]]] = {}
+    for c in corridors:
+        cached = cache_read(_aggregate_cache_key(c["id"], MODE), max_age_s=cache_ttl_s)
+        if cached:
+            out[c["id"]] = cached
+            continue
+        try:
+            need[c["id"]] = corridor_tiles(c)
+        except ValueError as exc:
+            out[c["id"]] = exc
+    tiles = sorted({t for ts in need.values() for t in ts})
+    if not tiles:
+        return out
+
+    if not all(cache_read(_tile_key(*t), max_age_s=cache_ttl_s) for t in tiles):
+        allowed, wait_s = can_call_api("tomtom")
+        if not allowed:
+            raise RuntimeError(f"TomTom tiles rate-limited: retry_after_seconds={wait_s:.1f}")
+
+    own = executor is None
+    pool = ThreadPoolExecutor(max_workers=max(1, min(FETCH_WORKERS, len(tiles)))) if own else executor
+    try:
+        futures = {t: pool.submit(_get_tile, api_key, t, cache_ttl_s) for t in tiles}
+        fetched: Dict[Tuple[int, int, int], Any] = {}
+        for t, fut in futures.items():
+            try:
+                fetched[t] = fut.result()
+            except Exception as exc:
+                fetched[t] = exc
+    finally:
+        if own:
+            pool.shutdown(wait=True)
+
+    by_id = {c["id"]: c for c in corridors}
+    for cid, ts in need.items():
+        failed = [fetched[t] for t in ts if isinstance(fetched[t], Exception)]
+        if failed:
+            out[cid] = failed[0]
+            continue
+        start = time.perf_counter()
+        segments = _extract(by_id[cid], [fetched[t] for t in ts])
+        if not segments:
+            out[cid] = RuntimeError(f"TomTom tiles: no road segments matched corridor={cid} tiles={len(ts)}")
+            continue
+        results = {
+            "source_id": SOURCE_ID,
+            "fetched_at": min(fetched[t]["fetched_at"] for t in ts),
+            "vehicle_count_mode": "flow_estimated",
+            "segments": segments,
+            "tiles": [f"{z}/{x}/{y}" for z, x, y in ts],
+            "extract_ms": round((time.perf_counter() - start) * 1000.0, 1),
+        }
+        cache_write(_aggregate_cache_key(cid, MODE), results)
+        out[cid] = results
+    return out
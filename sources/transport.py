@@ -0,0 +1,131 @@
+"""Shared HTTP transport for all source adapters.
+
+One ``requests.Session`` per host (scheme + netloc) with a keep-alive
+connection pool, so a long-running process (collector loop, Streamlit app)
+reuses TCP/TLS connections across probes and cycles instead of paying a
+fresh handshake per call.
+
+    from . import transport
+    r = transport.get(url, params=params, timeout=20)
+
+Per-host counters (requests, errors, bytes, latency) are kept in memory and
+exposed via :func:`host_stats`.  ``bytes`` comes from ``Content-Length`` (or
+the body already read); streamed responses without that header are not
+counted, so ``stream=True`` callers still read the body themselves.  Sessions
+never store cookies: a session is shared by every caller of its host.
+
+Configured via env vars:
+  HTTP_POOL_CONNECTIONS — pools cached per session (default: 4)
+  HTTP_POOL_MAXSIZE     — keep-alive connections per host (default: 16;
+                          sized for concurrent TomTom probe fetches)
+  HTTP_TIMEOUT_S        — default timeout when a caller passes none (default: 20)
+"""
+
+import os
+import time
+from http.cookiejar import DefaultCookiePolicy
+from threading import Lock
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+DEFAULT_TIMEOUT_S = float(os.getenv("HTTP_TIMEOUT_S", "20"))
+
+_lock = Lock()
+_sessions: Dict[str, requests.Session] = {}
+_stats: Dict[str, Dict[str, float]] = {}
+
+
+def _host_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _new_session() -> requests.Session:
+    s = requests.Session()
+    # No transport-level retries: adapters own their fallback and quota logic.
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    # Shared by unrelated callers: do not carry one caller's cookies into another's requests.
+    s.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return s
+
+
+def session_for(url: str) -> requests.Session:
+    """Return the shared session for *url*'s host (created on first use)."""
+    key = _host_key(url)
+    with _lock:
+        s = _sessions.get(key)
+        if s is None:
+            s = _sessions[key] = _new_session()
+        return s
+
+
+def _record(key: str, elapsed_ms: float, nbytes: int, error: bool) -> None:
+    with _lock:
+        st = _stats.setdefault(key, {
+            "requests": 0, "errors": 0, "bytes": 0,
+            "latency_ms_total": 0.0, "latency_ms_max": 0.0,
+        })
+        st["requests"] += 1
+        st["errors"] += int(error)
+        st["bytes"] += nbytes
+        st["latency_ms_total"] += elapsed_ms
+        st["latency_ms_max"] = max(st["latency_ms_max"], elapsed_ms)
+
+
+def request(method: str, url: str, *, timeout: Optional[float] = None, **kwargs: Any) -> requests.Response:
+    """Issue an HTTP request through the host's pooled session.
+
+    Same arguments and exceptions as ``requests.request``; non-2xx statuses
+    are returned, not raised (callers keep their own status handling).
+    """
+    key = _host_key(url)
+    start = time.perf_counter()
+    try:
+        r = session_for(url).request(method, url, timeout=timeout if timeout is not None else DEFAULT_TIMEOUT_S, **kwargs)
+    except Exception:
+        _record(key, (time.perf_counter() - start) * 1000.0, 0, error=True)
+        raise
+    _record(key, (time.perf_counter() - start) * 1000.0, _body_size(r, kwargs.get("stream", False)),
+            error=r.status_code >= 400)
+    return r
+
+
+def _body_size(r: requests.Response, stream: bool) -> int:
+    """Body bytes without reading a streamed body (0 when unknown)."""
+    try:
+        return int(r.headers["Content-Length"])
+    except (KeyError, TypeError, ValueError):
+        pass
+    return 0 if stream else len(r.content or b"")
+
+
+def get(url: str, *, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None, **kwargs: Any) -> requests.Response:
+    """``requests.get`` equivalent over the shared per-host session."""
+    return request("GET", url, params=params, timeout=timeout, **kwargs)
+
+
+def host_stats() -> Dict[str, Dict[str, float]]:
+    """Snapshot of per-host counters, with mean latency added."""
+    with _lock:
+        out = {}
+        for key, st in _stats.items():
+            row = dict(st)
+            row["latency_ms_mean"] = st["latency_ms_total"] / st["requests"] if st["requests"] else 0.0
+            out[key] = row
+        return out
+
+
+def reset() -> None:
+    """Close all pooled sessions and clear counters (tests, config reload)."""
+    with _lock:
+        for s in _sessions.values():
+            s.close()
+        _sessions.clear()
+        _stats.clear()
@@ -0,0 +1,202 @@
+"""Ayalon scenario / sensitivity sweep over stored history.
+
+Evaluates the model for every point of a parameter grid over a history
+window, using the canonical inputs persisted by the collector
+(``run_inputs`` / ``run_segments``) and the vectorized
+``AyalonModel.run_model_batch`` path.  Grid points are spread over a process
+pool; each worker loads the window's inputs once.
+
+Output is a tidy table: one row per (grid point, counter).
+
+Usage:
+  python sweep.py --param V_free_kmh=80,90,100 --param Value_of_Time_ILS_per_h=62.5,75 \\
+                  --days 30 [--corridor hwy1] --out sweep.csv
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from methodology import AyalonModel
+from sources.corridors import DEFAULT_CORRIDOR_ID
+from sources.history_store import HistoryStore
+
+DEFAULT_CONSTANTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "LOCKED_CONSTANTS.json")
+
+# Model attributes that may be swept (see AyalonModel.__init__)
+SWEEPABLE_PARAMS = (
+    "V_free_kmh",
+    "Fuel_idle_rate_L_per_h",
+    "StopGo_factor",
+    "Value_of_Time_ILS_per_h",
+    "CO2_per_liter",
+)
+
+COUNTERS = ("delta_T_total_h", "fuel_excess_L", "leakage_ils", "co2_emissions_kg", "time_value_ils")
+
+# Per-process state: window inputs loaded once by _init_worker
+_INPUTS: Dict[str, Any] = {}
+
+
+def _utc_iso(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def expand_grid(grid: Dict[str, List[float]]) -> List[Dict[str, float]]:
+    """Cartesian product of a {param: [values]} grid, in stable order."""
+    unknown = set(grid) - set(SWEEPABLE_PARAMS)
+    if unknown:
+        raise ValueError(f"sweep: unknown parameter(s) {sorted(unknown)}; allowed: {list(SWEEPABLE_PARAMS)}")
+    names = list(grid)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(grid[n] for n in names))]
+
+
+def _init_worker(
+    db_path: Optional[str],
+    start_utc: Optional[str],
+    end_utc: Optional[str],
+    constants_path: str,
+    corridor_id: Optional[str] = DEFAULT_CORRIDOR_ID,
+) -> None:
+    import numpy as np
+
+    cols = HistoryStore(db_path).fetch_inputs_columnar(start_utc, end_utc, corridor_id=corridor_id)
+    _INPUTS.clear()
+    _INPUTS.update({
+        "runs": len(cols["pipeline_run_id"]),
+        "run_index": np.asarray(cols["run_index"], dtype=np.int64),
+        "length_km": np.asarray(cols["length_km"], dtype=np.float64),
+        "observed_travel_time_s": np.asarray(cols["observed_travel_time_s"], dtype=np.float64),
+        "vehicle_count": np.asarray(cols["vehicle_count"], dtype=np.float64),
+        "p_fuel_ils_per_l": np.asarray(
+            [p if p is not None else float("nan") for p in cols["p_fuel_ils_per_l"]], dtype=np.float64
+        ),
+        "constants_path": constants_path,
+    })
+
+
+def _evaluate(points: List[Dict[str, float]]) -> Dict[str, Any]:
+    """Window totals for each grid point (runs inside a worker)."""
+    import copy
+    import numpy as np
+
+    base = AyalonModel.from_constants_file(_INPUTS["constants_path"])
+    out = []
+    for params in points:
+        model = copy.copy(base)
+        for k, v in params.items():
+            setattr(model, k, float(v))
+        if _INPUTS["runs"] == 0:
+            totals = {c: 0.0 for c in COUNTERS}
+        else:
+            res = model.run_model_batch(
+                _INPUTS["run_index"], _INPUTS["length_km"], _INPUTS["observed_travel_time_s"],
+                _INPUTS["vehicle_count"], p_fuel_ils_per_l=_INPUTS["p_fuel_ils_per_l"],
+            )
+            totals = {c: float(np.nansum(res[c])) for c in COUNTERS if c in res}
+            totals["time_value_ils"] = totals["delta_T_total_h"] * model.Value_of_Time_ILS_per_h
+        out.append(totals)
+    return {"runs": _INPUTS["runs"], "totals": out}
+
+
+def run_sweep(
+    grid: Dict[str, List[float]],
+    start_utc: Optional[str] = None,
+    end_utc: Optional[str] = None,
+    db_path: Optional[str] = None,
+    workers: Optional[int] = None,
+    constants_path: str = DEFAULT_CONSTANTS_PATH,
+    corridor_id: Optional[str] = DEFAULT_CORRIDOR_ID,
+) -> Dict[str, Any]:
+    """Evaluate every grid point over a corridor's runs in [start_utc, end_utc)
+    (None = every corridor).
+
+    Returns {'rows': tidy rows, 'grid_points', 'runs', 'elapsed_s', 'points_per_s'}.
+    Each tidy row holds grid_id, the swept parameter values, counter and value.
+    """
+    points = expand_grid(grid)
+    db_path = str(HistoryStore(db_path).db_path)
+    t0 = time.perf_counter()
+
+    n_workers = max(1, min(workers or os.cpu_count() or 1, len(points) or 1))
+    chunk = max(1, -(-len(points) // (n_workers * 4)))
+    batches = [points[i:i + chunk] for i in range(0, len(points), chunk)]
+    init_args = (db_path, start_utc, end_utc, constants_path, corridor_id)
+
+    if n_workers == 1:
+        _init_worker(*init_args)
+        results = [_evaluate(b) for b in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=init_args) as pool:
+            results = list(pool.map(_evaluate, batches))
+    totals = [t for res in results for t in res["totals"]]
+    runs = results[0]["runs"] if results else 0
+    elapsed_s = time.perf_counter() - t0
+
+    rows = []
+    for grid_id, (params, tot) in enumerate(zip(points, totals)):
+        for counter in COUNTERS:
+            rows.append({"grid_id": grid_id, **params, "counter": counter, "value": tot.get(counter)})
+    return {
+        "rows": rows,
+        "grid_points": len(points),
+        "runs": runs,
+        "elapsed_s": round(elapsed_s, 3),
+        "points_per_s": round(len(points) / elapsed_s, 1) if elapsed_s > 0 else None,
+    }
+
+
+def write_table(rows: List[Dict[str, Any]], path: str) -> None:
+    """Write tidy rows as CSV ('-' for stdout)."""
+    if not rows:
+        return
+    fields = list(rows[0].keys())
+    f = sys.stdout if path == "-" else open(path, "w", newline="", encoding="utf-8")
+    try:
+        w = csv.DictWriter(f, fieldnames=fields)
+        w.writeheader()
+        w.writerows(rows)
+    finally:
+        if f is not sys.stdout:
+            f.close()
+
+
+def _parse_param(spec: str) -> tuple[str, List[float]]:
+    name, _, values = spec.partition("=")
+    if not values:
+        raise argparse.ArgumentTypeError(f"expected NAME=v1,v2,... got {spec!r}")
+    return name.strip(), [float(v) for v in values.split(",") if v.strip()]
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Ayalon monitor: scenario / sensitivity sweep over history")
+    p.add_argument("--param", action="append", type=_parse_param, required=True,
+                   help=f"NAME=v1,v2,... (repeatable); NAME in {', '.join(SWEEPABLE_PARAMS)}")
+    p.add_argument("--days", type=float, default=30.0, help="History window ending now (default: 30)")
+    p.add_argument("--since", default=None, help="Window start (ISO UTC); overrides --days")
+    p.add_argument("--until", default=None, help="Window end (ISO UTC, exclusive)")
+    p.add_argument("--db", default=None, help="SQLite history DB (default: HISTORY_DB_PATH or data/monitor.sqlite3)")
+    p.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    p.add_argument("--constants", default=DEFAULT_CONSTANTS_PATH, help="Base constants file")
+    p.add_argument("--corridor", default=DEFAULT_CORRIDOR_ID, help=f"Corridor to sweep (default: {DEFAULT_CORRIDOR_ID})")
+    p.add_argument("--all-corridors", action="store_true", help="Sweep over every corridor's runs")
+    p.add_argument("--out", default="-", help="Output CSV path ('-' = stdout)")
+    args = p.parse_args()
+
+    since = args.since or _utc_iso(datetime.now(timezone.utc) - timedelta(days=args.days))
+    out = run_sweep(dict(args.param), since, args.until, db_path=args.db, workers=args.workers,
+                    constants_path=args.constants, corridor_id=None if args.all_corridors else args.corridor)
+    write_table(out["rows"], args.out)
+    print(f"OK  grid={out['grid_points']}  runs={out['runs']}  {out['elapsed_s']}s  "
+          f"{out['points_per_s']} points/s", file=sys.stderr, flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
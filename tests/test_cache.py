@@ -0,0 +1,216 @@
+"""Tests for the file cache and its in-process memory tier."""
+
+import json
+import os
+import time
+
+import pytest
+
+from sources import cache
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(cache, "LOCK_DIR", tmp_path / "_locks")
+    cache.mem_reset()
+    yield tmp_path
+    cache.mem_reset()
+
+
+def _count_parses(monkeypatch):
+    calls = []
+    real = cache.serialization.loads_any
+
+    def counting(blob):
+        calls.append(real(blob)["data"])
+        return real(blob)
+
+    monkeypatch.setattr(cache.serialization, "loads_any", counting)
+    return calls
+
+
+def test_repeated_reads_are_served_from_memory(monkeypatch):
+    cache.cache_write("k", {"v": 1})
+    parses = _count_parses(monkeypatch)
+    first = cache.cache_read("k")
+    assert cache.cache_read("k") is first
+    assert cache.cache_read("k") == {"v": 1}
+    assert len(parses) == 1
+    assert cache.mem_stats()["hits"] == 2 and cache.mem_stats()["misses"] == 1
+
+    # A rewrite (here, or by another process) changes the file's stamp.
+    cache.cache_write("k", {"v": 2})
+    assert cache.cache_read("k") == {"v": 2}
+    (cache.CACHE_DIR / "k.json").write_text(json.dumps({"ts": time.time(), "data": {"v": 333}}))
+    assert cache.cache_read("k") == {"v": 333}
+    assert len(parses) == 3
+
+    (cache.CACHE_DIR / "k.json").unlink()
+    assert cache.cache_read("k") is None
+    assert cache.mem_stats()["entries"] == 0
+
+
+def test_expired_entries_are_rejected_from_their_mtime(monkeypatch):
+    cache.cache_write("old", {"v": 1})
+    path = cache.CACHE_DIR / "old.json"
+    os.utime(path, (time.time() - 3600, time.time() - 3600))
+    parses = _count_parses(monkeypatch)
+    assert cache.cache_read("old", max_age_s=300) is None
+    assert parses == []
+    # Within the entry's own 'ts' window the mtime is not trusted to reject it.
+    assert cache.cache_read("old", max_age_s=7200) == {"v": 1}
+
+
+def test_memory_tier_is_bounded_lru(monkeypatch):
+    monkeypatch.setattr(cache, "MEM_MAX_ENTRIES", 2)
+    for name in "abc":
+        cache.cache_write(name, {"name": name})
+    cache.cache_read("a")
+    cache.cache_read("b")
+    cache.cache_read("a")      # b is now least recently used
+    cache.cache_read("c")      # evicts b
+    stats = cache.mem_stats()
+    assert stats["entries"] == 2 and stats["evictions"] == 1
+    parses = _count_parses(monkeypatch)
+    cache.cache_read("a")
+    cache.cache_read("b")
+    assert parses == [{"name": "b"}]
+
+
+_WRITER = """
+import sys, time
+from pathlib import Path
+from sources import cache
+cache.CACHE_DIR, cache.LOCK_DIR = Path(sys.argv[1]), Path(sys.argv[1]) / "_locks"
+deadline = time.time() + float(sys.argv[2])
+i = 0
+while time.time() < deadline:
+    cache.cache_write("hot", {"writer": sys.argv[3], "i": i, "pad": "x" * (1000 + 50000 * (i % 2))})
+    i += 1
+"""
+
+
+def test_concurrent_writers_never_expose_torn_files(isolated):
+    import subprocess
+    import sys
+
+    cache.cache_write("hot", {"writer": "init", "i": 0, "pad": ""})
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    writers = [subprocess.Popen([sys.executable, "-c", _WRITER, str(isolated), "1.5", str(n)], cwd=root)
+               for n in range(3)]
+    reads = 0
+    try:
+        while any(w.poll() is None for w in writers):
+            cache.mem_reset()  # force a parse of whatever is on disk
+            data = cache.cache_read("hot")
+            assert data is not None and len(data["pad"]) in (0, 1000, 51000)
+            reads += 1
+    finally:
+        for w in writers:
+            w.wait()
+    assert all(w.returncode == 0 for w in writers)
+    assert reads > 0
+    assert not list(isolated.glob(".hot.json.*.tmp"))
+
+
+def test_write_locks_are_striped(monkeypatch, isolated):
+    monkeypatch.setattr(cache, "WRITE_LOCK_STRIPES", 4)
+    for i in range(50):
+        cache.cache_write(f"tt_v4_abs10_flow_p{i}", {"i": i})
+    assert len(list((isolated / "_locks").glob("*.wlock"))) <= 4
+    assert cache._write_lock("k").path == cache._write_lock("k").path
+
+
+def test_failed_write_keeps_previous_entry(monkeypatch, isolated):
+    cache.cache_write("k", {"v": 1})
+
+    def crash(fd):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(cache.os, "fsync", crash)
+    with pytest.raises(OSError):
+        cache.cache_write("k", {"v": 2})
+    assert cache.cache_read("k") == {"v": 1}
+    assert [p.name for p in isolated.iterdir() if p.is_file()] == ["k.json"]
+
+
+@pytest.fixture(params=["files", "sqlite"])
+def backend(request, monkeypatch):
+    monkeypatch.setattr(cache, "BACKEND", request.param)
+    return request.param
+
+
+def test_backends_share_the_read_write_api(backend, monkeypatch):
+    assert cache.cache_read("tt_v4_abs10_flow_a1") is None
+    cache.cache_write("tt_v4_abs10_flow_a1", {"speed": 80})
+    assert cache.cache_read("tt_v4_abs10_flow_a1") == {"speed": 80}
+    assert cache.cache_read("tt_v4_abs10_flow_a1") is cache.cache_read("tt_v4_abs10_flow_a1")
+    cache.cache_write("tt_v4_abs10_flow_a1", {"speed": 60})
+    assert cache.cache_read("tt_v4_abs10_flow_a1") == {"speed": 60}
+
+    later = time.time() + 600
+    monkeypatch.setattr(cache.time, "time", lambda: later)
+    assert cache.cache_read("tt_v4_abs10_flow_a1", max_age_s=300) is None
+    assert cache.cache_read("tt_v4_abs10_flow_a1", max_age_s=3600) == {"speed": 60}
+    # One database file instead of one JSON file per key.
+    assert (cache.CACHE_DIR / "cache.sqlite3").exists() == (backend == "sqlite")
+    assert bool(list(cache.CACHE_DIR.glob("*.json"))) == (backend == "files")
+
+
+def test_scan_evict_and_size(backend, monkeypatch):
+    now = time.time()
+    for name, age in (("tt_v4_abs10_flow_a1", 10), ("tt_v4_abs10_flow_a2", 7200),
+                      ("tt_v4_abs10_flow_b1", 7200), ("tt_v4_abs10_raw_a1", 10), ("fuel_price", 7200)):
+        monkeypatch.setattr(cache.time, "time", lambda: now - age)
+        cache.cache_write(name, {"name": name})
+        if backend == "files":
+            os.utime(cache.CACHE_DIR / f"{name}.json", (now - age, now - age))
+    monkeypatch.setattr(cache.time, "time", lambda: now)
+
+    flow = cache.cache_scan("tt_v4_abs10_flow_")
+    assert [e["name"] for e in flow] == ["tt_v4_abs10_flow_a1", "tt_v4_abs10_flow_a2", "tt_v4_abs10_flow_b1"]
+    assert all(e["size_bytes"] > 0 for e in flow)
+    assert cache.cache_size()["entries"] == 5
+    total = cache.cache_size()["bytes"]
+
+    assert cache.cache_evict(3600, prefix="tt_v4_abs10_flow_") == 2
+    assert [e["name"] for e in cache.cache_scan()] == ["fuel_price", "tt_v4_abs10_flow_a1", "tt_v4_abs10_raw_a1"]
+    assert cache.cache_read("tt_v4_abs10_flow_a2", max_age_s=10**6) is None
+    assert cache.cache_evict(3600) == 1
+    assert cache.cache_delete("tt_v4_abs10_raw_a1", "missing") == 1
+    size = cache.cache_size()
+    assert size == {"backend": backend, "entries": 1, "bytes": size["bytes"], "file_bytes": size["file_bytes"]}
+    assert 0 < size["bytes"] < total and size["file_bytes"] >= size["bytes"]
+
+
+@pytest.mark.parametrize("spec", ["json+zlib", "marshal", "marshal+zlib"])
+def test_serializer_switch_needs_no_migration(backend, monkeypatch, spec):
+    payload = {"coords": [[32.0 + i * 1e-5, 34.78] for i in range(200)], "closure": False, "label": "אילון"}
+    cache.cache_write("before", payload)
+    monkeypatch.setattr(cache, "SERIALIZER", spec)
+    cache.cache_write("after", payload)
+    assert cache.cache_read("before") == payload
+    assert cache.cache_read("after") == payload
+    cache.cache_write("before", {"v": 2})
+    assert cache.cache_read("before") == {"v": 2}
+    assert [e["name"] for e in cache.cache_scan()] == ["after", "before"]
+    if backend == "files":
+        assert sorted(p.name for p in cache.CACHE_DIR.glob("*.*") if p.is_file()) == ["after.bin", "before.bin"]
+    monkeypatch.setattr(cache, "SERIALIZER", "json")
+    assert cache.cache_read("after") == payload
+
+
+def test_corrupt_binary_entries_are_misses(backend, monkeypatch):
+    monkeypatch.setattr(cache, "SERIALIZER", "marshal+zlib")
+    cache.cache_write("k", {"v": 1})
+    blob = cache.serialization.get_serializer("marshal+zlib").dumps({"ts": time.time(), "data": {"v": 1}})
+    for corrupt in (blob[:len(blob) // 2], blob[:4] + b"\x00" * 8, blob[:4] + b"x"):
+        cache.mem_reset()
+        if backend == "files":
+            (cache.CACHE_DIR / "k.bin").write_bytes(corrupt)
+        else:
+            cache.cache_sqlite.put(cache._db_path(), "k", time.time(), corrupt)
+        assert cache.cache_read("k") is None
+    cache.cache_write("k", {"v": 2})
+    assert cache.cache_read("k") == {"v": 2}
@@ -0,0 +1,130 @@
+"""Tests for the size-budgeted cache janitor."""
+
+import json
+import os
+import sys
+import time
+
+import pytest
+
+from sources import cache, cache_janitor
+from sources.filelock import FileLock
+
+PROTECTED = ["tomtom_ayalon_v4_abs10_flow", "fuel_govil", "tt_scheduler_state"]
+
+
+@pytest.fixture(params=["files", "sqlite"])
+def populated(request, monkeypatch, tmp_path):
+    """Protected entries (oldest of all) plus probes p1..p4 written 400..100 s ago."""
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(cache, "LOCK_DIR", tmp_path / "_locks")
+    monkeypatch.setattr(cache, "BACKEND", request.param)
+    cache.mem_reset()
+    now = time.time()
+    ages = {**{name: 1000 for name in PROTECTED}, "p1": 400, "p2": 300, "p3": 200, "p4": 100}
+    for name, age in ages.items():
+        monkeypatch.setattr(cache.time, "time", lambda: now - age)
+        cache.cache_write(name, {"name": name, "pad": "x" * 1000})
+        if request.param == "files":
+            os.utime(tmp_path / f"{name}.json", (now - age, now - age))
+    monkeypatch.setattr(cache.time, "time", lambda: now)
+    yield request.param
+    cache.mem_reset()
+
+
+def _names():
+    return sorted(e["name"] for e in cache.cache_scan())
+
+
+@pytest.mark.parametrize("policy, evicted", [("oldest", {"p1", "p2"}), ("lru", {"p2", "p3"})])
+def test_entry_budget_evicts_by_policy_and_keeps_protected(populated, policy, evicted):
+    assert cache.cache_read("p1", max_age_s=3600)  # p1 is old but recently used
+    result = cache_janitor.sweep(max_entries=len(PROTECTED) + 2, max_bytes=10**9, policy=policy)
+    assert result["status"] == "ok" and result["evicted"] == 2 and not result["over_budget"]
+    assert set(_names()) == set(PROTECTED) | {"p1", "p2", "p3", "p4"} - evicted
+    assert result["protected"] == len(PROTECTED)
+
+
+def test_sqlite_reads_are_remembered_across_processes(populated, monkeypatch):
+    if populated != "sqlite":
+        pytest.skip("file atimes depend on the mount options")
+    assert cache.cache_read("p1", max_age_s=3600)
+    cache.mem_reset()  # a later --once run: no in-process read history
+    (p1,) = [e for e in cache.cache_scan() if e["name"] == "p1"]
+    assert p1["accessed"] > p1["ts"] + 200
+    result = cache_janitor.sweep(max_entries=len(PROTECTED) + 2, max_bytes=10**9, policy="lru")
+    assert set(_names()) == set(PROTECTED) | {"p1", "p4"} and result["evicted"] == 2
+
+    # Reads within ATIME_RESOLUTION_S of the stored atime do not write it again.
+    writes = []
+    monkeypatch.setattr(cache.cache_sqlite, "touch", lambda *a: writes.append(a))
+    cache.mem_reset()
+    cache.cache_read("p1", max_age_s=3600)
+    assert writes == []
+
+
+def test_sqlite_file_shrinks_after_eviction(populated):
+    if populated != "sqlite":
+        pytest.skip("sqlite backend only")
+    for i in range(200):
+        cache.cache_write(f"bulk{i}", {"pad": os.urandom(2000).hex()})
+    before = cache_janitor.budget_status()
+    assert before["file_bytes"] >= before["bytes"] > 800_000
+    result = cache_janitor.sweep(max_entries=len(PROTECTED), max_bytes=10**9, policy="oldest")
+    after = cache_janitor.budget_status()
+    assert result["evicted"] == 204 and after["entries"] == len(PROTECTED)
+    assert after["file_bytes"] < before["file_bytes"] / 4
+
+
+def test_byte_budget_dry_run_and_cli(populated, monkeypatch, capsys):
+    sizes = {e["name"]: e["size_bytes"] for e in cache.cache_scan()}
+    budget = sum(sizes.values()) - sizes["p1"] - 1  # p1 alone is not enough
+    preview = cache_janitor.sweep(max_bytes=budget, max_entries=10**6, policy="oldest", dry_run=True)
+    assert preview["evicted"] == 2 and len(_names()) == 7
+
+    monkeypatch.setattr(sys, "argv", ["cache_janitor", "--max-bytes", str(budget), "--policy", "oldest"])
+    assert cache_janitor.main() == 0
+    result = json.loads(capsys.readouterr().out)
+    assert result["evicted"] == 2 and result["bytes"] <= budget
+    assert _names() == sorted(PROTECTED + ["p3", "p4"])
+
+    # Protected entries are kept even when they alone exceed the budget.
+    result = cache_janitor.sweep(max_bytes=1, max_entries=1, policy="oldest")
+    assert result["over_budget"] and _names() == sorted(PROTECTED)
+    assert cache_janitor.budget_status()["entries"] == len(PROTECTED)
+
+
+def test_sweep_respects_time_budget_and_janitor_lock(populated):
+    result = cache_janitor.sweep(max_entries=1, time_budget_s=0)
+    assert result["status"] == "budget_exhausted" and result["evicted"] == 0
+    with FileLock(cache.LOCK_DIR / "janitor.lock"):
+        assert cache_janitor.sweep(max_entries=1) == {"status": "busy"}
+    assert cache_janitor.sweep(max_entries=1)["status"] == "ok"
+
+
+def test_sweep_clears_stale_inflight_markers(populated):
+    old = time.time() - cache_janitor.INFLIGHT_STALE_S - 60
+    cache.LOCK_DIR.mkdir(exist_ok=True)
+    for name in ("crashed", "running", "fresh"):
+        marker = cache.LOCK_DIR / f"{name}.inflight"
+        marker.write_text(json.dumps({"pid": 1, "host": "h", "started_at": old}), encoding="utf-8")
+        if name != "fresh":
+            os.utime(marker, (old, old))
+    assert cache_janitor.sweep(dry_run=True)["inflight_removed"] == 0
+    with FileLock(cache.LOCK_DIR / "running.lock"):
+        assert cache_janitor.sweep()["inflight_removed"] == 1
+    assert sorted(p.stem for p in cache.LOCK_DIR.glob("*.inflight")) == ["fresh", "running"]
+
+
+def test_protected_names_track_the_modules_keys():
+    from sources import fuel_govil, rate_limiter, scheduler, tomtom, tomtom_tiles
+
+    for mode in ("flow", "sample", "tiles"):
+        assert cache_janitor.is_protected(tomtom._aggregate_cache_key("ayalon", mode))
+        assert cache_janitor.is_protected(tomtom._aggregate_cache_key("hwy1", mode))
+    assert cache_janitor.is_protected(fuel_govil.CACHE_KEY)
+    assert cache_janitor.is_protected("air_quality_ayalon")
+    assert cache_janitor.is_protected(scheduler.STATE_CACHE_KEY)
+    assert cache_janitor.is_protected(rate_limiter._COUNTER_FILE.stem)
+    assert not cache_janitor.is_protected(tomtom.probe_cache_key({"id": "a1", "lat": 32.0, "lon": 34.8}, "flow"))
+    assert not cache_janitor.is_protected(tomtom_tiles._tile_key(12, 2445, 1663))
@@ -0,0 +1,155 @@
+import json
+
+import pytest
+
+import collector
+from sources.corridors import load_corridors
+from sources.history_store import HistoryStore
+
+
+def _write_config(path, corridors):
+    path.write_text(json.dumps({"corridors": corridors}), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def env(monkeypatch, tmp_path):
+    monkeypatch.setattr("sources.tomtom.cache_read", lambda *a, **k: None)
+    monkeypatch.setattr("sources.tomtom.cache_write", lambda *a, **k: None)
+    monkeypatch.setattr("sources.provenance.ARCHIVE_DIR", tmp_path / "raw_archive")
+    monkeypatch.setattr("sources.cache.CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr("sources.cache.LOCK_DIR", tmp_path / "cache" / "_locks")
+    (tmp_path / "cache").mkdir()
+    monkeypatch.setattr(collector.SecureConfig, "get_tomtom_api_key", staticmethod(lambda: None))
+    monkeypatch.setattr(collector, "_fetch_air_quality", lambda: {"source_id": "sviva:test"})
+    monkeypatch.setattr(collector, "_fetch_fuel_price", lambda: {"source_id": "fuel:test", "price_ils_per_l": 7.0})
+    monkeypatch.setenv("TRAFFIC_MODE", "sample")
+    monkeypatch.setenv("HISTORY_DB_PATH", str(tmp_path / "history.db"))
+    config = _write_config(tmp_path / "corridors.json", [
+        {"id": "ayalon", "probes": [{"id": "a1", "lat": 32.04, "lon": 34.78}, {"id": "a2", "lat": 32.06, "lon": 34.79}]},
+        {"id": "hwy1", "probes": [{"id": "h1", "lat": 31.80, "lon": 35.10}]},
+        {"id": "hwy2", "enabled": False, "probes": [{"id": "x", "lat": 32.3, "lon": 34.8}]},
+    ])
+    monkeypatch.setenv("CORRIDORS_CONFIG", str(config))
+    return tmp_path
+
+
+def test_load_corridors_skips_disabled_and_validates(env, tmp_path):
+    assert [c["id"] for c in load_corridors()] == ["ayalon", "hwy1"]
+    bad = _write_config(tmp_path / "bad.json", [{"id": "a", "probes": []}])
+    with pytest.raises(ValueError):
+        load_corridors(bad)
+    dup = _write_config(tmp_path / "dup.json", [
+        {"id": "a", "probes": [{"id": "p", "lat": 1, "lon": 2}]},
+        {"id": "a", "probes": [{"id": "q", "lat": 1, "lon": 2}]},
+    ])
+    with pytest.raises(ValueError):
+        load_corridors(dup)
+
+
+def test_load_corridors_defaults_to_ayalon_probes(tmp_path):
+    corridors = load_corridors(tmp_path / "missing.json")
+    assert [c["id"] for c in corridors] == ["ayalon"]
+    assert len(corridors[0]["probes"]) == 3
+
+
+def test_collect_once_runs_every_corridor_in_one_cycle(env):
+    summary = collector.collect_once()
+    assert set(summary["corridors"]) == {"ayalon", "hwy1"}
+    # top-level fields describe the default corridor
+    assert summary["pipeline_run_id"] == summary["corridors"]["ayalon"]["pipeline_run_id"]
+    assert summary["segments_count"] == 2
+    assert summary["corridors"]["hwy1"]["segments_count"] == 1
+
+    store = HistoryStore()
+    assert len(store.fetch_runs(corridor_id=None)) == 2
+    assert store.fetch_latest_run(corridor_id="hwy1")["pipeline_run_id"] == summary["corridors"]["hwy1"]["pipeline_run_id"]
+    assert store.window_totals(corridor_id="ayalon")["runs"] == 1
+
+
+def test_collect_once_falls_back_per_corridor(env, monkeypatch):
+    cached = {"source_id": "tomtom_flow_v4", "fetched_at": "2026-01-01T00:00:00Z",
+              "vehicle_count_mode": "normalized_per_probe",
+              "segments": [{"segment_id": "h1", "length_km": 2.0, "observed_travel_time_s": 300.0, "vehicle_count": 1}]}
+    real = collector.tomtom.get_corridors_segments
+
+    def flaky(corridors, *a, **k):
+        out = real([c for c in corridors if c["id"] != "hwy1"], *a, **k)
+        out["hwy1"] = RuntimeError("HTTP 429")
+        return out
+
+    monkeypatch.setattr(collector.tomtom, "get_corridors_segments", flaky)
+    monkeypatch.setattr(collector.tomtom, "get_cached_corridor_segments",
+                        lambda cid, mode="flow", max_age_s=0: cached if cid == "hwy1" else None)
+    summary = collector.collect_once()
+    assert summary["corridors"]["ayalon"]["traffic_fetch_status"] == "ok"
+    assert summary["corridors"]["hwy1"]["traffic_fetch_status"] == "rate_limited"
+
+
+def test_partial_refresh_is_reported_per_corridor(env, monkeypatch):
+    real = collector.tomtom.get_corridors_segments
+
+    def partial(corridors, *a, **k):
+        out = real(corridors, *a, **k)
+        out["ayalon"]["partial"] = True
+        out["ayalon"]["stale_probes"] = [{"segment_id": "a2", "age_s": 310.0, "error": "status=500"}]
+        return out
+
+    monkeypatch.setattr(collector.tomtom, "get_corridors_segments", partial)
+    summary = collector.collect_once()
+    assert summary["corridors"]["ayalon"]["traffic_fetch_status"] == "partial"
+    assert summary["corridors"]["ayalon"]["stale_probes"] == ["a2"]
+    assert summary["corridors"]["hwy1"]["stale_probes"] is None
+
+
+def test_cached_payloads_are_not_modified(env, monkeypatch):
+    # Aggregates served from the cache's memory tier are shared objects.
+    shared = collector.tomtom.get_corridors_segments(load_corridors(), None, mode="sample")
+    snapshot = json.dumps(shared, sort_keys=True)
+    monkeypatch.setattr(collector.tomtom, "get_corridors_segments", lambda *a, **k: shared)
+    summary = collector.collect_once()
+    assert summary["corridors"]["ayalon"]["traffic_fetch_status"] == "ok"
+    assert json.dumps(shared, sort_keys=True) == snapshot
+    assert set(summary["cache"]) >= {"hits", "misses", "evictions"}
+    assert summary["cache_janitor"]["status"] == "ok"
+
+
+def test_slow_fuel_falls_back_to_cache_after_deadline(env, monkeypatch):
+    import time
+
+    def slow_fuel():
+        time.sleep(2.0)
+        return {"source_id": "fuel:live", "price_ils_per_l": 9.0}
+
+    monkeypatch.setattr(collector, "_fetch_fuel_price", slow_fuel)
+    monkeypatch.setattr(collector, "get_cached_fuel_price",
+                        lambda max_age_s=0: {"source_id": "fuel:old", "price_ils_per_l": 7.0})
+    monkeypatch.setenv("COLLECTOR_FUEL_DEADLINE_S", "0")
+    summary = collector.collect_once()
+    assert summary["sources"]["fuel"] == "fuel:old:cached"
+    assert "fuel" in summary["source_fallbacks"]
+
+
+def test_air_quality_does_not_hold_up_the_cycle(env, monkeypatch):
+    import time
+
+    def slow_air():
+        time.sleep(2.0)
+        return {"source_id": "sviva:live"}
+
+    monkeypatch.setattr(collector, "_fetch_air_quality", slow_air)
+    monkeypatch.setattr(collector, "get_cached_air_quality", lambda max_age_s=0: {"source_id": "sviva:cached"})
+    t0 = time.monotonic()
+    summary = collector.collect_once()
+    assert time.monotonic() - t0 < 1.5
+    assert summary["sources"]["air"] == "sviva:cached"
+    assert summary["source_fallbacks"] == ["air"]
+    assert set(summary["fetch_ms"]) >= {"traffic", "fuel"}
+
+
+def test_missing_traffic_and_cache_fails_the_cycle(env, monkeypatch):
+    monkeypatch.setattr(collector.tomtom, "get_corridors_segments",
+                        lambda corridors, *a, **k: {c["id"]: RuntimeError("down") for c in corridors})
+    monkeypatch.setattr(collector.tomtom, "get_cached_corridor_segments", lambda *a, **k: None)
+    with pytest.raises(RuntimeError):
+        collector.collect_once()
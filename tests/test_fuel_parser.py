@@ -130,7 +130,7 @@ class TestPdfAdapter:
             status_code = 200
             content = b"fake-pdf"
 
-        monkeypatch.setattr("sources.fuel_govil.requests.get", lambda *a, **k: Resp())
+        monkeypatch.setattr("sources.fuel_govil.transport.get", lambda *a, **k: Resp())
         result = fuel_govil._fetch_from_pdf()
 
         assert result["price_ils_per_l"] == 6.85
@@ -146,7 +146,7 @@ class TestPdfAdapter:
             status_code = 200
             content = b"fake-pdf"
 
-        monkeypatch.setattr("sources.fuel_govil.requests.get", lambda *a, **k: Resp())
+        monkeypatch.setattr("sources.fuel_govil.transport.get", lambda *a, **k: Resp())
 
         with patch("sources.gov_catalog.fetch_latest_benzine95_wholesale",
                     side_effect=RuntimeError("CKAN down")):
@@ -164,7 +164,7 @@ class TestPdfAdapter:
             status_code = 200
             content = b"fake-pdf"
 
-        monkeypatch.setattr("sources.fuel_govil.requests.get", lambda *a, **k: Resp())
+        monkeypatch.setattr("sources.fuel_govil.transport.get", lambda *a, **k: Resp())
 
         with pytest.raises(RuntimeError, match="sanity"):
             fuel_govil._fetch_from_pdf()
@@ -200,7 +200,7 @@ class TestEnvAdapter:
         with patch("sources.gov_catalog.fetch_latest_benzine95_wholesale",
                     side_effect=RuntimeError("CKAN down")):
             monkeypatch.setattr(
-                "sources.fuel_govil.requests.get",
+                "sources.fuel_govil.transport.get",
                 lambda *a, **k: (_ for _ in ()).throw(ConnectionError("no net")),
             )
             result = fuel_govil.fetch_current_fuel_price_ils_per_l(cache_ttl_s=0)
@@ -261,7 +261,7 @@ class TestErrorHandling:
         with patch("sources.gov_catalog.fetch_latest_benzine95_wholesale",
                     side_effect=RuntimeError("CKAN down")):
             monkeypatch.setattr(
-                "sources.fuel_govil.requests.get",
+                "sources.fuel_govil.transport.get",
                 lambda *a, **k: (_ for _ in ()).throw(ConnectionError("no net")),
             )
             # No FUEL_PRICE_ILS set either
@@ -0,0 +1,73 @@
+"""Vectorized geodesy must match the scalar haversine loops."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from sources import geodesy
+from sources.tomtom import _haversine_km
+
+
+def _polyline(n, seed=0):
+    rng = np.random.default_rng(seed)
+    lat = 32.0 + np.cumsum(rng.uniform(-0.002, 0.004, n))
+    lon = 34.78 + np.cumsum(rng.uniform(-0.002, 0.004, n))
+    return [{"latitude": float(a), "longitude": float(b)} for a, b in zip(lat, lon)]
+
+
+def _loop_length(coords):
+    return sum(
+        _haversine_km(p["latitude"], p["longitude"], q["latitude"], q["longitude"])
+        for p, q in zip(coords, coords[1:])
+    )
+
+
+def _loop_nearest(coords, lat, lon):
+    d = [_haversine_km(lat, lon, c["latitude"], c["longitude"]) for c in coords]
+    return d.index(min(d))
+
+
+def test_haversine_matches_scalar():
+    lat1, lon1, lat2, lon2 = 32.038, 34.782, 32.078, 34.796
+    assert geodesy.haversine_km(lat1, lon1, lat2, lon2) == pytest.approx(_haversine_km(lat1, lon1, lat2, lon2), rel=1e-12)
+    assert geodesy.haversine_km(lat1, lon1, lat1, lon1) == 0.0
+
+
+def test_polyline_length_and_cumulative_match_loop():
+    coords = _polyline(500)
+    latlon = geodesy.coords_to_array(coords)
+    cum = geodesy.polyline_cumulative_km(latlon)
+    assert cum[0] == 0.0 and np.all(np.diff(cum) >= 0)
+    assert cum[-1] == pytest.approx(_loop_length(coords), rel=1e-12)
+    assert cum[100] == pytest.approx(_loop_length(coords[:101]), rel=1e-12)
+    assert geodesy.polyline_length_km(latlon[:1]) == 0.0
+
+
+def test_nearest_vertex_many_probes_matches_loop(monkeypatch):
+    coords = _polyline(300, seed=1)
+    latlon = geodesy.coords_to_array(coords)
+    rng = np.random.default_rng(2)
+    probes = latlon[rng.integers(0, len(latlon), 200)] + rng.normal(0, 0.001, (200, 2))
+    monkeypatch.setattr(geodesy, "_NEAREST_CHUNK_CELLS", 1000)  # exercise chunking
+    got = geodesy.nearest_vertex(latlon, probes)
+    assert got.tolist() == [_loop_nearest(coords, a, b) for a, b in probes]
+    assert geodesy.nearest_vertex(latlon, latlon[7]).tolist() == [7]
+
+
+def test_coords_accept_short_keys_and_reject_missing():
+    assert geodesy.coords_to_array([{"lat": 1, "lng": 2}]).tolist() == [[1.0, 2.0]]
+    with pytest.raises(ValueError):
+        geodesy.coords_to_array([{"lat": 1}])
+
+
+def test_polyline_projection_distance_and_chainage():
+    line = np.array([[32.0, 34.8], [32.05, 34.8], [32.05, 34.85]])
+    dist, along = geodesy.polyline_projection(line, np.array([[32.025, 34.801], [32.051, 34.82], [31.99, 34.8]]))
+    leg = geodesy.polyline_length_km(line[:2])
+    assert dist[0] == pytest.approx(_haversine_km(32.025, 34.8, 32.025, 34.801), rel=1e-3)
+    assert along[0] == pytest.approx(leg / 2, rel=1e-3)
+    # foot point on the second leg, past the corner
+    assert dist[1] == pytest.approx(_haversine_km(32.05, 34.82, 32.051, 34.82), rel=1e-3)
+    assert along[1] == pytest.approx(leg + _haversine_km(32.05, 34.8, 32.05, 34.82), rel=1e-3)
+    # before the start: clamped to the first vertex
+    assert along[2] == 0.0 and dist[2] == pytest.approx(_haversine_km(31.99, 34.8, 32.0, 34.8), rel=1e-3)
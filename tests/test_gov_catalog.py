@@ -341,7 +341,7 @@ class TestFallbackPropagation:
         with patch("sources.gov_catalog.fetch_latest_benzine95_wholesale",
                     side_effect=CkanSchemaError("schema broke")):
             monkeypatch.setattr(
-                "sources.fuel_govil.requests.get",
+                "sources.fuel_govil.transport.get",
                 lambda *a, **k: (_ for _ in ()).throw(ConnectionError("no net")),
             )
             result = fuel_govil.fetch_current_fuel_price_ils_per_l(cache_ttl_s=0)
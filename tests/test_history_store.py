@@ -0,0 +1,164 @@
+"""Tests for HistoryStore persistence beyond the health pipeline."""
+
+import pytest
+
+from methodology import AyalonModel
+from sources.history_store import HistoryStore
+
+
+SEGMENTS = [
+    {'segment_id': 's1', 'length_km': 5.0, 'observed_travel_time_s': 300.0, 'vehicle_count': 1000},
+    {'segment_id': 's2', 'length_km': 5.0, 'observed_travel_time_s': 720.0, 'vehicle_count': 1000},
+    {'segment_id': 's3', 'length_km': 10.0, 'observed_travel_time_s': 1800.0, 'vehicle_count': 2000},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(tmp_path / "h.sqlite3")
+
+
+def test_uncertainty_stored_next_to_run(store):
+    pytest.importorskip("numpy")
+    model = AyalonModel()
+    results = model.run_model(SEGMENTS, data_timestamp_utc='2026-01-08T00:00:00Z', source_ids={},
+                              p_fuel_ils_per_l=7.5, pipeline_run_id="run-u", uncertainty_samples=1000)
+    store.record_run(results=results, tomtom_data={}, aq_data={}, fuel_data={}, tomtom_age_s=None)
+    stored = store.fetch_uncertainty("run-u")
+    assert set(stored) == {"delta_T_total_h", "fuel_excess_L", "leakage_ils", "co2_emissions_kg"}
+    assert stored["leakage_ils"]["p50"] == results["uncertainty"]["counters"]["leakage_ils"]["p50"]
+    assert stored["leakage_ils"]["n_samples"] == 1000
+    assert store.fetch_uncertainty("missing") == {}
+
+
+def _record(store, run_id, delta_T, leakage):
+    results = {
+        'pipeline_run_id': run_id, 'delta_T_total_h': delta_T, 'fuel_excess_L': 2 * delta_T,
+        'co2_emissions_kg': 3 * delta_T, 'leakage_ils': leakage,
+    }
+    store.record_run(results=results, tomtom_data={}, aq_data={}, fuel_data={}, tomtom_age_s=None)
+
+
+def test_window_totals_from_running_sums(store):
+    assert store.window_totals()["totals"] == {}
+    for i in range(10):
+        _record(store, f"r{i}", float(i), leakage=None if i == 3 else 10.0 * i)
+    rows = sorted(store.fetch_runs(limit=100), key=lambda r: r["id"])
+
+    everything = store.window_totals()
+    assert everything["runs"] == 10
+    assert everything["totals"]["delta_T_total_h"] == pytest.approx(45.0)
+    assert everything["totals"]["co2_emissions_kg"] == pytest.approx(135.0)
+    assert everything["totals"]["leakage_ils"] == pytest.approx(10.0 * (45 - 3))
+
+    since = rows[6]["recorded_at_utc"]
+    window = store.window_totals(since)
+    assert window["runs"] == 4
+    assert window["first_recorded_at_utc"] == since
+    assert window["totals"]["delta_T_total_h"] == pytest.approx(6 + 7 + 8 + 9)
+    assert store.window_totals("9999-01-01T00:00:00Z")["totals"] == {}
+
+
+def test_running_sums_backfilled_for_external_rows(store):
+    import sqlite3
+
+    _record(store, "r0", 1.0, 1.0)
+    con = sqlite3.connect(str(store.db_path))
+    con.execute(
+        "INSERT INTO runs (recorded_at_utc, pipeline_run_id, delta_T_total_h, leakage_ils) VALUES (?,?,?,?)",
+        ("2999-01-01T00:00:00Z", "external", 5.0, 7.0),
+    )
+    con.commit()
+    con.close()
+    assert store.window_totals()["totals"]["delta_T_total_h"] == pytest.approx(6.0)
+    _record(store, "r2", 1.0, 1.0)
+    assert store.window_totals()["totals"]["leakage_ils"] == pytest.approx(9.0)
+
+
+def test_trapezoidal_integration_with_gaps_and_double_fires(store, monkeypatch):
+    # minutes since 2026-01-01T00:00Z: regular 10-min cycles, a double fire, a 2 h outage
+    schedule = [(0, 1.0), (10, 3.0), (20, 5.0), (20 + 1 / 60, 5.0), (140, 100.0), (150, 100.0)]
+    for i, (minute, value) in enumerate(schedule):
+        ts = f"2026-01-01T{int(minute // 60):02d}:{int(minute % 60):02d}:{round(minute * 60) % 60:02d}Z"
+        monkeypatch.setattr("sources.history_store._utc_now_iso", lambda ts=ts: ts)
+        _record(store, f"r{i}", value, leakage=None if i == 1 else 10.0 * value)
+    rows = sorted(store.fetch_runs(limit=100), key=lambda r: r["id"])
+
+    assert [r["span_h"] for r in rows] == pytest.approx([0.0, 1 / 6, 1 / 6, 1 / 3600, 0.0, 1 / 6])
+    everything = store.window_totals()
+    assert everything["covered_h"] == pytest.approx(0.5 + 1 / 3600)
+    assert everything["integrated"]["delta_T_total_h"] == pytest.approx(
+        (1 + 3) / 2 / 6 + (3 + 5) / 2 / 6 + 5 / 3600 + 100 / 6
+    )
+    assert everything["integrated"]["fuel_excess_L"] == pytest.approx(2 * everything["integrated"]["delta_T_total_h"])
+    # intervals touching the missing leakage value contribute nothing
+    assert everything["integrated"]["leakage_ils"] == pytest.approx(50 / 3600 + 1000 / 6)
+
+    after_outage = store.window_totals(rows[4]["recorded_at_utc"])
+    assert after_outage["covered_h"] == pytest.approx(1 / 6)
+    assert after_outage["integrated"]["delta_T_total_h"] == pytest.approx(100 / 6)
+
+
+def test_out_of_order_rows_are_chained_by_recorded_time(store, monkeypatch):
+    # A clock step back: the third run is stamped between the first two.
+    for run_id, ts, value in (("r0", "2026-01-01T00:00:00Z", 1.0), ("r1", "2026-01-01T00:20:00Z", 3.0),
+                              ("r2", "2026-01-01T00:10:00Z", 2.0), ("r3", "2026-01-01T00:20:00Z", 3.0)):
+        monkeypatch.setattr("sources.history_store._utc_now_iso", lambda ts=ts: ts)
+        _record(store, run_id, value, leakage=value)
+    rows = {r["pipeline_run_id"]: r for r in store.fetch_runs(limit=100)}
+    assert [rows[r]["cum_runs"] for r in ("r0", "r2", "r1", "r3")] == [1, 2, 3, 4]
+    assert rows["r3"]["cum_delta_T_total_h"] == pytest.approx(9.0)
+
+    everything = store.window_totals()
+    assert everything["runs"] == 4 and everything["last_recorded_at_utc"] == "2026-01-01T00:20:00Z"
+    assert everything["integrated"]["delta_T_total_h"] == pytest.approx((1 + 2) / 2 / 6 + (2 + 3) / 2 / 6)
+    window = store.window_totals("2026-01-01T00:10:00Z")
+    assert window["runs"] == 3
+    assert window["totals"]["leakage_ils"] == pytest.approx(8.0)
+    assert window["covered_h"] == pytest.approx(1 / 6)
+
+
+def test_window_units_on_a_five_minute_series(store, monkeypatch):
+    # 13 runs every 5 min = 1 h covered; each snapshot costs 120 ILS and 4 vehicle-hours.
+    for i in range(13):
+        ts = f"2026-01-01T{i * 5 // 60:02d}:{i * 5 % 60:02d}:00Z"
+        monkeypatch.setattr("sources.history_store._utc_now_iso", lambda ts=ts: ts)
+        _record(store, f"r{i}", 4.0, leakage=120.0)
+    w = store.window_totals()
+    assert w["runs"] == 13 and w["covered_h"] == pytest.approx(1.0)
+    # per-run sums: ILS / vehicle-hours
+    assert w["totals"]["leakage_ils"] == pytest.approx(13 * 120.0)
+    assert w["totals"]["delta_T_total_h"] == pytest.approx(13 * 4.0)
+    # time integrals: ILS x h, independent of the sampling interval
+    assert w["integrated"]["leakage_ils"] == pytest.approx(120.0)
+    # time-averaged per-snapshot level: back in the snapshot's own unit
+    assert w["time_avg"]["leakage_ils"] == pytest.approx(120.0)
+    assert w["time_avg"]["delta_T_total_h"] == pytest.approx(4.0)
+
+
+def test_integration_gap_is_configurable(tmp_path, monkeypatch):
+    store = HistoryStore(tmp_path / "h.sqlite3", max_gap_s=3 * 3600)
+    for i, ts in enumerate(["2026-01-01T00:00:00Z", "2026-01-01T02:00:00Z"]):
+        monkeypatch.setattr("sources.history_store._utc_now_iso", lambda ts=ts: ts)
+        _record(store, f"r{i}", 1.0, 1.0)
+    assert store.window_totals()["covered_h"] == pytest.approx(2.0)
+    assert store.window_totals()["integrated"]["delta_T_total_h"] == pytest.approx(2.0)
+
+
+def test_run_segments_reference_raw_blobs(store):
+    segs = [
+        {**SEGMENTS[0], 'raw': {'ref': 'sha256:aa', 'polyline_ref': 'sha256:pp'}},
+        {**SEGMENTS[1], 'raw_ref': 'sha256:bb', 'polyline_ref': 'sha256:pp'},
+        SEGMENTS[2],
+    ]
+    res = AyalonModel().run_model(segs, data_timestamp_utc='2026-01-08T00:00:00Z', source_ids={},
+                                  p_fuel_ils_per_l=7.5, pipeline_run_id='run-r')
+    store.record_run(results=res, tomtom_data={}, aq_data={}, fuel_data={}, tomtom_age_s=None, segments=segs)
+    refs = store.fetch_raw_refs()
+    assert [(r['segment_id'], r['raw_ref'], r['polyline_ref']) for r in refs] == [
+        ('s1', 'sha256:aa', 'sha256:pp'),
+        ('s2', 'sha256:bb', 'sha256:pp'),
+        ('s3', None, None),
+    ]
+    assert all(r['pipeline_run_id'] == res['pipeline_run_id'] for r in refs)
+    assert store.fetch_raw_refs(start_utc='9999') == []
@@ -18,3 +18,132 @@ def test_model_math_values():
     assert abs(res['co2_emissions_kg'] - 2633.4) < 1e-6
     assert 'model_version' in res and res['model_version'] == '1.0-freeze'
     assert 'constants_version' in res and res['constants_version'] == 'AppendixA-v1.2'
+
+
+def test_run_model_batch_bit_for_bit_with_scalar_path():
+    np = pytest.importorskip("numpy")
+    model = AyalonModel()
+    rng = np.random.default_rng(42)
+    n_rows = 600
+    snapshot_ids = rng.integers(0, 50, n_rows)
+    length_km = rng.uniform(0.2, 12.0, n_rows)
+    travel_s = rng.uniform(10.0, 2400.0, n_rows)
+    vehicles = rng.integers(0, 6000, n_rows)
+
+    batch = model.run_model_batch(snapshot_ids, length_km, travel_s, vehicles, p_fuel_ils_per_l=7.5)
+
+    for i, sid in enumerate(batch['snapshot_ids']):
+        rows = np.flatnonzero(snapshot_ids == sid)
+        segments = [
+            {'segment_id': str(r), 'length_km': float(length_km[r]),
+             'observed_travel_time_s': float(travel_s[r]), 'vehicle_count': int(vehicles[r])}
+            for r in rows
+        ]
+        res = model.run_model(segments, data_timestamp_utc='2026-01-08T00:00:00Z', source_ids={}, p_fuel_ils_per_l=7.5, pipeline_run_id='t')
+        assert batch['delta_T_total_h'][i] == res['delta_T_total_h']
+        assert batch['fuel_excess_L'][i] == res['fuel_excess_L']
+        assert batch['leakage_ils'][i] == res['leakage_ils']
+        assert batch['co2_emissions_kg'][i] == res['co2_emissions_kg']
+
+
+def test_run_model_batch_per_snapshot_fuel_price():
+    np = pytest.importorskip("numpy")
+    model = AyalonModel()
+    out = model.run_model_batch(
+        ['b', 'a', 'b'], [5.0, 5.0, 10.0], [720.0, 300.0, 1800.0], [1000, 1000, 2000],
+        p_fuel_ils_per_l=np.array([7.0, 8.0]),
+    )
+    assert list(out['snapshot_ids']) == ['a', 'b']
+    assert abs(out['fuel_excess_L'].sum() - 1140.0) < 1e-6
+    assert abs(out['leakage_ils'][0] - out['fuel_excess_L'][0] * 7.0) < 1e-9
+    assert abs(out['leakage_ils'][1] - out['fuel_excess_L'][1] * 8.0) < 1e-9
+    with pytest.raises(RuntimeError):
+        model.run_model_batch(['a'], [1.0], [100.0], [1])
+
+
+def test_run_model_segment_breakdown_sums_to_totals():
+    model = AyalonModel()
+    segments = [
+        {'segment_id': 's1', 'length_km': 5.0, 'observed_travel_time_s': 300.0, 'vehicle_count': 1000},
+        {'segment_id': 's2', 'length_km': 5.0, 'observed_travel_time_s': 720.0, 'vehicle_count': 1000},
+        {'segment_id': 's3', 'length_km': 10.0, 'observed_travel_time_s': 1800.0, 'vehicle_count': 2000},
+    ]
+    res = model.run_model(segments, data_timestamp_utc='2026-01-08T00:00:00Z', source_ids={}, p_fuel_ils_per_l=7.5, pipeline_run_id='test')
+    breakdown = {b['segment_id']: b for b in res['segment_breakdown']}
+    assert list(breakdown) == ['s1', 's2', 's3']
+    assert abs(breakdown['s2']['delay_h'] - 520000.0 / 3600.0) < 1e-9
+    for key, total in (('delay_h', 'delta_T_total_h'), ('fuel_excess_L', 'fuel_excess_L'),
+                       ('leakage_ils', 'leakage_ils'), ('co2_emissions_kg', 'co2_emissions_kg')):
+        assert abs(sum(b[key] for b in breakdown.values()) - res[total]) < 1e-6
+    # legacy entry points stay consistent with the fused kernel
+    assert model.calculate_time_dissipation(segments) == res['delta_T_total_h']
+    assert model.calculate_fuel_excess(segments) == res['fuel_excess_L']
+
+
+def test_run_model_uncertainty_bands():
+    pytest.importorskip("numpy")
+    model = AyalonModel()
+    segments = [
+        {'segment_id': 's1', 'length_km': 5.0, 'observed_travel_time_s': 300.0, 'vehicle_count': 1000},
+        {'segment_id': 's3', 'length_km': 10.0, 'observed_travel_time_s': 1800.0, 'vehicle_count': 2000},
+    ]
+    res = model.run_model(segments, data_timestamp_utc='2026-01-08T00:00:00Z', source_ids={}, p_fuel_ils_per_l=7.5,
+                          pipeline_run_id='unc', uncertainty_samples=4000, uncertainty_budget_s=1.0)
+    unc = res['uncertainty']
+    assert unc['n_samples'] == 4000
+    for counter in ('delta_T_total_h', 'fuel_excess_L', 'leakage_ils', 'co2_emissions_kg'):
+        band = unc['counters'][counter]
+        assert band['p5'] < band['p50'] < band['p95']
+        assert band['p5'] < res[counter] < band['p95']
+    # seeded from pipeline_run_id: reproducible
+    again = model.run_model(segments, data_timestamp_utc='x', source_ids={}, p_fuel_ils_per_l=7.5,
+                            pipeline_run_id='unc', uncertainty_samples=4000, uncertainty_budget_s=1.0)
+    assert again['uncertainty']['counters'] == unc['counters']
+    assert 'uncertainty' not in model.run_model(segments, data_timestamp_utc='x', source_ids={}, p_fuel_ils_per_l=7.5)
+
+
+def test_run_uncertainty_respects_time_budget():
+    pytest.importorskip("numpy")
+    model = AyalonModel()
+    segments = [{'segment_id': 's1', 'length_km': 5.0, 'observed_travel_time_s': 720.0, 'vehicle_count': 1000}]
+    out = model.run_uncertainty(segments, p_fuel_ils_per_l=7.5, n_samples=10_000_000, seed=1, time_budget_s=0.0, chunk_size=1000)
+    assert out['n_samples'] == 1000
+    assert out['budget_exhausted'] is True
+
+
+def test_run_model_uncertainty_reuses_the_fused_pass(monkeypatch):
+    import zlib
+
+    pytest.importorskip("numpy")
+    model = AyalonModel()
+    segments = [{'segment_id': 's1', 'length_km': 5.0, 'observed_travel_time_s': 720.0, 'vehicle_count': 1000}]
+    calls = []
+    real = model.calculate_segment_losses
+    monkeypatch.setattr(model, "calculate_segment_losses", lambda segs: calls.append(1) or real(segs))
+    res = model.run_model(segments, data_timestamp_utc='x', source_ids={}, p_fuel_ils_per_l=7.5,
+                          pipeline_run_id='unc', uncertainty_samples=500, uncertainty_budget_s=1.0)
+    assert len(calls) == 1
+    # same bands as recomputing the pass inside run_uncertainty
+    alone = model.run_uncertainty(segments, p_fuel_ils_per_l=7.5, n_samples=500, seed=zlib.crc32(b'unc'), time_budget_s=1.0)
+    assert alone['counters'] == res['uncertainty']['counters']
+
+
+def test_run_model_accepts_compact_segments():
+    from sources.segment import Segment, to_structured_array
+
+    dict_segments = [
+        {'segment_id': 's1', 'length_km': 5.0, 'observed_travel_time_s': 300.0, 'vehicle_count': 1000},
+        {'segment_id': 's2', 'length_km': 5.0, 'observed_travel_time_s': 720.0, 'vehicle_count': 1000},
+    ]
+    compact = [Segment.from_dict(s) for s in dict_segments]
+    model = AyalonModel()
+    a = model.run_model(dict_segments, data_timestamp_utc='x', source_ids={}, p_fuel_ils_per_l=7.5)
+    b = model.run_model(compact, data_timestamp_utc='x', source_ids={}, p_fuel_ils_per_l=7.5)
+    assert a['delta_T_total_h'] == b['delta_T_total_h']
+    assert a['segment_breakdown'] == b['segment_breakdown']
+
+    pytest.importorskip("numpy")
+    arr = to_structured_array(compact)
+    assert list(arr['segment_id']) == ['s1', 's2']
+    batch = model.run_model_batch([0, 0], arr['length_km'], arr['observed_travel_time_s'], arr['vehicle_count'], 7.5)
+    assert batch['delta_T_total_h'][0] == a['delta_T_total_h']
@@ -0,0 +1,49 @@
+"""Pure-Python MVT decoding against tiles encoded in the test."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from sources import mvt
+
+
+def _tile():
+    return mvt.encode_tile({
+        "Traffic flow": {"extent": 4096, "features": [
+            {"id": 7, "type": mvt.GEOM_LINESTRING,
+             "properties": {"traffic_level": 55.5, "road_type": "Motorway", "road_closure": False, "lanes": -3},
+             "geometry": [[(10, 10), (20, 30), (-5, 40)], [(100, 100), (4200, 100)]]},
+            {"type": mvt.GEOM_POLYGON, "properties": {"traffic_level": 12},
+             "geometry": [[(0, 0), (10, 0), (10, 10), (0, 0)]]},
+        ]},
+        "Labels": {"extent": 512, "features": [{"type": mvt.GEOM_POINT, "properties": {"name": "x"}, "geometry": [[(1, 2)]]}]},
+    })
+
+
+def test_decode_roundtrip():
+    layers = mvt.decode_tile(_tile())
+    assert set(layers) == {"Traffic flow", "Labels"}
+    flow = layers["Traffic flow"]
+    assert flow.extent == 4096 and flow.version == 2
+    f = flow.features[0]
+    assert f.id == 7 and f.type == mvt.GEOM_LINESTRING
+    assert f.properties == {"traffic_level": 55.5, "road_type": "Motorway", "road_closure": False, "lanes": -3}
+    assert [p.tolist() for p in f.geometry()] == [[[10, 10], [20, 30], [-5, 40]], [[100, 100], [4200, 100]]]
+    assert flow.features[1].id is None
+    assert flow.features[1].geometry()[0].tolist() == [[0, 0], [10, 0], [10, 10], [0, 0]]
+    assert layers["Labels"].features[0].geometry()[0].tolist() == [[1, 2]]
+
+
+def test_decode_only_requested_layers():
+    assert list(mvt.decode_tile(_tile(), layers=["Labels"])) == ["Labels"]
+    assert mvt.decode_tile(_tile(), layers=["missing"]) == {}
+
+
+def test_tile_addressing_roundtrip():
+    z, x, y = 12, *mvt.latlon_to_tile(32.064, 34.791, 12)
+    px = mvt.latlon_to_tile_pixels(np.array([[32.064, 34.791]]), z, x, y)
+    assert ((px >= 0) & (px < 4096)).all()
+    assert mvt.tile_to_latlon(px, z, x, y)[0] == pytest.approx([32.064, 34.791], abs=1e-9)
+    tiles = mvt.tiles_for_bbox(32.03, 34.77, 32.09, 34.80, 14)
+    assert (14, *mvt.latlon_to_tile(32.064, 34.791, 14)) in tiles
+    assert len(tiles) == len(set(tiles)) > 1
@@ -112,7 +112,7 @@ class TestUrlAdapter:
             "source": "Ministry of Transport 2025",
         }
 
-        with patch("sources.official_stats.requests.get", return_value=mock_resp):
+        with patch("sources.official_stats.transport.get", return_value=mock_resp):
             out = official_stats.fetch_official_congestion_benchmark(cache_ttl_s=0)
 
         assert out["hours_lost_per_person_per_year"] == 90.0
@@ -124,7 +124,7 @@ class TestUrlAdapter:
         monkeypatch.setenv("OFFICIAL_STATS_JSON_URL", "https://example.com/broken")
         monkeypatch.setenv("OFFICIAL_HOURS_LOST_PER_PERSON_PER_YEAR", "85")
 
-        with patch("sources.official_stats.requests.get",
+        with patch("sources.official_stats.transport.get",
                     side_effect=ConnectionError("down")):
             out = official_stats.fetch_official_congestion_benchmark(cache_ttl_s=0)
 
@@ -136,7 +136,7 @@ class TestUrlAdapter:
         monkeypatch.setenv("OFFICIAL_STATS_SOURCE_MODE", "url")
         monkeypatch.setenv("OFFICIAL_STATS_JSON_URL", "https://example.com/broken")
 
-        with patch("sources.official_stats.requests.get",
+        with patch("sources.official_stats.transport.get",
                     side_effect=ConnectionError("down")):
             out = official_stats.fetch_official_congestion_benchmark(cache_ttl_s=0)
 
@@ -153,7 +153,7 @@ class TestUrlAdapter:
             "hours_per_person_per_year": 77,  # alternative field name
         }
 
-        with patch("sources.official_stats.requests.get", return_value=mock_resp):
+        with patch("sources.official_stats.transport.get", return_value=mock_resp):
             out = official_stats.fetch_official_congestion_benchmark(cache_ttl_s=0)
 
         assert out["hours_lost_per_person_per_year"] == 77.0
@@ -0,0 +1,105 @@
+"""Tests for the append-only raw provenance archive."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from sources import provenance
+
+
+@pytest.fixture(autouse=True)
+def archive(monkeypatch, tmp_path):
+    monkeypatch.setattr(provenance, "ARCHIVE_DIR", tmp_path / "raw_archive")
+    monkeypatch.setattr(provenance, "LEGACY_RAW_DIR", tmp_path / "_raw")
+    return tmp_path / "raw_archive"
+
+
+def test_store_is_deduplicated_and_compressed(archive):
+    polyline = [{"latitude": 32.0 + i * 1e-4, "longitude": 34.79} for i in range(500)]
+    ref = provenance.store_raw(polyline, kind="polyline")
+    assert ref == provenance.raw_ref(polyline)
+    # Key order does not change the address; a second store appends nothing.
+    pack = next((archive / "packs").iterdir())
+    size = pack.stat().st_size
+    assert provenance.store_raw([dict(reversed(list(c.items()))) for c in polyline], kind="polyline") == ref
+    assert pack.stat().st_size == size
+
+    assert provenance.load_raw(ref) == polyline
+    stats = provenance.archive_stats()
+    assert stats["blobs"] == 1
+    assert stats["stored_bytes"] < stats["raw_bytes"]
+    assert stats["kinds"]["polyline"]["blobs"] == 1
+
+
+def test_archive_is_append_only(archive):
+    first = provenance.store_raw({"response": {"v": 1}})
+    pack = next((archive / "packs").iterdir())
+    head = pack.read_bytes()
+    second = provenance.store_raw({"response": {"v": 2}})
+    assert pack.read_bytes().startswith(head)
+    assert provenance.load_many([first, second]) == {first: {"response": {"v": 1}}, second: {"response": {"v": 2}}}
+    assert provenance.load_raw(provenance.raw_ref({"missing": True})) is None
+
+
+def test_corrupt_record_is_detected(archive):
+    ref = provenance.store_raw({"response": {"v": 1}})
+    pack = next((archive / "packs").iterdir())
+    data = bytearray(pack.read_bytes())
+    data[-3] ^= 0xFF
+    pack.write_bytes(bytes(data))
+    with pytest.raises(Exception):
+        provenance.load_raw(ref)
+
+
+def test_record_codecs_coexist_under_the_same_refs(archive, monkeypatch):
+    old = provenance.store_raw({"response": {"v": 1}})
+    monkeypatch.setattr(provenance, "SERIALIZER", "marshal+zlib")
+    polyline = [[32.0 + i * 1e-4, 34.79] for i in range(500)]
+    new = provenance.store_raw(polyline, kind="polyline")
+    assert new == provenance.raw_ref(polyline)
+    assert provenance.store_raw({"response": {"v": 1}}) == old  # not re-appended
+    monkeypatch.setattr(provenance, "SERIALIZER", "")
+    assert provenance.load_many([old, new]) == {old: {"response": {"v": 1}}, new: polyline}
+    assert [r["ref"] for r in provenance.iter_raw()] == [old, new]
+
+
+def test_legacy_per_file_blobs_still_load(tmp_path):
+    obj = {"response": {"old": True}}
+    ref = provenance.raw_ref(obj)
+    (tmp_path / "_raw").mkdir()
+    (tmp_path / "_raw" / f"{ref.split(':', 1)[1]}.json").write_text(json.dumps(obj), encoding="utf-8")
+    assert provenance.load_raw(ref) == obj
+
+
+def test_range_extraction_and_export(archive, monkeypatch):
+    stamps = iter(["2026-01-31T23:59:00Z", "2026-02-01T00:01:00Z", "2026-02-01T00:02:00Z"])
+    monkeypatch.setattr(provenance, "_utc_now_iso", lambda: next(stamps))
+    a = provenance.store_raw({"n": 1}, kind="tomtom_response")
+    b = provenance.store_raw({"n": 2}, kind="tomtom_response")
+    c = provenance.store_raw([1, 2], kind="polyline")
+    assert sorted(p.name for p in (archive / "packs").iterdir()) == ["2026-01.pack", "2026-02.pack"]
+
+    got = list(provenance.iter_raw("2026-02-01T00:00:00Z"))
+    assert [r["ref"] for r in got] == [b, c]
+    assert [r["obj"] for r in provenance.iter_raw(until_utc="2026-02-01T00:00:00Z")] == [{"n": 1}]
+    assert [r["ref"] for r in provenance.iter_raw(kind="tomtom_response")] == [a, b]
+
+    out = archive.parent / "export.jsonl"
+    subprocess.run(
+        [sys.executable, "-m", "sources.provenance", "--since", "2026-02-01T00:00:00Z", "--kind", "polyline", "--out", str(out)],
+        check=True, capture_output=True, cwd=Path(__file__).resolve().parent.parent,
+        env={**os.environ, "RAW_ARCHIVE_DIR": str(archive)},
+    )
+    lines = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert [(r["ref"], r["obj"]) for r in lines] == [(c, [1, 2])]
+
+
+def test_archive_defaults_to_the_history_db_directory(monkeypatch, tmp_path):
+    monkeypatch.setenv("HISTORY_DB_PATH", str(tmp_path / "history" / "monitor.sqlite3"))
+    assert provenance._default_archive_dir() == tmp_path / "history" / "raw_archive"
+    monkeypatch.delenv("HISTORY_DB_PATH")
+    assert provenance._default_archive_dir().parts[-2:] == ("data", "raw_archive")
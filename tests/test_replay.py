@@ -0,0 +1,99 @@
+"""Tests for history replay under new constants (replay.py + HistoryStore inputs)."""
+
+import json
+
+import pytest
+
+from methodology import AyalonModel
+from sources.history_store import HistoryStore
+
+pytest.importorskip("numpy")
+
+import replay  # noqa: E402
+
+
+SEGMENTS = [
+    {'segment_id': 's1', 'length_km': 5.0, 'observed_travel_time_s': 300.0, 'vehicle_count': 1000},
+    {'segment_id': 's2', 'length_km': 5.0, 'observed_travel_time_s': 720.0, 'vehicle_count': 1000},
+    {'segment_id': 's3', 'length_km': 10.0, 'observed_travel_time_s': 1800.0, 'vehicle_count': 2000},
+]
+
+
+def _record(store, model, run_id, price=7.5, segments=SEGMENTS, corridor_id="ayalon"):
+    results = model.run_model(segments, data_timestamp_utc='2026-01-08T00:00:00Z',
+                              source_ids={'traffic': 'tomtom_flow_v4'}, p_fuel_ils_per_l=price,
+                              pipeline_run_id=run_id)
+    store.record_run(results=results, tomtom_data={'fetched_at': '2026-01-08T00:00:00Z'},
+                     aq_data={}, fuel_data={}, tomtom_age_s=1.0,
+                     segments=segments, p_fuel_ils_per_l=price, corridor_id=corridor_id)
+    return results
+
+
+def test_record_run_persists_inputs(tmp_path):
+    store = HistoryStore(tmp_path / "h.sqlite3")
+    _record(store, AyalonModel(), "run-1")
+    cols = store.fetch_inputs_columnar()
+    assert cols["pipeline_run_id"] == ["run-1"]
+    assert cols["p_fuel_ils_per_l"] == [7.5]
+    assert cols["run_index"] == [0, 0, 0]
+    assert cols["observed_travel_time_s"] == [300.0, 720.0, 1800.0]
+    assert store.fetch_latest_run()["constants_version"] == "AppendixA-v1.2"
+
+
+def test_replay_same_constants_reproduces_history(tmp_path):
+    db = tmp_path / "h.sqlite3"
+    store = HistoryStore(db)
+    model = AyalonModel()
+    original = {f"run-{i}": _record(store, model, f"run-{i}", price=7.0 + i / 10) for i in range(5)}
+
+    summary = replay.replay_history(replay.DEFAULT_CONSTANTS_PATH, db_path=str(db), workers=2)
+    assert summary["runs"] == 5
+    assert summary["runs_per_s"] is not None
+
+    rows = store.fetch_replay_results("AppendixA-v1.2")
+    assert len(rows) == 5
+    for r in rows:
+        orig = original[r["pipeline_run_id"]]
+        for key in ("delta_T_total_h", "fuel_excess_L", "leakage_ils", "co2_emissions_kg"):
+            assert r[key] == orig[key]
+
+
+def test_replay_new_constants_written_alongside(tmp_path):
+    db = tmp_path / "h.sqlite3"
+    store = HistoryStore(db)
+    _record(store, AyalonModel(), "run-1")
+
+    with open(replay.DEFAULT_CONSTANTS_PATH, encoding="utf-8") as f:
+        constants = json.load(f)
+    constants["constants_version"] = "AppendixA-v1.3"
+    constants["fuel_constants"]["StopGo_factor"] = 3.0
+    new_path = tmp_path / "constants.json"
+    new_path.write_text(json.dumps(constants), encoding="utf-8")
+
+    replay.replay_history(str(new_path), db_path=str(db), workers=1)
+    replay.replay_history(replay.DEFAULT_CONSTANTS_PATH, db_path=str(db), workers=1)
+
+    (new,) = store.fetch_replay_results("AppendixA-v1.3")
+    (old,) = store.fetch_replay_results("AppendixA-v1.2")
+    assert new["fuel_excess_L"] == pytest.approx(2 * old["fuel_excess_L"])
+    assert new["delta_T_total_h"] == pytest.approx(old["delta_T_total_h"])
+    # the original run row is untouched
+    assert store.fetch_latest_run()["fuel_excess_L"] == pytest.approx(1140.0)
+
+
+def test_replay_is_scoped_to_one_corridor(tmp_path):
+    db = tmp_path / "h.sqlite3"
+    store = HistoryStore(db)
+    model = AyalonModel()
+    _record(store, model, "ayalon-1")
+    _record(store, model, "hwy1-1", segments=SEGMENTS[:1], corridor_id="hwy1")
+    _record(store, model, "hwy1-2", segments=SEGMENTS[:1], corridor_id="hwy1")
+
+    assert store.fetch_inputs_columnar()["pipeline_run_id"] == ["ayalon-1"]
+    assert store.fetch_inputs_columnar(corridor_id="hwy1")["run_index"] == [0, 1]
+    assert len(store.fetch_inputs_columnar(corridor_id=None)["pipeline_run_id"]) == 3
+    assert [r["pipeline_run_id"] for r in store.fetch_raw_refs(corridor_id="hwy1")] == ["hwy1-1", "hwy1-2"]
+
+    summary = replay.replay_history(replay.DEFAULT_CONSTANTS_PATH, db_path=str(db), workers=1, corridor_id="hwy1")
+    assert summary["runs"] == 2
+    assert {r["pipeline_run_id"] for r in store.fetch_replay_results("AppendixA-v1.2")} == {"hwy1-1", "hwy1-2"}
@@ -0,0 +1,82 @@
+"""Tests for the quota-aware adaptive probe scheduler."""
+
+import random
+from datetime import datetime, timezone
+
+import pytest
+
+from sources.scheduler import ProbeScheduler, _seconds_left_today, congestion_from_raw
+
+NOON = datetime(2026, 3, 2, 12, 0, tzinfo=timezone.utc).timestamp()  # Monday
+
+
+def _calls_rest_of_day(plan, now):
+    return sum(_seconds_left_today(now) / i for i in plan.values())
+
+
+def _trained(keys, congested=(), volatile=()):
+    s = ProbeScheduler(tick_s=300, max_interval_s=3600)
+    for step in range(12):
+        ts = NOON - 3600 + step * 300
+        for k in keys:
+            c = 0.0
+            if k in congested:
+                c = 0.6
+            if k in volatile:
+                c = 0.5 if step % 2 else 0.1
+            s.observe(k, c, ts)
+    return s
+
+
+def test_congested_and_volatile_probes_sampled_more_often():
+    keys = [f"p{i}" for i in range(30)]
+    s = _trained(keys, congested={"p0"}, volatile={"p1"})
+    plan = s.plan(keys, calls_today=1000, quota_per_day=2500, now=NOON)
+    assert plan["p0"] < plan["p5"] and plan["p1"] < plan["p5"]
+    # with a budget for every probe on every tick, all are sampled each tick
+    assert set(s.plan(keys[:6], calls_today=1000, quota_per_day=2500, now=NOON).values()) == {300}
+    assert all(v % 300 == 0 and 300 <= v <= 3600 for v in plan.values())
+
+
+@pytest.mark.parametrize("n_probes,calls_today", [(3, 0), (40, 1200), (120, 2000), (1000, 100), (10, 2499)])
+def test_plan_stays_inside_remaining_quota(n_probes, calls_today):
+    rng = random.Random(n_probes)
+    keys = [f"p{i}" for i in range(n_probes)]
+    s = _trained(keys, congested={k for k in keys if rng.random() < 0.3},
+                 volatile={k for k in keys if rng.random() < 0.3})
+    for hour in (0, 7, 12, 23):
+        now = NOON - 12 * 3600 + hour * 3600 + 1
+        plan = s.plan(keys, calls_today=calls_today, quota_per_day=2500, now=now)
+        assert set(plan) == set(keys)
+        assert _calls_rest_of_day(plan, now) <= 0.9 * (2500 - calls_today) + 1e-6
+
+
+def test_spent_quota_defers_every_probe_to_tomorrow():
+    plan = ProbeScheduler().plan(["a", "b"], calls_today=2500, quota_per_day=2500, now=NOON)
+    assert min(plan.values()) >= _seconds_left_today(NOON)
+
+
+def test_observe_ignores_replayed_samples_and_learns_profile():
+    s = ProbeScheduler()
+    s.observe("a", 0.5, NOON)
+    s.observe("a", 0.0, NOON)  # same timestamp: cached segment, not a new sample
+    st = s.state["probes"]["a"]
+    assert st["congestion"] == 0.5 and st["volatility"] == 0.0
+    assert st["profile"][12] == 0.5  # Monday 12:00 UTC
+    assert s.weight("a", NOON) > s.weight("unknown", NOON)
+
+
+def test_congestion_from_raw():
+    assert congestion_from_raw({"current_speed_kmh": 45.0, "free_flow_speed_kmh": 90.0}) == 0.5
+    assert congestion_from_raw({"current_speed_kmh": 120.0, "free_flow_speed_kmh": 90.0}) == 0.0
+    assert congestion_from_raw({"confidence": 1.0}) is None
+
+
+def test_state_round_trips_through_cache(monkeypatch):
+    store = {}
+    monkeypatch.setattr("sources.scheduler.cache_write", lambda k, v: store.__setitem__(k, v))
+    monkeypatch.setattr("sources.scheduler.cache_read", lambda k, max_age_s=0: store.get(k))
+    s = ProbeScheduler.load()
+    s.observe("a", 0.3, NOON)
+    s.save()
+    assert ProbeScheduler.load().state["probes"]["a"]["congestion"] == 0.3
@@ -0,0 +1,51 @@
+"""Tests for the pluggable cache / archive serializers."""
+
+import json
+
+import pytest
+
+from sources import serialization
+from sources.serialization import get_serializer, loads_any
+
+PAYLOAD = {
+    "segments": [{"segment_id": "a1", "coords": [[32.0 + i * 1e-5, 34.78] for i in range(50)],
+                  "roadClosure": False, "confidence": 0.95, "vehicle_count": None}],
+    "label": "אילון",
+}
+
+
+@pytest.mark.parametrize("spec", ["json", "json+zlib", "marshal", "marshal+zlib"])
+def test_round_trip_and_cross_format_reads(spec):
+    ser = get_serializer(spec)
+    blob = ser.dumps(PAYLOAD)
+    assert isinstance(blob, bytes)
+    assert ser.loads(blob) == PAYLOAD
+    assert loads_any(blob) == PAYLOAD
+    # Plain JSON stays plain JSON; every other format is framed.
+    assert (json.loads(blob) == PAYLOAD) if spec == "json" else blob[:2] == b"\xffS"
+    assert ser.suffix == (".json" if spec == "json" else ".bin")
+
+
+def test_compression_and_bad_input():
+    raw = get_serializer("marshal").dumps(PAYLOAD)
+    assert len(get_serializer("marshal+zlib").dumps(PAYLOAD)) < len(raw)
+    assert loads_any(json.dumps(PAYLOAD)) == PAYLOAD  # str from older writers
+    with pytest.raises(ValueError):
+        loads_any(b"\xffS\x09\x00junk")
+    for spec in ("marshal", "marshal+zlib", "json+zlib"):
+        blob = get_serializer(spec).dumps(PAYLOAD)
+        for corrupt in (blob[:len(blob) // 2], blob[:4] + b"\x00" * 8):
+            with pytest.raises(ValueError):
+                loads_any(corrupt)
+    with pytest.raises(ValueError):
+        get_serializer("pickle")
+    with pytest.raises(ValueError):
+        get_serializer("json+lzma")
+
+
+def test_msgpack_is_optional(monkeypatch):
+    monkeypatch.setattr(serialization, "msgpack", None)
+    with pytest.raises(ValueError):
+        get_serializer("msgpack")
+    with pytest.raises(RuntimeError):
+        loads_any(b"\xffS\x03\x00\x80")
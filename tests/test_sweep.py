@@ -0,0 +1,82 @@
+"""Tests for the scenario / sensitivity sweep (sweep.py)."""
+
+import pytest
+
+from methodology import AyalonModel
+from sources.history_store import HistoryStore
+
+pytest.importorskip("numpy")
+
+import sweep  # noqa: E402
+
+
+SEGMENTS = [
+    {'segment_id': 's1', 'length_km': 5.0, 'observed_travel_time_s': 300.0, 'vehicle_count': 1000},
+    {'segment_id': 's2', 'length_km': 5.0, 'observed_travel_time_s': 720.0, 'vehicle_count': 1000},
+    {'segment_id': 's3', 'length_km': 10.0, 'observed_travel_time_s': 1800.0, 'vehicle_count': 2000},
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = tmp_path / "h.sqlite3"
+    store = HistoryStore(path)
+    model = AyalonModel()
+    for i in range(4):
+        res = model.run_model(SEGMENTS, data_timestamp_utc='2026-01-08T00:00:00Z', source_ids={},
+                              p_fuel_ils_per_l=7.5, pipeline_run_id=f"run-{i}")
+        store.record_run(results=res, tomtom_data={}, aq_data={}, fuel_data={}, tomtom_age_s=None,
+                         segments=SEGMENTS, p_fuel_ils_per_l=7.5)
+    return str(path)
+
+
+def _value(rows, grid_id, counter):
+    (row,) = [r for r in rows if r["grid_id"] == grid_id and r["counter"] == counter]
+    return row["value"]
+
+
+def test_expand_grid_rejects_unknown_params():
+    assert len(sweep.expand_grid({"V_free_kmh": [80, 90], "StopGo_factor": [1.0, 1.5, 2.0]})) == 6
+    with pytest.raises(ValueError):
+        sweep.expand_grid({"P_fuel": [7.0]})
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_sweep_totals_match_scalar_model(db, workers):
+    grid = {"V_free_kmh": [90.0, 80.0], "Value_of_Time_ILS_per_h": [62.5, 75.0]}
+    out = sweep.run_sweep(grid, db_path=db, workers=workers)
+    assert out["grid_points"] == 4
+    assert out["runs"] == 4
+    rows = out["rows"]
+    assert len(rows) == 4 * len(sweep.COUNTERS)
+
+    # grid_id 0 is the frozen constants: 4 runs x the analytic 950 h / 8550 ILS
+    assert _value(rows, 0, "delta_T_total_h") == pytest.approx(4 * 950.0)
+    assert _value(rows, 0, "leakage_ils") == pytest.approx(4 * 8550.0)
+    assert _value(rows, 1, "time_value_ils") == pytest.approx(4 * 950.0 * 75.0)
+
+    model = AyalonModel()
+    model.V_free_kmh = 80.0
+    expected = model.run_model(SEGMENTS, data_timestamp_utc='x', source_ids={}, p_fuel_ils_per_l=7.5)
+    assert _value(rows, 2, "fuel_excess_L") == pytest.approx(4 * expected["fuel_excess_L"])
+
+
+def test_write_table(tmp_path, db):
+    out = sweep.run_sweep({"StopGo_factor": [1.5]}, db_path=db, workers=1)
+    path = tmp_path / "sweep.csv"
+    sweep.write_table(out["rows"], str(path))
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "grid_id,StopGo_factor,counter,value"
+    assert len(lines) == 1 + len(sweep.COUNTERS)
+
+
+def test_sweep_is_scoped_to_one_corridor(db):
+    store = HistoryStore(db)
+    res = AyalonModel().run_model(SEGMENTS[:1], data_timestamp_utc='2026-01-08T00:00:00Z', source_ids={},
+                                  p_fuel_ils_per_l=7.5, pipeline_run_id="hwy1-0")
+    store.record_run(results=res, tomtom_data={}, aq_data={}, fuel_data={}, tomtom_age_s=None,
+                     segments=SEGMENTS[:1], p_fuel_ils_per_l=7.5, corridor_id="hwy1")
+    assert sweep.run_sweep({"StopGo_factor": [1.5]}, db_path=db, workers=1)["runs"] == 4
+    out = sweep.run_sweep({"StopGo_factor": [1.5]}, db_path=db, workers=1, corridor_id="hwy1")
+    assert out["runs"] == 1
+    assert sweep.run_sweep({"StopGo_factor": [1.5]}, db_path=db, workers=1, corridor_id=None)["runs"] == 5
@@ -1,12 +1,17 @@
 import pytest
 from sources import tomtom
+from sources.provenance import load_raw
+from sources.segment import Segment
 from ui_messages import normalization_banner_text
 
 
 @pytest.fixture(autouse=True)
-def clear_cache(monkeypatch):
+def clear_cache(monkeypatch, tmp_path):
     monkeypatch.setattr("sources.tomtom.cache_read", lambda *a, **k: None)
     monkeypatch.setattr("sources.tomtom.cache_write", lambda *a, **k: None)
+    monkeypatch.setattr("sources.provenance.ARCHIVE_DIR", tmp_path / "raw_archive")
+    monkeypatch.setattr("sources.cache.LOCK_DIR", tmp_path / "_locks")
+    monkeypatch.setattr(tomtom, "_GEOMETRY", {})
 
 
 def test_tomtom_normalized_when_no_api_key_sample_mode():
@@ -46,6 +51,16 @@ def test_tomtom_flow_estimated_with_coordinates(monkeypatch):
     assert first["vehicle_count"] == 60 * int(tomtom.DEFAULT_DENSITY_VEH_PER_KM)
     assert first["observed_travel_time_s"] == pytest.approx(120.0)
     assert first["raw"]["tracking_id"] == "abc-123"
+    # raw payload is stored out of band and referenced by content hash
+    assert "response" not in first["raw"]
+    stored = load_raw(first["raw"]["ref"])
+    assert stored["headers"] == headers
+    assert "coordinates" not in stored["response"]["flowSegmentData"]
+    assert load_raw(first["raw"]["polyline_ref"]) == fake_json["flowSegmentData"]["coordinates"]["coordinate"]
+    seg = Segment.from_dict(first)
+    assert seg["vehicle_count"] == first["vehicle_count"]
+    assert seg.confidence == 0.9 and seg.road_closure is False
+    assert seg.raw_ref == first["raw"]["ref"]
 
 
 def test_tomtom_windowed_polyline_length(monkeypatch):
@@ -91,6 +106,269 @@ def test_fail_closed_on_low_confidence(monkeypatch):
         tomtom.get_ayalon_segments(api_key="key", cache_ttl_s=0)
 
 
+GOOD_JSON = {
+    "flowSegmentData": {
+        "currentSpeed": 60.0,
+        "currentTravelTime": 120.0,
+        "freeFlowSpeed": 90.0,
+        "freeFlowTravelTime": 80.0,
+        "confidence": 0.9,
+        "roadClosure": False,
+        "coordinates": {"coordinate": [{"latitude": 32.064, "longitude": 34.791}, {"latitude": 32.065, "longitude": 34.792}]},
+    }
+}
+
+
+def _corridor(cid, n):
+    return {"id": cid, "probes": [{"id": f"{cid}_{i}", "lat": 32.0 + i / 100, "lon": 34.8} for i in range(n)]}
+
+
+def test_probes_fetched_concurrently_with_exact_quota_count(monkeypatch):
+    import threading
+    import time
+
+    class FakeResponse:
+        status_code = 200
+        headers = {"tracking-id": "t"}
+
+        def json(self):
+            return GOOD_JSON
+
+    def slow_get(url, params=None, timeout=None):
+        time.sleep(0.2)
+        return FakeResponse()
+
+    calls = []
+    lock = threading.Lock()
+
+    def record(service, quota_per_day=None):
+        with lock:
+            calls.append(service)
+
+    monkeypatch.setattr(tomtom, "FETCH_WORKERS", 16)
+    monkeypatch.setattr(tomtom.transport, "get", slow_get)
+    monkeypatch.setattr(tomtom, "record_api_call", record)
+    monkeypatch.setattr(tomtom, "can_call_api", lambda service: (True, 0.0))
+    corridors = [_corridor("a", 8), _corridor("b", 8)]
+
+    t0 = time.perf_counter()
+    out = tomtom.get_corridors_segments(corridors, api_key="key", cache_ttl_s=0)
+    elapsed = time.perf_counter() - t0
+
+    assert elapsed < 1.0  # 16 probes x 0.2 s would take 3.2 s sequentially
+    assert len(calls) == 16
+    assert [s["segment_id"] for s in out["a"]["segments"]] == [f"a_{i}" for i in range(8)]
+
+
+def test_cycle_deadline_fails_only_the_slow_corridor(monkeypatch):
+    import time
+
+    def fake_call(api_key, lat, lon, unit="KMPH"):
+        if lat >= 32.5:
+            time.sleep(1.0)
+            # Finishes after the test: fail so the straggler writes nothing to disk.
+            return {}, {}, "url_no_key", 503
+        return GOOD_JSON, {}, "url_no_key", 200
+
+    monkeypatch.setattr(tomtom, "_call_tomtom", fake_call)
+    monkeypatch.setattr(tomtom, "CYCLE_DEADLINE_S", 0.3)
+    slow = {"id": "slow", "probes": [{"id": "s0", "lat": 32.5, "lon": 34.8}]}
+    out = tomtom.get_corridors_segments([_corridor("fast", 3), slow], api_key="key", cache_ttl_s=0)
+    assert len(out["fast"]["segments"]) == 3
+    assert isinstance(out["slow"], TimeoutError)
+
+
+def test_sequential_mode_stops_corridor_after_first_failure(monkeypatch):
+    seen = []
+
+    def fake_call(api_key, lat, lon, unit="KMPH"):
+        seen.append(lat)
+        raise RuntimeError("TomTom v4 fetch failed: status=500")
+
+    monkeypatch.setattr(tomtom, "FETCH_WORKERS", 1)
+    monkeypatch.setattr(tomtom, "PARTIAL_REFRESH", False)
+    monkeypatch.setattr(tomtom, "_call_tomtom", fake_call)
+    out = tomtom.get_corridors_segments([_corridor("a", 3)], api_key="key", cache_ttl_s=0)
+    assert isinstance(out["a"], RuntimeError)
+    assert len(seen) == 1
+
+
+def test_geometry_cached_per_probe_and_polyline(monkeypatch):
+    import copy
+
+    calls = []
+    real_nearest = tomtom._nearest_coord_index
+
+    def counting_nearest(coords, lat, lon):
+        calls.append(len(coords))
+        return real_nearest(coords, lat, lon)
+
+    response = copy.deepcopy(GOOD_JSON)
+    monkeypatch.setattr(tomtom, "_nearest_coord_index", counting_nearest)
+    monkeypatch.setattr(tomtom, "_call_tomtom", lambda api_key, lat, lon, unit="KMPH": (response, {}, "url_no_key", 200))
+    corridor = _corridor("a", 1)
+
+    first = tomtom.get_corridors_segments([corridor], api_key="key", cache_ttl_s=0)["a"]["segments"][0]
+    response["flowSegmentData"]["currentSpeed"] = 30.0  # new traffic, same road geometry
+    second = tomtom.get_corridors_segments([corridor], api_key="key", cache_ttl_s=0)["a"]["segments"][0]
+    assert len(calls) == 1
+    assert second["length_km"] == first["length_km"]
+    assert second["raw"]["polyline_ref"] == first["raw"]["polyline_ref"]
+
+    response["flowSegmentData"]["coordinates"]["coordinate"].append({"latitude": 32.066, "longitude": 34.793})
+    third = tomtom.get_corridors_segments([corridor], api_key="key", cache_ttl_s=0)["a"]["segments"][0]
+    assert len(calls) == 2
+    assert third["raw"]["polyline_points_total"] == 3
+
+
+def test_per_probe_max_age_serves_cached_probes_and_fetches_due_ones(monkeypatch):
+    corridor = _corridor("a", 2)
+    fresh_key, due_key = (tomtom.probe_cache_key(p, "flow") for p in corridor["probes"])
+    cached_seg = {"segment_id": "a_0", "length_km": 1.0, "observed_travel_time_s": 60.0,
+                  "vehicle_count": 10, "vehicle_count_mode": "flow_estimated"}
+    # cache entries are 10 minutes old
+    monkeypatch.setattr(tomtom, "cache_read", lambda key, max_age_s=0: cached_seg if max_age_s >= 600 else None)
+    fetched = []
+    monkeypatch.setattr(tomtom, "_call_tomtom", lambda api_key, lat, lon, unit="KMPH": (fetched.append(lat), (GOOD_JSON, {}, "u", 200))[1])
+    out = tomtom.get_corridors_segments([corridor], api_key="key", cache_ttl_s=300,
+                                        probe_max_age_s={fresh_key: 3450, due_key: 150})
+    assert len(fetched) == 1
+    assert out["a"]["segments"][0] is cached_seg
+    assert out["a"]["segments"][1]["segment_id"] == "a_1"
+
+
+def _dict_cache(monkeypatch):
+    import time
+
+    store = {}
+    monkeypatch.setattr(tomtom, "cache_write", lambda key, data: store.__setitem__(key, (time.time(), data)))
+    monkeypatch.setattr(tomtom, "cache_read", lambda key, max_age_s=300: (
+        store[key][1] if key in store and time.time() - store[key][0] <= max_age_s else None
+    ))
+    return store
+
+
+def test_concurrent_cache_misses_are_coalesced(monkeypatch):
+    import threading
+    import time
+
+    _dict_cache(monkeypatch)
+    calls = []
+
+    def slow_call(api_key, lat, lon, unit="KMPH"):
+        calls.append(lat)
+        time.sleep(0.2)
+        return GOOD_JSON, {}, "url_no_key", 200
+
+    monkeypatch.setattr(tomtom, "_call_tomtom", slow_call)
+    corridor = _corridor("a", 3)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(tomtom.get_corridors_segments([corridor], api_key="key", cache_ttl_s=300)["a"]))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 3  # one refresh, not four
+    assert len(results) == 4 and all(r is results[0] or r == results[0] for r in results)
+
+
+def test_single_flight_wait_is_bounded_across_processes(monkeypatch, tmp_path):
+    import subprocess
+    import sys
+    import textwrap
+    from pathlib import Path
+
+    key = tomtom._aggregate_cache_key("a", "flow")
+    holder = subprocess.Popen(
+        [sys.executable, "-c", textwrap.dedent(f"""
+            import sys, time
+            from sources.filelock import FileLock
+            with FileLock({str(tmp_path / "_locks" / (key + ".lock"))!r}):
+                print("held", flush=True)
+                time.sleep(5)
+        """)],
+        cwd=Path(__file__).resolve().parent.parent, stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        assert holder.stdout.readline().strip() == "held"
+        calls = []
+        monkeypatch.setattr(tomtom, "_call_tomtom", lambda api_key, lat, lon, unit="KMPH": (calls.append(lat), (GOOD_JSON, {}, "u", 200))[1])
+        monkeypatch.setattr(tomtom, "SINGLE_FLIGHT_WAIT_S", 0.3)
+        out = tomtom.get_corridors_segments([_corridor("a", 2), _corridor("b", 1)], api_key="key", cache_ttl_s=0)
+    finally:
+        holder.kill()
+        holder.wait()
+    assert isinstance(out["a"], TimeoutError)
+    assert out["b"]["segments"][0]["segment_id"] == "b_0"
+    assert len(calls) == 1  # corridor "a" was never fetched while another process held it
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_partial_refresh_serves_last_good_value_and_refetches_only_failed(monkeypatch, workers):
+    store = _dict_cache(monkeypatch)
+    monkeypatch.setattr(tomtom, "FETCH_WORKERS", workers)
+    fetched, failing = [], set()
+
+    def fake_call(api_key, lat, lon, unit="KMPH"):
+        fetched.append(lat)
+        if lat in failing:
+            raise RuntimeError("TomTom v4 fetch failed: status=500")
+        return GOOD_JSON, {}, "u", 200
+
+    monkeypatch.setattr(tomtom, "_call_tomtom", fake_call)
+    corridor = _corridor("a", 3)
+    first = tomtom.get_corridors_segments([corridor], api_key="key", cache_ttl_s=300)["a"]
+    assert "partial" not in first
+
+    failing.add(32.01)
+    fetched.clear()
+    second = tomtom.get_corridors_segments([corridor], api_key="key", cache_ttl_s=0)["a"]
+    assert sorted(fetched) == [32.0, 32.01, 32.02]
+    assert second["partial"] is True
+    assert [p["segment_id"] for p in second["stale_probes"]] == ["a_1"]
+    stale = second["segments"][1]
+    assert stale["stale"] is True and stale["fetched_at"] == first["segments"][1]["fetched_at"]
+    assert second["oldest_probe_fetched_at"] == stale["fetched_at"] < second["fetched_at"]
+    assert not second["segments"][0].get("stale")
+
+    # Partial aggregate is not reused: only the stale probe (last good value
+    # now older than the TTL) is fetched again.
+    key = tomtom.probe_cache_key(corridor["probes"][1], "flow")
+    store[key] = (store[key][0] - 600, store[key][1])
+    failing.clear()
+    fetched.clear()
+    third = tomtom.get_corridors_segments([corridor], api_key="key", cache_ttl_s=300)["a"]
+    assert fetched == [32.01]
+    assert "partial" not in third and not any(seg.get("stale") for seg in third["segments"])
+
+
+def test_partial_refresh_fails_corridor_without_recent_good_value(monkeypatch):
+    store = _dict_cache(monkeypatch)
+    failing = {32.01}
+
+    def fake_call(api_key, lat, lon, unit="KMPH"):
+        if lat in failing:
+            raise RuntimeError("TomTom v4 fetch failed: status=500")
+        return GOOD_JSON, {}, "u", 200
+
+    monkeypatch.setattr(tomtom, "_call_tomtom", fake_call)
+    corridor = _corridor("a", 3)
+    out = tomtom.get_corridors_segments([corridor], api_key="key", cache_ttl_s=300)
+    assert isinstance(out["a"], RuntimeError)
+    # The probes that succeeded were still cached for the next attempt.
+    assert tomtom.probe_cache_key(corridor["probes"][0], "flow") in store
+
+    failing.clear()
+    assert "partial" not in tomtom.get_corridors_segments([corridor], api_key="key", cache_ttl_s=300)["a"]
+    failing.add(32.01)
+    monkeypatch.setattr(tomtom, "PARTIAL_MAX_STALE_FRACTION", 0.0)
+    out = tomtom.get_corridors_segments([corridor], api_key="key", cache_ttl_s=0)
+    assert isinstance(out["a"], RuntimeError)  # one stale probe already exceeds the allowed fraction
+
+
 def test_ui_banner_text_for_normalized_mode():
     msg = normalization_banner_text("normalized_per_probe")
     assert "Normalized metrics" in msg
@@ -0,0 +1,115 @@
+"""Vector flow tile ingestion against tiles recorded (encoded) in the test."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from sources import geodesy, mvt, tomtom_tiles
+
+PATH = np.array([[32.030, 34.779], [32.050, 34.786], [32.064, 34.791], [32.078, 34.796], [32.090, 34.801]])
+CORRIDOR = {"id": "ayalon", "probes": [], "path": PATH.tolist()}
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch, tmp_path):
+    store = {}
+    monkeypatch.setattr(tomtom_tiles, "cache_read", lambda key, max_age_s=300: store.get(key))
+    monkeypatch.setattr(tomtom_tiles, "cache_write", lambda key, data: store.__setitem__(key, data))
+    monkeypatch.setattr("sources.provenance.ARCHIVE_DIR", tmp_path / "raw_archive")
+    monkeypatch.setattr("sources.cache.LOCK_DIR", tmp_path / "_locks")
+    monkeypatch.setattr(tomtom_tiles, "can_call_api", lambda service: (True, 0.0))
+    monkeypatch.setattr(tomtom_tiles, "TILE_ZOOM", 14)  # corridor spans several tiles
+    return store
+
+
+def _densify(path, n=400):
+    t = np.linspace(0, len(path) - 1, n)
+    i = np.minimum(t.astype(int), len(path) - 2)
+    f = (t - i)[:, None]
+    return path[i] * (1 - f) + path[i + 1] * f
+
+
+def _offset(line, metres_east):
+    return line + [0.0, metres_east / 1000.0 / (111.32 * np.cos(np.radians(32.06)))]
+
+
+ROADS = {
+    "fwd": (_offset(_densify(PATH), 12), {"traffic_level": 80, "road_type": "Motorway"}),
+    "rev": (_offset(_densify(PATH), -12)[::-1], {"traffic_level": 40, "road_type": "Motorway"}),
+    "parallel": (_offset(_densify(PATH), 300), {"traffic_level": 30, "road_type": "Major road"}),
+    "cross": (np.array([[32.064, 34.786], [32.064, 34.796]]), {"traffic_level": 20, "road_type": "Local road"}),
+}
+
+
+def _record_tile(z, x, y, buffer=128):
+    """Encode the synthetic roads as TomTom would serve tile z/x/y (with a buffer)."""
+    features = []
+    for fid, (line, props) in enumerate(ROADS.values()):
+        px = np.rint(mvt.latlon_to_tile_pixels(line, z, x, y)).astype(int)
+        inside = ((px >= -buffer) & (px < 4096 + buffer)).all(axis=1)
+        if inside.sum() >= 2:
+            features.append({"id": fid, "type": mvt.GEOM_LINESTRING, "properties": props,
+                             "geometry": [[tuple(p) for p in px[inside]]]})
+    return mvt.encode_tile({"Traffic flow": {"extent": 4096, "features": features}})
+
+
+@pytest.fixture
+def tiles(monkeypatch):
+    calls = []
+
+    def fake_call(api_key, z, x, y):
+        calls.append((z, x, y))
+        return _record_tile(z, x, y), {"tracking-id": "t"}, f"tile/{z}/{x}/{y}"
+
+    monkeypatch.setattr(tomtom_tiles, "_call_tile", fake_call)
+    return calls
+
+
+def test_corridor_extracted_from_tiles(tiles):
+    out = tomtom_tiles.get_corridors_segments([CORRIDOR], api_key="key", cache_ttl_s=300)["ayalon"]
+    expected_tiles = tomtom_tiles.corridor_tiles(CORRIDOR)
+    assert len(expected_tiles) > 1
+    assert sorted(tiles) == sorted(expected_tiles)  # one request per tile
+
+    segs = out["segments"]
+    assert out["vehicle_count_mode"] == "flow_estimated"
+    assert {s["raw"]["road_type"] for s in segs} == {"Motorway"}  # parallel road and cross street rejected
+    length = geodesy.polyline_length_km(PATH)
+    for direction, speed in (("fwd", 80), ("rev", 40)):
+        part = [s for s in segs if s["raw"]["direction"] == direction]
+        assert all(s["segment_id"].startswith(f"ayalon:{direction}:") for s in part)
+        # Tile buffers overlap, but each stretch of road is counted once.
+        assert sum(s["length_km"] for s in part) == pytest.approx(length, rel=0.02)
+        assert sum(s["observed_travel_time_s"] for s in part) == pytest.approx(length / speed * 3600, rel=0.02)
+        assert all(s["vehicle_count"] == speed * 25 for s in part)
+    assert len({s["segment_id"] for s in segs}) == len(segs)
+
+    # Aggregate served from cache; tiles are cached by their own key and archived raw.
+    tomtom_tiles.get_corridors_segments([CORRIDOR], api_key="key", cache_ttl_s=300)
+    assert len(tiles) == len(expected_tiles)
+
+
+def test_shared_tiles_fetched_once_and_failures_fail_closed(tiles, monkeypatch, isolated):
+    north = {"id": "north", "probes": [], "path": PATH[2:].tolist()}
+    out = tomtom_tiles.get_corridors_segments([CORRIDOR, north], api_key="key", cache_ttl_s=300)
+    assert len(tiles) == len(set(tiles))
+    assert out["north"]["segments"]
+
+    isolated.clear()
+    bad = set(tomtom_tiles.corridor_tiles(CORRIDOR)) - set(tomtom_tiles.corridor_tiles(north))
+    real = tomtom_tiles._call_tile
+
+    def flaky(api_key, z, x, y):
+        if (z, x, y) in bad:
+            raise RuntimeError("TomTom tiles fetch failed: status=503")
+        return real(api_key, z, x, y)
+
+    monkeypatch.setattr(tomtom_tiles, "_call_tile", flaky)
+    out = tomtom_tiles.get_corridors_segments([CORRIDOR, north], api_key="key", cache_ttl_s=300)
+    assert isinstance(out["ayalon"], RuntimeError)
+    assert out["north"]["segments"]
+
+
+def test_tile_mode_requires_api_key():
+    with pytest.raises(RuntimeError):
+        tomtom_tiles.get_corridors_segments([CORRIDOR], api_key=None)
@@ -0,0 +1,103 @@
+"""Tests for the shared pooled HTTP transport."""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from sources import transport
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    peers = set()
+
+    def do_GET(self):
+        type(self).peers.add(self.client_address)
+        if self.path.startswith("/cookie"):
+            self.send_response(200)
+            self.send_header("Set-Cookie", "sid=abc; Path=/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path.startswith("/echo"):
+            body = (self.headers.get("Cookie") or "").encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.path.startswith("/chunked"):
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for chunk in (b"x" * 1000, b"y" * 1000):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        body = b'{"ok": true}' if self.path.startswith("/ok") else b"missing"
+        self.send_response(200 if self.path.startswith("/ok") else 404)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    transport.reset()
+    _Handler.peers = set()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    t = threading.Thread(target=httpd.serve_forever, daemon=True)
+    t.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+    transport.reset()
+
+
+def test_connections_reused_across_calls(server):
+    for i in range(5):
+        r = transport.get(f"{server}/ok", params={"i": i}, timeout=5)
+        assert r.json() == {"ok": True}
+    # one keep-alive connection served every request
+    assert len(_Handler.peers) == 1
+    assert transport.session_for(f"{server}/other") is transport.session_for(f"{server}/ok")
+
+
+def test_per_host_counters(server):
+    transport.get(f"{server}/ok", timeout=5)
+    r = transport.get(f"{server}/missing", timeout=5)
+    assert r.status_code == 404  # statuses are returned, not raised
+    stats = transport.host_stats()[server]
+    assert stats["requests"] == 2
+    assert stats["errors"] == 1
+    assert stats["bytes"] == len(b'{"ok": true}') + len(b"missing")
+    assert stats["latency_ms_max"] >= stats["latency_ms_mean"] > 0
+
+
+def test_streamed_bodies_are_not_read(server):
+    r = transport.get(f"{server}/chunked", timeout=5, stream=True)
+    assert r._content_consumed is False  # left for the caller to iterate
+    assert transport.host_stats()[server]["bytes"] == 0
+    assert b"".join(r.iter_content(256)) == b"x" * 1000 + b"y" * 1000
+    transport.get(f"{server}/chunked", timeout=5)
+    assert transport.host_stats()[server]["bytes"] == 2000
+
+
+def test_sessions_do_not_keep_cookies(server):
+    assert transport.get(f"{server}/cookie", timeout=5).cookies.get("sid") == "abc"
+    assert transport.get(f"{server}/echo", timeout=5).text == ""
+    assert not transport.session_for(server).cookies
+
+
+def test_connection_errors_counted_and_raised():
+    transport.reset()
+    url = "http://127.0.0.1:9"  # discard port: connection refused
+    with pytest.raises(Exception):
+        transport.get(url, timeout=2)
+    assert transport.host_stats()[url]["errors"] == 1
+    transport.reset()
@@ -5,7 +5,7 @@ from methodology import AyalonModel
 from sources.health import get_quick_status, get_quick_status_readonly, compute_traffic_health
 from sources.analytics import record_stale_data  # only stale-data recording kept
 from ui_messages import normalization_banner_text
-from datetime import datetime
+from datetime import datetime, timezone
 from sources.history_store import HistoryStore
 from sources.official_stats import fetch_official_reference_card
 
@@ -94,6 +94,7 @@ _I18N = {
         "export_note": "הייצוא כולל את הטבלה והגרפים (מסוכמים לפי אותו חלון/סקאלה).",
         "time_value_caption": "אומדן עלות זמן (₪): ₪ {value:,.0f} (בהנחה ₪{rate:.2f}/שעת-רכב)",
         "extrapolated_caption": "הוחשב בהסקה מ-{window}. משך נצפה: {hours:.2f} שעות.",
+        "time_avg_caption": "רמה ממוצעת בזמן לתמונת מצב: ₪ {leak:,.0f} עלות דלק, {delay:,.1f} שעות-רכב עיכוב.",
 
         "official_card_title": "ייחוס רשמי — כקונטקסט בלבד",
         "official_card_subtitle_context_only": "מסגרת ייחוס (reference-only): מקור רשמי מצוטט לצורך הקשר, לא מדד אמת.",
@@ -182,6 +183,7 @@ _I18N = {
         "export_note": "Export includes the table and charts (aggregated by the same window/scale).",
         "time_value_caption": "Indicative time-value loss (₪): ₪ {value:,.0f} (assumes ₪{rate:.2f}/vehicle-hour)",
         "extrapolated_caption": "Extrapolated from {window}. Observed duration: {hours:.2f} hours.",
+        "time_avg_caption": "Time-averaged per-snapshot level: ₪ {leak:,.0f} fuel cost, {delay:,.1f} vehicle-hours delay.",
 
         "official_card_title": "Official reference — context only",
         "official_card_subtitle_context_only": "Reference-only: a cited official number for context, not a truth-source validator.",
@@ -555,15 +557,6 @@ model = AyalonModel()
 history = HistoryStore()
 
 
-def _parse_iso_to_ts(s: str | None) -> float:
-    if not s:
-        return 0.0
-    try:
-        return datetime.fromisoformat(str(s).replace('Z', '+00:00')).timestamp()
-    except Exception:
-        return 0.0
-
-
 def _history_window_seconds(choice: str) -> int | None:
     mapping = {
         "1h": 3600,
@@ -575,48 +568,24 @@ def _history_window_seconds(choice: str) -> int | None:
     return mapping.get(choice)
 
 
-def _compute_aggregates_from_history(df, window_s: int | None):
-    """Return (df_window, totals_dict, duration_hours) using recorded_at_utc."""
-    import pandas as pd  # type: ignore
-
-    if df is None or not isinstance(df, pd.DataFrame) or df.empty:
-        return None, {}, 0.0
-
-    d = df.copy()
-    d['recorded_at_utc'] = pd.to_datetime(d['recorded_at_utc'], errors='coerce', utc=True)
-    d = d.dropna(subset=['recorded_at_utc'])
-    if d.empty:
-        return None, {}, 0.0
+def _window_aggregates(window_s: int | None):
+    """Return (totals_dict, covered_hours, runs, time_avg_dict) for the window ending now.
 
-    now = pd.Timestamp.utcnow()
-    # pandas versions differ: Timestamp.utcnow() may be tz-aware already.
-    if getattr(now, 'tzinfo', None) is None:
-        now = now.tz_localize('UTC')
-    else:
-        now = now.tz_convert('UTC')
+    Totals are per-run sums from HistoryStore running totals (a few index
+    seeks), so long windows such as "30d" and "all" are exact rather than
+    truncated to a fixed number of loaded rows.  covered_hours is the time
+    the runs actually cover (intervals longer than the max gap excluded), so
+    rates derived from it are not diluted by collection outages.  time_avg is
+    each counter's time-averaged per-snapshot level (integrated / covered_h,
+    same unit as one run's figure).
+    """
+    since = None
     if window_s is not None:
-        start = now - pd.Timedelta(seconds=int(window_s))
-        d = d[d['recorded_at_utc'] >= start]
-        if d.empty:
-            return None, {}, 0.0
-
-    d = d.sort_values('recorded_at_utc')
-    duration_h = (d['recorded_at_utc'].max() - d['recorded_at_utc'].min()).total_seconds() / 3600.0
-    duration_h = max(duration_h, 1e-6)
-
-    def total(col: str) -> float:
-        if col not in d.columns:
-            return 0.0
-        s = pd.to_numeric(d[col], errors='coerce').dropna()
-        return float(s.sum()) if not s.empty else 0.0
-
-    totals = {
-        'delta_T_total_h': total('delta_T_total_h'),
-        'fuel_excess_L': total('fuel_excess_L'),
-        'co2_emissions_kg': total('co2_emissions_kg'),
-        'leakage_ils': total('leakage_ils'),
-    }
-    return d, totals, duration_h
+        since = datetime.fromtimestamp(time.time() - int(window_s), tz=timezone.utc).isoformat().replace('+00:00', 'Z')
+    w = history.window_totals(since)
+    if not w.get('totals'):
+        return {}, 0.0, 0, {}
+    return w['totals'], max(float(w['covered_h']), 1e-6), w['runs'], w['time_avg']
 
 # Controls
 st.sidebar.header(_t("sidebar_data_refresh", lang))
@@ -783,11 +752,8 @@ if results is not None:
         totals = None
         duration_h = 0.0
         try:
-            import pandas as pd  # type: ignore
-
-            df_hist = history.fetch_runs_df(limit=5000)
             window_s = _history_window_seconds(history_window_choice)
-            _dfw, totals, duration_h = _compute_aggregates_from_history(df_hist, window_s)
+            totals, duration_h, _runs, _time_avg = _window_aggregates(window_s)
         except Exception:
             totals = None
 
@@ -872,16 +838,17 @@ with tab_history:
     else:
         # Compute window aggregates (never fail the entire tab)
         window_s = _history_window_seconds(history_window_choice)
-        dfw, totals, duration_h = _compute_aggregates_from_history(df, window_s)
+        totals, duration_h, _runs, time_avg = _window_aggregates(window_s)
+        totals_all, _duration_all, runs_all, _time_avg_all = _window_aggregates(None)
 
         # Latest first for table readability
         df_table = df.copy().sort_values('recorded_at_utc', ascending=False)
 
         # Summary
         st.subheader(_t("summary", lang))
-        total_leak_all = float(df_table['leakage_ils'].dropna().sum()) if 'leakage_ils' in df_table else 0.0
-        total_co2_all = float(df_table['co2_emissions_kg'].dropna().sum()) if 'co2_emissions_kg' in df_table else 0.0
-        avg_leak_all = float(df_table['leakage_ils'].dropna().mean()) if 'leakage_ils' in df_table and df_table['leakage_ils'].notna().any() else 0.0
+        total_leak_all = float(totals_all.get('leakage_ils', 0.0))
+        total_co2_all = float(totals_all.get('co2_emissions_kg', 0.0))
+        avg_leak_all = (total_leak_all / runs_all) if runs_all else 0.0
 
         # Window-based scaling
         window_leak = float((totals or {}).get('leakage_ils', 0.0))
@@ -904,6 +871,11 @@ with tab_history:
         w4.metric(f"{_t('metric_fuel_cost', lang)} ({_t('loss_opt_per_year', lang)}, ₪/yr)", f"₪ {leak_per_year:,.0f}")
 
         st.caption(f"delay={window_delay_h:,.1f} vehicle-hours, CO₂={window_co2:,.0f} kg")
+        if time_avg:
+            st.caption(_t("time_avg_caption", lang).format(
+                leak=float(time_avg.get('leakage_ils', 0.0)),
+                delay=float(time_avg.get('delta_T_total_h', 0.0)),
+            ))
 
         st.subheader(_t("official_card_title", lang))
         st.caption(_t("official_card_subtitle_context_only", lang))